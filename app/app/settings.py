@@ -43,15 +43,30 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowRequestMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.middleware.ScopedMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Only run for paths outside of SCOPED_MIDDLEWARE_EXCLUDED_PATHS, the token
+# authenticated API has no use for sessions, CSRF or messages.
+SCOPED_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+SCOPED_MIDDLEWARE_EXCLUDED_PATHS = ['/api/']
+
+# The admin checks look for its middleware in MIDDLEWARE only, it runs
+# through SCOPED_MIDDLEWARE instead.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -107,6 +122,26 @@ DATABASES = {
     # }
 }
 
+# Sharding
+# Users' recipes, tags and ingredients go to one of SHARDS, picked by
+# hashing the user ID; users, tokens and tasks stay on the default database.
+# DB_SHARDS names the databases of the shards besides the default one, on
+# the same server. Run `manage.py rebalance_shards` after changing it.
+
+SHARDS = ['default']
+
+for index, name in enumerate(
+        filter(None, os.environ.get('DB_SHARDS', '').split(',')), 1):
+    DATABASES[f'shard_{index}'] = {**DATABASES['default'],
+                                   'NAME': name.strip()}
+    SHARDS.append(f'shard_{index}')
+
+# Keeps the IDs of rows created on each shard apart, so moved rows keep
+# them; shard N hands out IDs from N * SHARD_ID_RANGE.
+SHARD_ID_RANGE = 100_000_000
+
+DATABASE_ROUTERS = ['core.sharding.ShardRouter']
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -174,3 +209,110 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 
 AUTH_USER_MODEL = 'core.User'
+
+# Metrics
+# Directory shared by all worker processes to aggregate /metrics, leave unset
+# for a single process deployment. Files of processes no longer running are
+# dropped, so it must not be shared with other hosts.
+# /metrics is served to staff users and to scrapers sending METRICS_TOKEN as
+# a bearer token.
+
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Slow request log
+# Toggle per process at runtime with `manage.py slow_requests <pid>...`,
+# which sends SIGUSR2. Processes handle it once the app is loaded, and
+# preforking servers that reset signals in their workers (gunicorn) get
+# it back from the warm-up hook below; the command refuses processes
+# without the handler, like a server's master, which SIGUSR2 would kill
+# or make reload.
+
+SLOW_REQUEST_LOG_ENABLED = False
+SLOW_REQUEST_THRESHOLD_MS = 500
+SLOW_REQUEST_SAMPLE_RATE = 1.0
+SLOW_REQUEST_LOG_INTERVAL = 10.0
+
+# Response compression
+# zstd and Brotli are used when the zstandard and brotli packages are
+# installed, gzip otherwise. Levels trade CPU for bandwidth, see
+# `manage.py benchmark --accept-encoding`.
+
+COMPRESSION_PATHS = ['/api/']
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CONTENT_TYPES = ('application/json', 'application/x-ndjson',
+                             'text/')
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 5, 'zstd': 3}
+
+# Response cache
+# Caches the encoded bytes of cacheable responses, like recipe lists, keyed
+# on the head of the user's change feed. Set the timeout to 0 to turn it
+# off.
+
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 60
+
+# Startup
+# Dotted paths of the functions `core.warmup.run` calls before a worker
+# takes traffic. The WSGI and ASGI modules run them on import when
+# WARMUP_ON_START is set; with a server preloading the app in its master
+# process turn it off and call `core.warmup.run` after forking instead.
+# `manage.py profile_imports` shows where cold start time goes.
+
+WARMUP_ON_START = True
+WARMUP_HOOKS = [
+    'core.warmup.compile_urls',
+    'core.warmup.connect_databases',
+    'core.warmup.build_serializers',
+    'core.warmup.prime_token_lookup',
+    'core.profiling.install_signal_handler',
+]
+
+# Serve the browsable API root listing the routes, API only deployments
+# skip it along with its format suffix routes.
+
+API_ROOT_VIEW = True
+
+# Background tasks
+# Run by `manage.py run_workers` from a queue table, tests can switch to
+# 'core.tasks.InMemoryBackend' and run them with `core.tasks.run_pending`.
+# A failed task is retried after TASKS_RETRY_DELAY seconds, doubled on
+# every further attempt up to TASKS_MAX_RETRY_DELAY; a task running longer
+# than TASKS_TIMEOUT seconds is taken as lost with its worker and requeued.
+
+TASKS_BACKEND = 'core.tasks.DatabaseBackend'
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+TASKS_MAX_RETRY_DELAY = 3600
+TASKS_TIMEOUT = 600
+TASKS_POLL_INTERVAL = 1.0
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'cheap': '300/min',
+        'expensive': '30/min',
+    },
+}
+
+# Memory mapped file holding the rate limit buckets shared by the workers,
+# defaults to a file in a directory of the temp directory private to the
+# user running them.
+THROTTLE_BUCKETS_PATH = os.environ.get('THROTTLE_BUCKETS_PATH')
+
+TEST_RUNNER = 'core.tests.runner.TestRunner'
@@ -0,0 +1,49 @@
+"""
+Django settings for API only workers.
+
+Leaves out the admin, sessions, messages, static files and the browsable
+API, which token authenticated JSON clients never use, so workers start
+faster and handle requests through fewer middleware. Run the admin from
+workers using app.settings.
+"""
+
+from app.settings import *  # noqa: F401, F403
+from app.settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, \
+    TEMPLATES
+
+ADMIN_ONLY_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS
+                  if app not in ADMIN_ONLY_APPS]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE
+              if middleware != 'core.middleware.ScopedMiddleware']
+
+SCOPED_MIDDLEWARE = []
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        'context_processors': [
+            'django.template.context_processors.debug',
+            'django.template.context_processors.request',
+        ],
+    },
+}]
+
+API_ROOT_VIEW = False
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.JSONRenderer',
+    ),
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'core.authentication.ShardedTokenAuthentication',
+    ),
+}
@@ -13,13 +13,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.apps import apps
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
 from django.urls import path, include
 
+from core import views as core_views
+
 urlpatterns = [
-                  path('admin/', admin.site.urls),
+                  path('metrics', core_views.metrics, name='metrics'),
                   path('api/user/', include('user.urls')),
                   path('api/recipe/', include('recipe.urls')),
               ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# API only deployments leave the admin out, and skip importing it
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(1, path('admin/', admin.site.urls))
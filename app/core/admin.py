@@ -1,8 +1,134 @@
-from django.contrib import admin
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 
-from core import models
+from core import models, sharding
+
+# Below this many rows the planner estimate is not trusted over COUNT(*).
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+# changelist filter picking the user, and so the shard, to list data of
+USER_FILTER = 'user__id__exact'
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using the planner's row estimate of unfiltered tables.
+
+    COUNT(*) has to scan the whole table, the estimate kept in pg_class by
+    (auto)vacuum and analyze is free and accurate enough for paging. The
+    estimate of a partitioned table is the sum of its partitions'.
+    """
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        connection = connections[self.object_list.db]
+
+        if not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT SUM(GREATEST(reltuples, 0)) FROM pg_class '
+                    'WHERE oid = %s::regclass OR oid IN (SELECT inhrelid '
+                    'FROM pg_inherits WHERE inhparent = %s::regclass)',
+                    [query.model._meta.db_table] * 2
+                )
+                row = cursor.fetchone()
+
+            if row[0] is not None and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Admin configuration for tables too large to count or list fully.
+
+    Their rows are users' data, served from the shard of one user at a
+    time: change pages from the shard holding the row, the add page from
+    the shard of the user it is saved for and the changelist from the shard
+    of the user it is filtered by. Unfiltered, it lists the default
+    database only, and autocomplete searches it only, when data is spread
+    over shards.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(sharding.current())
+
+    def _shard_of_object(self, object_id):
+        for alias in settings.SHARDS:
+            try:
+                if self.model.objects.using(alias).filter(pk=object_id) \
+                        .exists():
+                    return alias
+            except (ValueError, ValidationError):
+                return None
+
+        return None
+
+    def _shard_of_user(self, user_id):
+        try:
+            return sharding.placement(int(user_id))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _on_shard(alias, view, *args, **kwargs):
+        """Runs a view with a shard active, rendering its response there,
+        as related rows and choices are queried while rendering."""
+
+        with sharding.use(alias or DEFAULT_DB_ALIAS):
+            response = view(*args, **kwargs)
+
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+
+        return response
+
+    def changelist_view(self, request, extra_context=None):
+        alias = None
+
+        if sharding.enabled():
+            alias = self._shard_of_user(request.GET.get(USER_FILTER))
+
+            if alias is None and request.method == 'GET':
+                messages.warning(request, _(
+                    'Only data on the default database is listed, filter '
+                    'by user to list data on their shard.'
+                ))
+
+        return self._on_shard(alias, super().changelist_view, request,
+                              extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url='',
+                        extra_context=None):
+        alias = None
+
+        if sharding.enabled():
+            alias = self._shard_of_object(object_id) if object_id else \
+                self._shard_of_user(request.POST.get('user'))
+
+        return self._on_shard(alias, super().changeform_view, request,
+                              object_id, form_url, extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        alias = self._shard_of_object(object_id) if sharding.enabled() \
+            else None
+
+        return self._on_shard(alias, super().delete_view, request,
+                              object_id, extra_context)
 
 
 class UserAdmin(BaseUserAdmin):
@@ -30,7 +156,77 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class TagAdmin(LargeTableAdmin):
+    """Admin view configuration for Tag model."""
+
+    list_display = ['name', 'user']
+    # prefix searches, served by the upper(name) pattern index
+    search_fields = ['^name']
+
+
+class IngredientAdmin(LargeTableAdmin):
+    """Admin view configuration for Ingredient model."""
+
+    list_display = ['name', 'user']
+    search_fields = ['^name']
+
+
+class RecipeAdminForm(forms.ModelForm):
+    """Recipe form of the admin, its tags and ingredients are linked
+    through models the admin does not build fields for."""
+
+    tags = forms.ModelMultipleChoiceField(
+        models.Tag.objects.all(), required=False,
+        widget=AutocompleteSelectMultiple(
+            models.Recipe._meta.get_field('tags').remote_field, admin.site
+        )
+    )
+    ingredients = forms.ModelMultipleChoiceField(
+        models.Ingredient.objects.all(), required=False,
+        widget=AutocompleteSelectMultiple(
+            models.Recipe._meta.get_field('ingredients').remote_field,
+            admin.site
+        )
+    )
+
+    class Meta:
+        model = models.Recipe
+        fields = '__all__'
+
+
+class RecipeAdmin(LargeTableAdmin):
+    """Admin view configuration for Recipe model."""
+
+    form = RecipeAdminForm
+    list_display = ['title', 'user', 'time_in_minutes', 'price']
+    search_fields = ['^title']
+
+
+class AccountPurgeAdmin(admin.ModelAdmin):
+    """Admin view configuration for AccountPurge model."""
+
+    list_display = ['email', 'requested_at', 'finished_at',
+                    'recipes_deleted', 'tags_deleted', 'ingredients_deleted']
+    raw_id_fields = ('user',)
+    readonly_fields = ['recipes_deleted', 'tags_deleted',
+                       'ingredients_deleted', 'images_deleted']
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """Admin view configuration for Task model."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_display = ['id', 'name', 'status', 'priority', 'attempts',
+                    'run_at']
+    list_filter = ['status']
+    readonly_fields = ['attempts', 'created_at', 'started_at',
+                       'finished_at', 'last_error']
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.AccountPurge, AccountPurgeAdmin)
+admin.site.register(models.Task, TaskAdmin)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import profiling, signals  # noqa: F401
+
+        profiling.install_signal_handler()
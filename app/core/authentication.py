@@ -0,0 +1,30 @@
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import APIException
+
+from core import sharding
+
+
+class AccountMoving(APIException):
+    """Raised for users whose data is being moved to another shard."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The account is being moved, try again shortly.'
+    default_code = 'account_moving'
+    # seconds sent as Retry-After
+    wait = 1
+
+
+class ShardedTokenAuthentication(TokenAuthentication):
+    """Token authentication activating the shard of the user's data for the
+    rest of the request."""
+
+    def authenticate_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+
+        if user.moving_to:
+            raise AccountMoving()
+
+        sharding.activate(user.shard)
+
+        return user, token
@@ -0,0 +1,124 @@
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class _BrotliCompressor:
+    """Gives brotli's streaming compressor the zlib interface."""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def _compressors():
+    """Returns the available encodings, most preferred first, with a
+    factory of incremental compressors for each."""
+
+    def level(encoding):
+        return settings.COMPRESSION_LEVELS[encoding]
+
+    compressors = {}
+
+    if zstandard is not None:
+        compressors['zstd'] = lambda: zstandard.ZstdCompressor(
+            level=level('zstd')
+        ).compressobj()
+
+    if brotli is not None:
+        compressors['br'] = lambda: _BrotliCompressor(level('br'))
+
+    compressors['gzip'] = lambda: zlib.compressobj(
+        level('gzip'), zlib.DEFLATED, zlib.MAX_WBITS | 16
+    )
+
+    return compressors
+
+
+COMPRESSORS = _compressors()
+
+
+def negotiate(accept_encoding):
+    """Returns the available encoding an Accept-Encoding header rates
+    highest, preferring the better compressing one on ties, or None."""
+
+    ratings = {}
+
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().lower().partition(';')
+        quality = 1.0
+
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if coding:
+            ratings[coding.strip()] = quality
+
+    wildcard = ratings.get('*', 0.0)
+    best = None
+    best_quality = 0.0
+
+    for coding in COMPRESSORS:
+        quality = ratings.get(coding, wildcard)
+
+        if quality > best_quality:
+            best, best_quality = coding, quality
+
+    return best
+
+
+def request_encoding(request):
+    """Returns the encoding to compress the response to a request with."""
+
+    return negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+
+def compress(data, encoding):
+    """Compresses bytes with an encoding in one go."""
+
+    compressor = COMPRESSORS[encoding]()
+
+    return compressor.compress(data) + compressor.flush()
+
+
+def iter_compress(chunks, encoding):
+    """Compresses a stream of byte chunks on the fly, yielding output as
+    the compressor produces it."""
+
+    compressor = COMPRESSORS[encoding]()
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def is_compressible(response):
+    """Tells if the content type of a response is worth compressing."""
+
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+
+    return content_type.startswith(settings.COMPRESSION_CONTENT_TYPES)
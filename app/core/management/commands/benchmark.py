@@ -0,0 +1,312 @@
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.management.commands.seed_data import SEED_EMAIL, SEED_PASSWORD
+from core.models import Recipe, Tag
+
+SCENARIOS = (
+    'token', 'recipe-list', 'recipe-list-filtered', 'recipe-detail',
+    'recipe-similar', 'recipe-shopping-list', 'tag-list', 'ingredient-list',
+)
+
+
+def percentile(values, pct):
+    """Returns the nearest-rank percentile of already sorted values."""
+
+    if not values:
+        return None
+
+    rank = max(1, round(pct / 100 * len(values)))
+
+    return values[min(rank, len(values)) - 1]
+
+
+class InProcessTransport:
+    """Sends requests through Django's full handler stack in this process."""
+
+    def __init__(self, host, accept_encoding=None):
+        self.client = Client(HTTP_HOST=host)
+        self.accept_encoding = accept_encoding
+
+    def request(self, method, path, token=None, data=None):
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        queries = []
+
+        if self.accept_encoding:
+            headers['HTTP_ACCEPT_ENCODING'] = self.accept_encoding
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # queries go to the default database and the user's shard
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count))
+
+            if method == 'POST':
+                res = self.client.post(path, data, **headers)
+            else:
+                res = self.client.get(path, **headers)
+
+        size = len(b''.join(res.streaming_content) if res.streaming
+                   else res.content)
+
+        return res.status_code, len(queries), size
+
+
+class HTTPTransport:
+    """Sends requests over HTTP to an already running server."""
+
+    def __init__(self, base_url, accept_encoding=None):
+        self.base_url = base_url.rstrip('/')
+        self.accept_encoding = accept_encoding
+
+    def request(self, method, path, token=None, data=None):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        body = None
+
+        if self.accept_encoding:
+            headers['Accept-Encoding'] = self.accept_encoding
+
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+
+        req = urllib.request.Request(self.base_url + path, data=body,
+                                     headers=headers, method=method)
+
+        try:
+            with urllib.request.urlopen(req) as res:
+                return res.status, None, len(res.read())
+        except urllib.error.HTTPError as exc:
+            return exc.code, None, len(exc.read())
+
+
+class Command(BaseCommand):
+    """Command Django to load test the API routes against seeded users."""
+
+    help = 'Benchmark API latency, throughput and queries per request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='Scenario to run, may be repeated. '
+                                 'Defaults to all of them.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--users', type=int, default=10,
+                            help='Number of seed users to spread load over.')
+        parser.add_argument('--base-url',
+                            help='Benchmark a running server instead of '
+                                 'calling the app in process.')
+        parser.add_argument('--host', default='localhost',
+                            help='Host header for in process requests.')
+        parser.add_argument('--accept-encoding',
+                            help='Accept-Encoding header to send, to '
+                                 'compare bandwidth and CPU per encoding.')
+        parser.add_argument('--throttle', action='store_true',
+                            help='Keep rate limiting on in process. Off by '
+                                 'default, as the requests of every seed '
+                                 'user come from one address.')
+        parser.add_argument('--output', help='Write results as JSON here.')
+        parser.add_argument('--compare',
+                            help='Previous results to check against.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed relative p95 slowdown when '
+                                 'comparing, defaults to 0.2.')
+
+    def handle(self, *args, **options):
+        users = list(get_user_model().objects.filter(
+            email__in=[SEED_EMAIL.format(i) for i in range(options['users'])]
+        ))
+
+        if not users:
+            raise CommandError('No seed users found, run seed_data first.')
+
+        fixtures = [self._fixture(user) for user in users]
+        results = {}
+
+        with ExitStack() as stack:
+            if not options['base_url'] and not options['throttle']:
+                stack.enter_context(override_settings(REST_FRAMEWORK={
+                    **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {},
+                }))
+
+            for scenario in options['scenario'] or SCENARIOS:
+                results[scenario] = self._run(scenario, fixtures, options)
+                self._print(scenario, results[scenario])
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+
+        if options['compare']:
+            self._compare(results, options['compare'], options['tolerance'])
+
+    @staticmethod
+    def _fixture(user):
+        """Collects what the scenarios need to build requests for a user."""
+
+        token, _ = Token.objects.get_or_create(user=user)
+        tags = list(Tag.objects.filter(user=user)
+                    .values_list('id', flat=True)[:3])
+        recipes = list(Recipe.objects.filter(user=user).order_by('id')
+                       .values_list('id', flat=True)[:10])
+
+        return {
+            'email': user.email,
+            'token': token.key,
+            'tags': ','.join(str(tag) for tag in tags),
+            'recipe': recipes[0] if recipes else None,
+            'recipes': ','.join(str(recipe) for recipe in recipes),
+        }
+
+    @staticmethod
+    def _request(scenario, fixture):
+        """Returns the (method, path, token, data) of one scenario request."""
+
+        if scenario == 'token':
+            return 'POST', reverse('user:token'), None, {
+                'email': fixture['email'], 'password': SEED_PASSWORD,
+            }
+
+        if scenario == 'recipe-list-filtered':
+            path = f'{reverse("recipe:recipe-list")}?tags={fixture["tags"]}'
+        elif scenario == 'recipe-detail' and fixture['recipe']:
+            path = reverse('recipe:recipe-detail', args=[fixture['recipe']])
+        elif scenario == 'recipe-similar' and fixture['recipe']:
+            path = reverse('recipe:recipe-similar', args=[fixture['recipe']])
+        elif scenario == 'recipe-shopping-list' and fixture['recipes']:
+            path = f'{reverse("recipe:recipe-shopping-list")}' \
+                f'?ids={fixture["recipes"]}'
+        elif scenario in ('tag-list', 'ingredient-list'):
+            path = reverse(f'recipe:{scenario}')
+        else:
+            path = reverse('recipe:recipe-list')
+
+        return 'GET', path, fixture['token'], None
+
+    def _run(self, scenario, fixtures, options):
+        requests = [
+            self._request(scenario, fixtures[i % len(fixtures)])
+            for i in range(options['requests'])
+        ]
+        concurrency = max(options['concurrency'], 1)
+        workers = [requests[i::concurrency] for i in range(concurrency)]
+
+        def work(batch, transport):
+            samples = []
+
+            for method, path, token, data in batch:
+                started = time.perf_counter()
+                status, queries, size = transport.request(method, path,
+                                                          token, data)
+                samples.append(
+                    (time.perf_counter() - started, status, queries, size)
+                )
+
+            return samples
+
+        def transport():
+            if options['base_url']:
+                return HTTPTransport(options['base_url'],
+                                     options['accept_encoding'])
+            return InProcessTransport(options['host'],
+                                      options['accept_encoding'])
+
+        def threaded_work(batch):
+            try:
+                return work(batch, transport())
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+
+        if concurrency == 1:
+            samples = work(requests, transport())
+        else:
+            with ThreadPoolExecutor(concurrency) as pool:
+                samples = [
+                    sample
+                    for batch in pool.map(threaded_work, workers)
+                    for sample in batch
+                ]
+
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(sample[0] * 1000 for sample in samples
+                           if sample[1] < 400)
+        queries = [sample[2] for sample in samples if sample[2] is not None]
+
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if sample[1] >= 400),
+            'throttled': sum(1 for sample in samples if sample[1] == 429),
+            'throughput': round(len(samples) / elapsed, 2) if elapsed else 0,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'queries_per_request': (
+                round(sum(queries) / len(queries), 2) if queries else None
+            ),
+            'bytes_per_request': (
+                round(sum(sample[3] for sample in samples) / len(samples))
+                if samples else 0
+            ),
+        }
+
+    def _print(self, scenario, result):
+        p50, p95, p99 = (
+            'n/a' if result[key] is None else f'{result[key]:.2f} ms'
+            for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        )
+
+        self.stdout.write(
+            f'{scenario}: {result["throughput"]} req/s, '
+            f'p50 {p50}, p95 {p95}, p99 {p99}, '
+            f'{result["queries_per_request"]} queries/request, '
+            f'{result["bytes_per_request"]} bytes/request, '
+            f'{result["errors"]} errors ({result["throttled"]} throttled)'
+        )
+
+    def _compare(self, results, path, tolerance):
+        """Fails when p95 latency or queries per request got worse."""
+
+        with open(path) as file:
+            baseline = json.load(file)
+
+        regressions = []
+
+        for scenario, result in results.items():
+            previous = baseline.get(scenario)
+
+            if not previous:
+                continue
+
+            if result['p95_ms'] is None:
+                regressions.append(f'{scenario} (no successful requests)')
+            elif previous['p95_ms'] is not None and \
+                    result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f'{scenario} (p95 latency)')
+
+            if (result['queries_per_request'] or 0) > \
+                    (previous['queries_per_request'] or 0):
+                regressions.append(f'{scenario} (queries per request)')
+
+        if regressions:
+            raise CommandError(f'Regressed: {", ".join(regressions)}')
+
+        self.stdout.write(self.style.SUCCESS('No regressions found.'))
@@ -0,0 +1,85 @@
+import os
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.imports import IMPORT_BATCH_SIZE, RecipeImporter, iter_records
+
+
+class Command(BaseCommand):
+    """Command Django to bulk import recipes from an NDJSON or CSV file."""
+
+    help = 'Bulk import recipes, tags and ingredients for a user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or - for stdin.')
+        parser.add_argument('--email', required=True,
+                            help='Email of the user owning the recipes.')
+        parser.add_argument('--format', choices=('ndjson', 'csv'),
+                            help='Input format, guessed from the file '
+                                 'extension when omitted.')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--checkpoint',
+                            help='File recording the number of records '
+                                 'imported, used to resume an import.')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}.')
+
+        path = options['path']
+        input_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+
+        checkpoint = options['checkpoint']
+        start = self._read_checkpoint(checkpoint)
+
+        if start:
+            self.stdout.write(f'Resuming after record {start}...')
+
+        def progress(processed):
+            if checkpoint:
+                self._write_checkpoint(checkpoint, processed)
+            self.stdout.write(f'Imported {processed} records...')
+
+        importer = RecipeImporter(user, batch_size=options['batch_size'])
+
+        stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+
+        try:
+            processed = importer.run(
+                iter_records(stream, input_format),
+                start=start,
+                progress=progress,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Import finished, {processed} records.')
+        )
+
+    @staticmethod
+    def _read_checkpoint(checkpoint):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+
+        with open(checkpoint) as file:
+            return int(file.read().strip() or 0)
+
+    @staticmethod
+    def _write_checkpoint(checkpoint, processed):
+        tmp_path = f'{checkpoint}.tmp'
+
+        with open(tmp_path, 'w') as file:
+            file.write(str(processed))
+
+        os.replace(tmp_path, checkpoint)
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter, so every import is cold like in a new worker
+STARTUP_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+timings = {'startup': time.perf_counter() - started, 'warmup': []}
+if sys.argv[1] == 'warmup':
+    from core import warmup
+    timings['warmup'] = warmup.run()
+print(json.dumps(timings))
+'''
+
+
+def parse_importtime(output):
+    """Returns (module, self_us, cumulative_us) per line of the output of
+    `python -X importtime`."""
+
+    modules = []
+
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        self_us, cumulative_us, module = line[len('import time:'):] \
+            .split('|')
+
+        if self_us.strip().isdigit():
+            modules.append((module.strip(), int(self_us),
+                            int(cumulative_us)))
+
+    return modules
+
+
+class Command(BaseCommand):
+    """Command Django to profile the cold start of a worker process."""
+
+    help = 'Profile the import time and warm-up of a new worker process.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Number of modules and packages to list.')
+        parser.add_argument('--no-warmup', action='store_true',
+                            help='Leave out the warm-up hooks.')
+
+    def handle(self, *args, **options):
+        env = {**os.environ,
+               'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+               'PYTHONPATH': os.pathsep.join(filter(None, sys.path))}
+
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT,
+             'skip' if options['no_warmup'] else 'warmup'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+
+        if result.returncode:
+            raise CommandError(f'Worker failed to start:\n{result.stderr}')
+
+        timings = json.loads(result.stdout.splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+        limit = options['limit']
+
+        packages = {}
+        for module, self_us, _ in modules:
+            package = module.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+
+        self.stdout.write(
+            f'Startup {timings["startup"] * 1000:.1f} ms, '
+            f'{len(modules)} modules imported in '
+            f'{sum(self_us for _, self_us, _ in modules) / 1000:.1f} ms.'
+        )
+
+        self.stdout.write('\nSlowest packages (self ms):')
+        for package, self_us in sorted(packages.items(),
+                                       key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'{self_us / 1000:10.1f}  {package}')
+
+        self.stdout.write('\nSlowest modules (cumulative ms, self ms):')
+        for module, self_us, cumulative_us in sorted(
+                modules, key=lambda item: -item[2])[:limit]:
+            self.stdout.write(f'{cumulative_us / 1000:10.1f} '
+                              f'{self_us / 1000:8.1f}  {module}')
+
+        if timings['warmup']:
+            self.stdout.write('\nWarm-up hooks (ms):')
+            for path, seconds in timings['warmup']:
+                self.stdout.write(f'{seconds * 1000:10.1f}  {path}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.models import AccountPurge
+from core.purge import PURGE_CHUNK_SIZE, run_purge
+
+
+class Command(BaseCommand):
+    """Command Django to delete the data of deactivated accounts."""
+
+    help = 'Run or resume the pending account purges.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int,
+                            default=PURGE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        pending = AccountPurge.objects.filter(finished_at__isnull=True) \
+            .order_by('requested_at')
+
+        def progress(purge):
+            self.stdout.write(
+                f'{purge.email}: {purge.recipes_deleted} recipes, '
+                f'{purge.tags_deleted} tags, '
+                f'{purge.ingredients_deleted} ingredients, '
+                f'{purge.images_deleted} images deleted...'
+            )
+
+        for purge in pending:
+            run_purge(purge, chunk_size=options['chunk_size'],
+                      progress=progress)
+            self.stdout.write(self.style.SUCCESS(f'Purged {purge.email}.'))
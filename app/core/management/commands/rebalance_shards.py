@@ -0,0 +1,110 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import sharding
+from core.rebalance import MOVE_CHUNK_SIZE, MoveFailed, move_user
+
+REBALANCE_BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    """Command Django to move users' data to the shards they hash to."""
+
+    help = 'Move the data of users not on the shard they belong on, after ' \
+           'SHARDS changed or to resume an interrupted run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only list the users that would move.')
+        parser.add_argument('--user', metavar='EMAIL',
+                            help='Move only the user with this email.')
+        parser.add_argument('--batch-size', type=int,
+                            default=REBALANCE_BATCH_SIZE,
+                            help='Users marked as moving at a time.')
+        parser.add_argument('--drain-seconds', type=float, default=2.0,
+                            help='Time given to requests of users just '
+                                 'marked as moving to finish.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=MOVE_CHUNK_SIZE,
+                            help='Rows copied per statement.')
+
+    def handle(self, *args, **options):
+        for option in ('batch_size', 'chunk_size'):
+            if options[option] < 1:
+                raise CommandError(
+                    f'--{option.replace("_", "-")} must be positive.'
+                )
+
+        users = get_user_model().objects.filter(is_active=True) \
+            .order_by('id')
+
+        if options['user']:
+            users = users.filter(email=options['user'])
+
+            if not users.exists():
+                raise CommandError(f'No active user with email '
+                                   f'{options["user"]}.')
+
+        moves = []
+        for user in users.iterator():
+            target = sharding.shard_for(user.pk)
+
+            if user.shard != target or user.moving_to or user.moved_from:
+                moves.append((user, target))
+
+        if options['dry_run']:
+            for user, target in moves:
+                self.stdout.write(f'{user.email}: {user.shard} -> {target}')
+
+            self.stdout.write(f'{len(moves)} users to move.')
+            return
+
+        for alias in settings.SHARDS:
+            sharding.reserve_ids(alias)
+
+        failed = 0
+        batch_size = options['batch_size']
+
+        for start in range(0, len(moves), batch_size):
+            failed += self._move_batch(moves[start:start + batch_size],
+                                       options)
+
+        if failed:
+            raise CommandError(f'{failed} users could not be moved.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {len(moves)} users.'
+        ))
+
+    def _move_batch(self, batch, options):
+        """Moves a batch of users, returns the number that failed."""
+
+        users = get_user_model().objects
+        failed = 0
+
+        # their requests fail with 503 from here on, those already past
+        # authentication are given time to finish
+        for user, target in batch:
+            if user.shard != target and user.moving_to != target:
+                users.filter(pk=user.pk).update(moving_to=target)
+                user.moving_to = target
+
+        time.sleep(options['drain_seconds'])
+
+        for user, target in batch:
+            source = user.shard
+
+            try:
+                move_user(user, target, chunk_size=options['chunk_size'])
+            except MoveFailed as exc:
+                users.filter(pk=user.pk).update(moving_to='')
+                self.stderr.write(f'{user.email}: {exc}')
+                failed += 1
+                continue
+
+            self.stdout.write(f'Moved {user.email}: {source} -> {target}.')
+
+        return failed
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import readmodel, sharding
+
+
+class Command(BaseCommand):
+    """Django command to recompute or check the recipe read model."""
+
+    help = 'Recomputes the cached tag and ingredient lists of all recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report recipes whose read model is stale.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=readmodel.READ_MODEL_CHUNK_SIZE,
+            help='Recipes processed per statement.'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        if options['verify']:
+            stale = []
+            for alias in settings.SHARDS:
+                with sharding.use(alias):
+                    stale.extend(readmodel.verify(chunk_size=chunk_size))
+
+            if stale:
+                raise CommandError(
+                    f'{len(stale)} stale recipes: '
+                    f'{", ".join(map(str, stale[:100]))}'
+                )
+
+            self.stdout.write(self.style.SUCCESS('Read model is up to date.'))
+            return
+
+        total = 0
+        for alias in settings.SHARDS:
+            with sharding.use(alias):
+                total += readmodel.rebuild(chunk_size=chunk_size)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} recipes.'))
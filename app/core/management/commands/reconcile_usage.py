@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import sharding
+from core.models import TagUsage, IngredientUsage
+
+RECONCILE_CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Django command to recompute the tag and ingredient usage counts."""
+
+    help = 'Recomputes the usage counts of all tags and ingredients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=RECONCILE_CHUNK_SIZE,
+            help='Tags or ingredients recounted per statement.'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        for usage in (TagUsage, IngredientUsage):
+            model = usage._meta.get_field(usage.attr_field).related_model
+            total = 0
+
+            for alias in settings.SHARDS:
+                with sharding.use(alias):
+                    total += self._reconcile(usage, model, chunk_size)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Reconciled {total} {model._meta.verbose_name_plural}.'
+            ))
+
+    @staticmethod
+    def _reconcile(usage, model, chunk_size):
+        total = 0
+        last_id = 0
+
+        while True:
+            ids = list(
+                model.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+
+            if not ids:
+                return total
+
+            usage.objects.refresh(ids)
+
+            total += len(ids)
+            last_id = ids[-1]
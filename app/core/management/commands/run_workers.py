@@ -0,0 +1,103 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.module_loading import autodiscover_modules
+
+from core.tasks import Worker
+
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+def _run_worker(threads, burst):
+    """Runs a worker in the current process until a stop signal, or in
+    burst mode until no task is due."""
+
+    worker = Worker(threads=threads, burst=burst)
+
+    for signum in STOP_SIGNALS:
+        signal.signal(signum, lambda *args: worker.stop())
+
+    worker.run()
+
+
+class Command(BaseCommand):
+    """Command Django to run queued background tasks."""
+
+    help = 'Run queued background tasks on a pool of processes and threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes to fork.')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Threads running tasks in every process.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no task is due.')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        threads = options['threads']
+        burst = options['burst']
+
+        if processes < 1 or threads < 1:
+            raise CommandError('Processes and threads must be at least 1.')
+
+        # tasks are registered when the modules defining them are imported
+        autodiscover_modules('tasks')
+
+        self.stdout.write(
+            f'Running tasks on {processes} processes of {threads} threads.'
+        )
+
+        if processes == 1:
+            _run_worker(threads, burst)
+        else:
+            self._supervise(processes, threads, burst)
+
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
+
+    def _supervise(self, processes, threads, burst):
+        """Forks the worker processes, restarting those that die until a
+        stop signal, which is passed on to them."""
+
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+            for process in pool:
+                if process.is_alive():
+                    process.terminate()
+
+        # forked children must not share the parent's connections
+        connections.close_all()
+
+        context = multiprocessing.get_context('fork')
+        pool = [context.Process(target=_run_worker, args=(threads, burst))
+                for _ in range(processes)]
+
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, stop)
+
+        for process in pool:
+            process.start()
+
+        while pool:
+            for index, process in enumerate(pool):
+                process.join(timeout=1.0)
+
+                if process.is_alive():
+                    continue
+
+                if stopping or burst or process.exitcode == 0:
+                    pool.pop(index)
+                    break
+
+                self.stderr.write(
+                    f'Worker {process.pid} exited with {process.exitcode}, '
+                    f'restarting it.'
+                )
+                pool[index] = context.Process(target=_run_worker,
+                                              args=(threads, burst))
+                pool[index].start()
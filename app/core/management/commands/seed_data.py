@@ -0,0 +1,114 @@
+import math
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from recipe.imports import RecipeImporter
+
+SEED_EMAIL = 'seed-user-{}@example.com'
+SEED_PASSWORD = 'seed-pass-123'
+
+TAG_WORDS = (
+    'Vegan', 'Vegetarian', 'Dessert', 'Breakfast', 'Lunch', 'Dinner',
+    'Quick', 'Spicy', 'Healthy', 'Comfort', 'Baking', 'Grill', 'Soup',
+    'Salad', 'Snack', 'Party', 'Gluten Free', 'Low Carb', 'Seafood', 'Kids',
+)
+
+INGREDIENT_WORDS = (
+    'Salt', 'Pepper', 'Olive Oil', 'Butter', 'Garlic', 'Onion', 'Tomato',
+    'Flour', 'Sugar', 'Egg', 'Milk', 'Rice', 'Chicken', 'Beef', 'Prawn',
+    'Ginger', 'Chilli', 'Lemon', 'Lime', 'Coconut', 'Basil', 'Parsley',
+    'Potato', 'Carrot', 'Cheese', 'Yoghurt', 'Honey', 'Soy Sauce', 'Cumin',
+    'Avocado', 'Spinach', 'Mushroom', 'Pasta', 'Bread', 'Cream', 'Vinegar',
+)
+
+TITLE_WORDS = (
+    'Roasted', 'Grilled', 'Spicy', 'Creamy', 'Crispy', 'Slow Cooked',
+    'Baked', 'Fried', 'Steamed', 'Smoked', 'Stuffed', 'Braised',
+)
+
+DISH_WORDS = (
+    'Curry', 'Salad', 'Soup', 'Stew', 'Pie', 'Bowl', 'Tacos', 'Risotto',
+    'Noodles', 'Burger', 'Cake', 'Pancakes', 'Skewers', 'Casserole',
+)
+
+
+def _names(words, count):
+    """Returns `count` distinct names, suffixing words once they run out."""
+
+    return [
+        words[i % len(words)] + (f' {i // len(words)}'
+                                 if i >= len(words) else '')
+        for i in range(count)
+    ]
+
+
+def _zipf_weights(count):
+    """Returns weights making the first names far more common than the last."""
+
+    return [1 / (rank + 1) for rank in range(count)]
+
+
+class Command(BaseCommand):
+    """Command Django to generate a deterministic synthetic data set."""
+
+    help = 'Generate seed users with recipes, tags and ingredients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Mean number of recipes per user.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        password = make_password(SEED_PASSWORD)
+        mean = max(options['recipes'], 1)
+
+        for index in range(options['users']):
+            email = SEED_EMAIL.format(index)
+
+            # draw the numbers even for skipped users to stay deterministic
+            recipe_count = max(1, round(
+                rng.lognormvariate(math.log(mean) - 0.5, 1.0)
+            ))
+            records = self._records(rng, recipe_count)
+
+            user, created = get_user_model().objects.get_or_create(
+                email=email,
+                defaults={'name': f'Seed User {index}', 'password': password}
+            )
+
+            if not created:
+                self.stdout.write(f'Skipping existing user {email}.')
+                continue
+
+            RecipeImporter(user).run(records)
+
+            self.stdout.write(f'Seeded {email} with {recipe_count} recipes.')
+
+        self.stdout.write(self.style.SUCCESS('Seeding finished.'))
+
+    @staticmethod
+    def _records(rng, count):
+        tags = _names(TAG_WORDS, rng.randint(5, 40))
+        ingredients = _names(INGREDIENT_WORDS, rng.randint(20, 150))
+
+        tag_weights = _zipf_weights(len(tags))
+        ingredient_weights = _zipf_weights(len(ingredients))
+
+        return [
+            {
+                'title': f'{rng.choice(TITLE_WORDS)} {rng.choice(DISH_WORDS)}',
+                'time_in_minutes': rng.randint(5, 180),
+                'price': f'{rng.uniform(1, 99):.2f}',
+                'link': '',
+                'tags': rng.choices(tags, tag_weights, k=rng.randint(0, 4)),
+                'ingredients': rng.choices(
+                    ingredients, ingredient_weights, k=rng.randint(2, 12)
+                ),
+            }
+            for _ in range(count)
+        ]
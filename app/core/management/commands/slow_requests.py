@@ -0,0 +1,52 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import TOGGLE_SIGNAL
+
+
+def catches_signal(pid, signum):
+    """Tells if a process has a handler for a signal, None where /proc is
+    not available to tell."""
+
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            for line in file:
+                if line.startswith('SigCgt:'):
+                    return bool(int(line.split()[1], 16) >> (signum - 1) & 1)
+    except OSError:
+        return None
+
+    return None
+
+
+class Command(BaseCommand):
+    """Command Django to toggle the slow request log of worker processes."""
+
+    help = 'Toggle the slow request log of the given worker processes. ' \
+           'Only processes that loaded the app and kept its signal ' \
+           'handler can be toggled, see the Slow request log settings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pids', nargs='+', type=int,
+                            help='Process IDs of the workers to toggle.')
+
+    def handle(self, *args, **options):
+        if TOGGLE_SIGNAL is None:
+            raise CommandError('Toggling is not supported on this platform.')
+
+        for pid in options['pids']:
+            # the default action of the signal terminates the process
+            if catches_signal(pid, TOGGLE_SIGNAL) is False:
+                raise CommandError(
+                    f'Process {pid} has no handler for '
+                    f'{TOGGLE_SIGNAL.name}, it is not a worker running the '
+                    f'app or its server reset the handler.'
+                )
+
+            try:
+                os.kill(pid, TOGGLE_SIGNAL)
+            except OSError as exc:
+                raise CommandError(f'Unable to signal process {pid}: {exc}')
+
+            self.stdout.write(f'Toggled slow request log of process {pid}.')
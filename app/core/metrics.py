@@ -0,0 +1,233 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Requests handled, by route, method and status.'),
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency in seconds, by route.'),
+    'http_request_db_queries_total': (
+        'counter', 'SQL queries issued while handling requests, by route.'),
+    'http_request_db_seconds_total': (
+        'counter', 'Time spent in SQL queries in seconds, by route.'),
+    'http_response_size_bytes_total': (
+        'counter', 'Bytes of non-streaming response bodies, by route.'),
+    'http_cache_hits_total': (
+        'counter', 'Cache hits while handling requests, by route.'),
+    'http_cache_misses_total': (
+        'counter', 'Cache misses while handling requests, by route.'),
+    'tasks_enqueued_total': (
+        'counter', 'Background tasks enqueued, by task.'),
+    'tasks_total': (
+        'counter', 'Background task attempts, by task and outcome.'),
+    'task_duration_seconds': (
+        'histogram', 'Background task run time in seconds, by task.'),
+    'task_queue_delay_seconds': (
+        'histogram', 'Time tasks waited past their due time, by task.'),
+}
+
+
+def _running(path):
+    """Tells if the process that dumped a metrics file still runs."""
+
+    pid = os.path.basename(path)[len('metrics-'):-len('.json')]
+
+    try:
+        os.kill(int(pid), 0)
+    except ValueError:
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # running as another user
+        return True
+
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Registry:
+    """Thread-safe in-process store of counters and histograms.
+
+    When a metrics directory is configured every process periodically dumps
+    its values there, so any worker can serve the totals of all of them.
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._flushed_at = 0.0
+
+    def inc(self, name, labels, value=1):
+        """Adds value to the counter identified by name and labels."""
+
+        key = (name, labels)
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """Records value in the latency histogram of name and labels."""
+
+        key = (name, labels)
+        index = bisect_left(LATENCY_BUCKETS, value)
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = \
+                    [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        """Returns the values of this process in a JSON friendly form."""
+
+        with self._lock:
+            return {
+                'counters': [[name, list(map(list, labels)), value]
+                             for (name, labels), value
+                             in self._counters.items()],
+                'histograms': [[name, list(map(list, labels)), list(values)]
+                               for (name, labels), values
+                               in self._histograms.items()],
+            }
+
+    def maybe_flush(self):
+        """Dumps this process's values when the flush interval elapsed."""
+
+        if self.directory and \
+                time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Atomically writes this process's values to the directory."""
+
+        if not self.directory:
+            return
+
+        self._flushed_at = time.monotonic()
+
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+
+        with open(tmp_path, 'w') as file:
+            json.dump(self.snapshot(), file)
+
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Returns the summed values of every process as a snapshot."""
+
+        snapshots = [self.snapshot()]
+
+        if self.directory:
+            self.flush()
+            own = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory,
+                                               'metrics-*.json')):
+                if not _running(path):
+                    _remove(path)
+                    continue
+
+                try:
+                    with open(path) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    if path == own:
+                        raise
+
+        counters = {}
+        histograms = {}
+
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, [0] * len(values))
+                histograms[key] = [a + b for a, b in zip(total, values)]
+
+        return counters, histograms
+
+    def render(self):
+        """Renders the values of every process in Prometheus text format."""
+
+        counters, histograms = self.collect()
+        lines = []
+
+        for name, (kind, description) in METRICS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values):
+                    cumulative += count
+                    bucket_labels = _labels(labels + (('le', str(bound)),))
+                    lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+
+                lines.append(f'{name}_sum{_labels(labels)} {values[-1]}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    """Formats label pairs as a Prometheus label set."""
+
+    if not labels:
+        return ''
+
+    pairs = ','.join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n')
+        )
+        for key, value in labels
+    )
+
+    return f'{{{pairs}}}'
+
+
+registry = Registry(
+    directory=getattr(settings, 'METRICS_DIR', None),
+    flush_interval=getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0),
+)
+
+
+def record_cache(request, hit):
+    """Counts a cache hit or miss against the route serving request."""
+
+    # DRF requests wrap the HttpRequest the middleware sees
+    request = getattr(request, '_request', request)
+    attr = '_metrics_cache_hits' if hit else '_metrics_cache_misses'
+    setattr(request, attr, getattr(request, attr, 0) + 1)
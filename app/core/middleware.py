@@ -0,0 +1,203 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+
+from core import compression, profiling, responsecache, sharding
+from core.metrics import registry
+
+UNRESOLVED_ROUTE = '<unresolved>'
+
+
+class MetricsMiddleware:
+    """Records latency, SQL usage, response size and cache hits per route."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0, 0.0]
+
+        def track(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - started
+
+        started = time.perf_counter()
+
+        with sharding.execute_wrapper(track):
+            response = self.get_response(request)
+
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = (('route', match.view_name if match else UNRESOLVED_ROUTE),)
+
+        registry.inc('http_requests_total', route + (
+            ('method', request.method), ('status', response.status_code),
+        ))
+        registry.observe('http_request_duration_seconds', route, elapsed)
+
+        if queries[0]:
+            registry.inc('http_request_db_queries_total', route, queries[0])
+            registry.inc('http_request_db_seconds_total', route, queries[1])
+
+        if not response.streaming:
+            registry.inc('http_response_size_bytes_total', route,
+                         len(response.content))
+
+        hits = getattr(request, '_metrics_cache_hits', 0)
+        misses = getattr(request, '_metrics_cache_misses', 0)
+
+        if hits:
+            registry.inc('http_cache_hits_total', route, hits)
+        if misses:
+            registry.inc('http_cache_misses_total', route, misses)
+
+        registry.maybe_flush()
+
+        return response
+
+
+class SlowRequestMiddleware:
+    """Profiles sampled requests and logs those above the slow threshold."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.should_sample():
+            return self.get_response(request)
+
+        return profiling.profile_request(self.get_response, request)
+
+
+class ScopedMiddleware:
+    """Runs the SCOPED_MIDDLEWARE stack only for paths outside of
+    SCOPED_MIDDLEWARE_EXCLUDED_PATHS.
+
+    Sessions, CSRF, authentication and messages only matter to the admin,
+    token authenticated API requests skip them entirely.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.excluded_paths = tuple(settings.SCOPED_MIDDLEWARE_EXCLUDED_PATHS)
+        self.view_hooks = []
+        self.template_response_hooks = []
+        self.exception_hooks = []
+
+        handler = get_response
+
+        for middleware_path in reversed(settings.SCOPED_MIDDLEWARE):
+            middleware = import_string(middleware_path)(handler)
+
+            if hasattr(middleware, 'process_view'):
+                self.view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_hooks.append(
+                    middleware.process_template_response
+                )
+            if hasattr(middleware, 'process_exception'):
+                self.exception_hooks.append(middleware.process_exception)
+
+            handler = convert_exception_to_response(middleware)
+
+        self.scoped_handler = handler
+
+    def _in_scope(self, request):
+        return not request.path_info.startswith(self.excluded_paths)
+
+    def __call__(self, request):
+        if self._in_scope(request):
+            return self.scoped_handler(request)
+
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self._in_scope(request):
+            for hook in self.view_hooks:
+                response = hook(request, view_func, view_args, view_kwargs)
+                if response is not None:
+                    return response
+
+    def process_template_response(self, request, response):
+        if self._in_scope(request):
+            for hook in self.template_response_hooks:
+                response = hook(request, response)
+
+        return response
+
+    def process_exception(self, request, exception):
+        if self._in_scope(request):
+            for hook in self.exception_hooks:
+                response = hook(request, exception)
+                if response is not None:
+                    return response
+
+
+class CompressionMiddleware:
+    """Compresses responses of COMPRESSION_PATHS with the best encoding the
+    client accepts: zstd and Brotli when their libraries are installed,
+    else gzip.
+
+    Bodies smaller than COMPRESSION_MIN_SIZE go as they are, streamed
+    bodies are compressed chunk by chunk. Responses marked with
+    `responsecache.cache_later` are cached once encoded, cached ones are
+    sent as they are.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = tuple(settings.COMPRESSION_PATHS)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if not request.path_info.startswith(self.paths) or \
+                getattr(response, 'precompressed', False):
+            return response
+
+        if compression.is_compressible(response) and \
+                not response.has_header('Content-Encoding'):
+            patch_vary_headers(response, ('Accept-Encoding',))
+            self._compress(request, response)
+
+        responsecache.store(request, response)
+
+        return response
+
+    def _compress(self, request, response):
+        encoding = compression.request_encoding(request)
+
+        if encoding is None:
+            return
+
+        if response.streaming:
+            response.streaming_content = compression.iter_compress(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        elif len(response.content) >= settings.COMPRESSION_MIN_SIZE:
+            content = compression.compress(response.content, encoding)
+
+            if len(content) >= len(response.content):
+                return
+
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        else:
+            return
+
+        etag = response.get('ETag')
+
+        # the encoded bytes differ from those the strong tag stands for
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        response['Content-Encoding'] = encoding
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+INDEXED_COLUMNS = (
+    ('core_tag', 'name'),
+    ('core_ingredient', 'name'),
+    ('core_recipe', 'title'),
+)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    # upper(column) for the admin's case insensitive prefix search
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_upper_like '
+            f'ON {table} (UPPER({column}::text) text_pattern_ops)',
+            f'DROP INDEX IF EXISTS {table}_{column}_upper_like',
+        )
+        for table, column in INDEXED_COLUMNS
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.14 on 2026-10-19 10:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPurge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=255)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('recipes_deleted', models.PositiveIntegerField(default=0)),
+                ('tags_deleted', models.PositiveIntegerField(default=0)),
+                ('ingredients_deleted', models.PositiveIntegerField(default=0)),
+                ('images_deleted', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,80 @@
+from django.db import migrations, models
+
+RELATIONS = (
+    ('Tag', 'tags', 'tag_id'),
+    ('Ingredient', 'ingredients', 'ingredient_id'),
+)
+
+
+def normalize_name(name):
+    return ' '.join(name.split()).lower()
+
+
+def merge_duplicates(apps, schema_editor):
+    """Fills in normalized names and folds the rows that collide into the
+    oldest one, so the unique constraint can be added."""
+
+    Recipe = apps.get_model('core', 'Recipe')
+
+    for model_name, relation, column in RELATIONS:
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+
+        kept = {}
+        merged = {}
+
+        for obj in model.objects.order_by('id').iterator():
+            obj.normalized_name = normalize_name(obj.name)
+            key = (obj.user_id, obj.normalized_name)
+
+            if key in kept:
+                merged.setdefault(kept[key], []).append(obj.id)
+            else:
+                kept[key] = obj.id
+                obj.save(update_fields=['normalized_name'])
+
+        for target, sources in merged.items():
+            linked = set(
+                through.objects.filter(**{column: target})
+                .values_list('recipe_id', flat=True)
+            )
+
+            for row in through.objects.filter(**{f'{column}__in': sources}):
+                if row.recipe_id not in linked:
+                    linked.add(row.recipe_id)
+                    through.objects.create(recipe_id=row.recipe_id,
+                                           **{column: target})
+
+            through.objects.filter(**{f'{column}__in': sources}).delete()
+            model.objects.filter(id__in=sources).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_accountpurge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'normalized_name'), name='core_ingredient_user_normalized_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'normalized_name'), name='core_tag_user_normalized_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 3.0.14 on 2026-10-19 10:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+SYNCED_TABLES = (
+    ('recipe', 'core_recipe'),
+    ('tag', 'core_tag'),
+    ('ingredient', 'core_ingredient'),
+)
+
+
+def fill_changes(apps, schema_editor):
+    """Puts every existing object on the change feed, so a first sync from
+    cursor 0 returns it."""
+
+    for kind, table in SYNCED_TABLES:
+        schema_editor.execute(
+            f'INSERT INTO core_syncchange (user_id, kind, object_id, deleted) '
+            f'SELECT user_id, %s, id, %s FROM {table} ORDER BY id',
+            [kind, False]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_attr_normalized_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=10)),
+                ('object_id', models.IntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'updated_at'], name='ingredient_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'updated_at'], name='recipe_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'updated_at'], name='tag_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='syncchange',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['user', 'id'], name='syncchange_user_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='syncchange',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='core_syncchange_kind_object_uniq'),
+        ),
+        migrations.RunPython(fill_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.0.14 on 2026-10-19 10:59
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+RELATIONS = (
+    ('tag', 'core_recipe_tags', 'core_tag'),
+    ('ingredient', 'core_recipe_ingredients', 'core_ingredient'),
+)
+
+
+def fill_read_model(apps, schema_editor):
+    """Computes the cached lists of every existing recipe."""
+
+    for name, through, table in RELATIONS:
+        schema_editor.execute(
+            f'UPDATE core_recipe SET (cached_{name}_ids, cached_{name}_names) '
+            f"= (SELECT COALESCE(array_agg(a.id ORDER BY a.id), '{{}}'), "
+            f"COALESCE(array_agg(a.name ORDER BY a.id), '{{}}') "
+            f'FROM {through} r INNER JOIN {table} a '
+            f'ON a.id = r.{name}_id WHERE r.recipe_id = core_recipe.id)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_sync_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='cached_ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='cached_ingredient_names',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='cached_tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='cached_tag_names',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), default=list, editable=False, size=None),
+        ),
+        migrations.RunPython(fill_read_model, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['cached_tag_ids'], name='recipe_cached_tag_ids_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['cached_ingredient_ids'], name='recipe_cached_ingr_ids_idx'),
+        ),
+    ]
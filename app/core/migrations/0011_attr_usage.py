@@ -0,0 +1,64 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+RELATIONS = (
+    ('tag', 'core_recipe_tags', 'core_tag', 'core_tagusage'),
+    ('ingredient', 'core_recipe_ingredients', 'core_ingredient',
+     'core_ingredientusage'),
+)
+
+
+def fill_usage(apps, schema_editor):
+    """Counts the recipes of every tag and ingredient in use."""
+
+    for name, through, table, usage in RELATIONS:
+        schema_editor.execute(
+            f'INSERT INTO {usage} ({name}_id, user_id, count) '
+            f'SELECT a.id, a.user_id, COUNT(*) FROM {table} a '
+            f'INNER JOIN {through} r ON r.{name}_id = a.id '
+            f'GROUP BY a.id, a.user_id'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_read_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.Tag')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredientUsage',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.Ingredient')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tagusage',
+            index=models.Index(fields=['user', '-count'], name='tagusage_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredientusage',
+            index=models.Index(fields=['user', '-count'], name='ingredientusage_user_count_idx'),
+        ),
+        migrations.RunPython(fill_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='moving_to',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='shard',
+            field=models.CharField(default='default', editable=False, max_length=100),
+        ),
+    ]
@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# tables partitioned by user_id hash, each split this many ways
+PARTITIONED_TABLES = ('core_recipe', 'core_tag', 'core_ingredient',
+                      'core_recipe_tags', 'core_recipe_ingredients')
+PARTITIONS = 8
+
+LINKS = (
+    ('core_recipe_tags', 'tag_id', 'core_recipetag_uniq'),
+    ('core_recipe_ingredients', 'ingredient_id', 'core_recipeingredient_uniq'),
+)
+
+# foreign keys into the partitioned tables, which reference their whole
+# primary key (id, user_id). Links to tags and ingredients get none, as a
+# recipe may use another user's, whose user_id the link does not hold.
+FOREIGN_KEYS = (
+    ('core_recipe_tags', 'recipe_id', 'core_recipe'),
+    ('core_recipe_ingredients', 'recipe_id', 'core_recipe'),
+    ('core_tagusage', 'tag_id', 'core_tag'),
+    ('core_ingredientusage', 'ingredient_id', 'core_ingredient'),
+)
+
+
+def link_users(apps, schema_editor):
+    """Gives the link tables the user owning the recipe, their partition
+    key, and makes it part of their unique constraint."""
+
+    with schema_editor.connection.cursor() as cursor:
+        for table, column, unique in LINKS:
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE contype = 'u' "
+                "AND conrelid = %s::regclass",
+                [table]
+            )
+            old_uniques = [row[0] for row in cursor.fetchall()]
+
+            schema_editor.execute(
+                f'ALTER TABLE {table} ADD COLUMN user_id integer NULL'
+            )
+            schema_editor.execute(
+                f'UPDATE {table} SET user_id = r.user_id FROM core_recipe r '
+                f'WHERE r.id = {table}.recipe_id'
+            )
+            schema_editor.execute(
+                f'ALTER TABLE {table} ALTER COLUMN user_id SET NOT NULL'
+            )
+            schema_editor.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {table}_user_id_fk '
+                f'FOREIGN KEY (user_id) REFERENCES core_user (id) '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
+            schema_editor.execute(
+                f'CREATE INDEX {table}_user_id ON {table} (user_id)'
+            )
+
+            for name in old_uniques:
+                schema_editor.execute(
+                    f'ALTER TABLE {table} DROP CONSTRAINT {name}'
+                )
+
+            schema_editor.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {unique} '
+                f'UNIQUE (user_id, recipe_id, {column})'
+            )
+
+
+def _partition(cursor, schema_editor, table):
+    """Replaces a table with one partitioned by user_id hash holding its
+    rows, indexes and constraints, keeping its ID sequence.
+
+    PostgreSQL requires primary keys and unique constraints of partitioned
+    tables to include the partition key, user_id is added where missing.
+    """
+
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(c.oid), ARRAY("
+        "SELECT attname FROM pg_attribute WHERE attrelid = c.conrelid "
+        "AND attnum = ANY(c.conkey)) "
+        "FROM pg_constraint c WHERE c.conrelid = %s::regclass "
+        "AND c.contype IN ('p', 'u', 'f') ORDER BY c.contype DESC",
+        [table]
+    )
+    constraints = cursor.fetchall()
+
+    cursor.execute(
+        'SELECT indexdef FROM pg_indexes WHERE tablename = %s '
+        'AND indexname NOT IN (SELECT conname FROM pg_constraint '
+        'WHERE conrelid = %s::regclass)',
+        [table, table]
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    sequence = cursor.fetchone()[0]
+
+    old = f'{table}_unpartitioned'
+
+    schema_editor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    schema_editor.execute(
+        f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS '
+        f'INCLUDING CONSTRAINTS) PARTITION BY HASH (user_id)'
+    )
+
+    for remainder in range(PARTITIONS):
+        schema_editor.execute(
+            f'CREATE TABLE {table}_p{remainder} PARTITION OF {table} '
+            f'FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})'
+        )
+
+    schema_editor.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    schema_editor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    schema_editor.execute(f'DROP TABLE {old}')
+
+    for name, definition, columns in constraints:
+        if definition.startswith(('PRIMARY KEY', 'UNIQUE')) and \
+                'user_id' not in columns:
+            definition = definition.replace(')', ', user_id)', 1)
+
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+        )
+
+    for definition in indexes:
+        schema_editor.execute(definition)
+
+
+def partition_tables(apps, schema_editor):
+    """Partitions users' recipes, tags, ingredients and their links by
+    user_id hash.
+
+    IDs stop being unique constraints, so the foreign keys pointing at
+    them are replaced by ones on (id, user_id) where the referencing rows
+    hold the user_id of the row they point at.
+    """
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid::regclass::text = ANY(%s)",
+            [list(PARTITIONED_TABLES)]
+        )
+
+        for table, name in cursor.fetchall():
+            schema_editor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+
+        for table in PARTITIONED_TABLES:
+            _partition(cursor, schema_editor, table)
+
+    for table, column, parent in FOREIGN_KEYS:
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_user_fk '
+            f'FOREIGN KEY ({column}, user_id) REFERENCES {parent} '
+            f'(id, user_id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_user_shard'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(link_users),
+                migrations.RunPython(partition_tables),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='ingredientusage',
+                    name='ingredient',
+                    field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.Ingredient'),
+                ),
+                migrations.AlterField(
+                    model_name='tagusage',
+                    name='tag',
+                    field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.Tag'),
+                ),
+                migrations.CreateModel(
+                    name='RecipeTag',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('recipe', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='core.Recipe')),
+                        ('tag', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='core.Tag')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'core_recipe_tags',
+                    },
+                ),
+                migrations.CreateModel(
+                    name='RecipeIngredient',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('ingredient', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='core.Ingredient')),
+                        ('recipe', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='core.Recipe')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'core_recipe_ingredients',
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='ingredients',
+                    field=models.ManyToManyField(through='core.RecipeIngredient', to='core.Ingredient'),
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='tags',
+                    field=models.ManyToManyField(through='core.RecipeTag', to='core.Tag'),
+                ),
+                migrations.AddConstraint(
+                    model_name='recipetag',
+                    constraint=models.UniqueConstraint(fields=('user', 'recipe', 'tag'), name='core_recipetag_uniq'),
+                ),
+                migrations.AddConstraint(
+                    model_name='recipeingredient',
+                    constraint=models.UniqueConstraint(fields=('user', 'recipe', 'ingredient'), name='core_recipeingredient_uniq'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_partition_user_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='moved_from',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+    ]
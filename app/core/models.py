@@ -1,11 +1,17 @@
 import os
 import uuid
+from contextlib import contextmanager
 
 from django.conf import settings
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin
 )
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import connections, models
+from django.utils import timezone
+
+from core.sharding import connection
 
 
 def image_file_path(instance, filename):
@@ -18,7 +24,33 @@ def image_file_path(instance, filename):
     return os.path.join('uploads/images/', new_filename)
 
 
-class UserManager(BaseUserManager):
+# users being deleted, whose objects need no tombstones
+deleting_users = set()
+
+
+@contextmanager
+def deleting(user_ids):
+    """Marks users as being deleted while the block runs, whether or not
+    the deletion goes through."""
+
+    user_ids = set(user_ids) - deleting_users
+    deleting_users.update(user_ids)
+
+    try:
+        yield
+    finally:
+        deleting_users.difference_update(user_ids)
+
+
+class UserQuerySet(models.QuerySet):
+    """QuerySet of users marking those it deletes as being deleted."""
+
+    def delete(self):
+        with deleting(self.values_list('pk', flat=True)):
+            return super().delete()
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """Manager class for custom User model."""
 
     def create_user(self, email, password=None, **extra_fields):
@@ -50,20 +82,118 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # database alias of the shard holding the user's data, the one it is
+    # being moved to by `manage.py rebalance_shards`, and the one a move
+    # still has to delete it from
+    shard = models.CharField(max_length=100, default='default',
+                             editable=False)
+    moving_to = models.CharField(max_length=100, blank=True, editable=False)
+    moved_from = models.CharField(max_length=100, blank=True, editable=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    def delete(self, *args, **kwargs):
+        with deleting([self.pk]):
+            return super().delete(*args, **kwargs)
 
-class Tag(models.Model):
-    """Tag model, to be used for a recipe."""
+
+def normalize_name(name):
+    """Returns the form of a tag or ingredient name that must be unique per
+    user: surrounding and repeated whitespace dropped, lower case."""
+
+    return ' '.join(name.split()).lower()
+
+
+class RecipeAttrManager(models.Manager):
+    """Manager for recipe attributes, which are unique by normalized name."""
+
+    def get_or_create_names(self, user, names):
+        """Returns the user's objects for the given names as a dict keyed by
+        normalized name, creating the missing ones.
+
+        This is one INSERT ... ON CONFLICT DO NOTHING RETURNING for the new
+        names plus one SELECT for the ones that already existed.
+        """
+
+        wanted = {}
+        for name in names:
+            wanted.setdefault(normalize_name(name), name.strip())
+
+        if not wanted:
+            return {}
+
+        objs = [self.model(user=user, name=name, normalized_name=key)
+                for key, name in wanted.items()]
+        found = {}
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        now = timezone.now()
+        values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(objs))
+        params = [value for obj in objs
+                  for value in (obj.name, obj.normalized_name, user.pk,
+                                now, now)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (name, normalized_name, user_id, '
+                f'created_at, updated_at) VALUES {values} '
+                f'ON CONFLICT (user_id, normalized_name) DO NOTHING '
+                f'RETURNING id, name, normalized_name',
+                params
+            )
+            for obj_id, name, key in cursor.fetchall():
+                found[key] = self.model(id=obj_id, name=name,
+                                        normalized_name=key, user=user)
+
+        created = [obj.id for obj in found.values()]
+
+        missing = [key for key in wanted if key not in found]
+
+        if missing:
+            found.update(
+                (obj.normalized_name, obj) for obj in
+                self.filter(user=user, normalized_name__in=missing)
+            )
+
+        SyncChange.objects.record(user.pk, self.model._meta.model_name,
+                                  created)
+
+        return found
+
+
+class RecipeAttr(models.Model):
+    """Base of the named objects a user attaches to recipes."""
 
     name = models.CharField(max_length=255)
+    normalized_name = models.CharField(max_length=255, editable=False)
     user = models.ForeignKey(to=settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
-    objects = models.Manager()
+    objects = RecipeAttrManager()
+
+    class Meta:
+        abstract = True
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'normalized_name'),
+                name='%(app_label)s_%(class)s_user_normalized_name_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=('user', 'updated_at'),
+                         name='%(class)s_user_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Keeps the normalized name in step with the name."""
+
+        self.normalized_name = normalize_name(self.name)
+
+        super().save(*args, **kwargs)
 
     def __str__(self):
         """Defines the string representation of an object."""
@@ -71,19 +201,54 @@ class Tag(models.Model):
         return self.name
 
 
-class Ingredient(models.Model):
+class Tag(RecipeAttr):
+    """Tag model, to be used for a recipe."""
+
+
+class Ingredient(RecipeAttr):
     """Ingredient model, to be used in a recipe."""
 
-    name = models.CharField(max_length=255)
-    user = models.ForeignKey(to=settings.AUTH_USER_MODEL,
-                             on_delete=models.CASCADE)
 
-    objects = models.Manager()
+class RecipeManager(models.Manager):
+    """Manager for recipes."""
 
-    def __str__(self):
-        """Defines the string representation of an object."""
+    def bump_version(self, recipe, expected=None):
+        """Moves a recipe to its next version, returns False instead if
+        expected versions are given and it has none of them.
 
-        return self.name
+        The UPDATE locks the row until the transaction ends, so of two
+        concurrent writers expecting the same version the second fails as
+        soon as the first commits. The version and read model columns are
+        reloaded onto the instance, as they were when the lock was taken.
+        """
+
+        where = 'id = %s'
+        params = [recipe.pk]
+
+        if expected is not None:
+            if not expected:
+                return False
+
+            placeholders = ', '.join(['%s'] * len(expected))
+            where += f' AND version IN ({placeholders})'
+            params.extend(expected)
+
+        fields = ['version', 'cached_tag_ids', 'cached_tag_names',
+                  'cached_ingredient_ids', 'cached_ingredient_names']
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql = f'UPDATE {table} SET version = version + 1 WHERE {where}'
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} RETURNING {", ".join(fields)}', params)
+            row = cursor.fetchone()
+
+        if not row:
+            return False
+
+        for name, value in zip(fields, row):
+            setattr(recipe, name, value)
+
+        return True
 
 
 class Recipe(models.Model):
@@ -95,15 +260,491 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     image = models.ImageField(null=True, upload_to=image_file_path)
 
-    ingredients = models.ManyToManyField(Ingredient)
-    tags = models.ManyToManyField(Tag)
+    ingredients = models.ManyToManyField(Ingredient,
+                                         through='RecipeIngredient')
+    tags = models.ManyToManyField(Tag, through='RecipeTag')
+
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # bumped by every write through the API, sent as the ETag
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    # read model of the relations above, ordered by ID, see core.readmodel
+    cached_tag_ids = ArrayField(models.IntegerField(), default=list,
+                                editable=False)
+    cached_tag_names = ArrayField(models.CharField(max_length=255),
+                                  default=list, editable=False)
+    cached_ingredient_ids = ArrayField(models.IntegerField(), default=list,
+                                       editable=False)
+    cached_ingredient_names = ArrayField(models.CharField(max_length=255),
+                                         default=list, editable=False)
+
+    objects = RecipeManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('user', 'updated_at'),
+                         name='recipe_user_updated_idx'),
+            # serve the tags and ingredients filters of the recipe list
+            GinIndex(fields=('cached_tag_ids',),
+                     name='recipe_cached_tag_ids_idx'),
+            GinIndex(fields=('cached_ingredient_ids',),
+                     name='recipe_cached_ingr_ids_idx'),
+        ]
+
+    def __str__(self):
+        """Defines the string representation of an object."""
+
+        return self.title
+
 
+class RecipeLinkQuerySet(models.QuerySet):
+    """QuerySet of the links of recipes to tags or ingredients."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Fills in the user of links made by the related managers, like
+        recipe.tags.add(), from their recipes."""
+
+        objs = list(objs)
+        recipe_ids = {obj.recipe_id for obj in objs if obj.user_id is None}
+
+        if recipe_ids:
+            owners = dict(Recipe.objects.using(self.db)
+                          .filter(id__in=recipe_ids)
+                          .values_list('id', 'user_id'))
+
+            for obj in objs:
+                if obj.user_id is None:
+                    obj.user_id = owners.get(obj.recipe_id)
+
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class RecipeLink(models.Model):
+    """Base of the links of recipes to their tags or ingredients.
+
+    The tables are partitioned by user, like those of recipes, tags and
+    ingredients, so every link carries the user owning its recipe, which
+    must be known when it is inserted. Partitioned tables are only unique
+    on (id, user_id), so the database checks links against their recipe
+    on both, see migration 0015. A recipe may use other users' tags and
+    ingredients, so links to those are not checked by the database and
+    whatever deletes tags or ingredients deletes their links too.
+    """
+
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE,
+                               db_constraint=False)
     user = models.ForeignKey(to=settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
 
+    objects = RecipeLinkQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """Links the recipe's user, unless given."""
+
+        if self.user_id is None:
+            self.user_id = self.recipe.user_id
+
+        super().save(*args, **kwargs)
+
+
+class RecipeTag(RecipeLink):
+    """Link of a recipe to a tag."""
+
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE,
+                            db_constraint=False)
+
+    class Meta:
+        db_table = 'core_recipe_tags'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'recipe', 'tag'),
+                                    name='core_recipetag_uniq'),
+        ]
+
+
+class RecipeIngredient(RecipeLink):
+    """Link of a recipe to an ingredient."""
+
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE,
+                                   db_constraint=False)
+
+    class Meta:
+        db_table = 'core_recipe_ingredients'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'recipe', 'ingredient'),
+                                    name='core_recipeingredient_uniq'),
+        ]
+
+
+class AttrUsageManager(models.Manager):
+    """Manager for the usage counts of tags or ingredients.
+
+    Counts are moved by the recipe links being added or removed: callers
+    pass the recipes and/or tags or ingredients whose through rows change,
+    and every statement counts those rows in the through table.
+    """
+
+    def _link_filter(self, column, recipe_ids, attr_ids):
+        clauses = []
+        params = []
+
+        for name, ids in (('recipe_id', recipe_ids), (column, attr_ids)):
+            if ids is not None:
+                ids = list(ids)
+                placeholders = ', '.join(['%s'] * len(ids))
+                clauses.append(f'r.{name} IN ({placeholders})')
+                params.extend(ids)
+
+        return ' AND '.join(clauses) or '1 = 1', params
+
+    def _tables(self):
+        quote = connection.ops.quote_name
+        attr_field = self.model._meta.get_field(self.model.attr_field)
+        through = getattr(Recipe, self.model.relation).through
+
+        return (quote(self.model._meta.db_table),
+                quote(attr_field.related_model._meta.db_table),
+                quote(through._meta.db_table),
+                attr_field.column)
+
+    def count_links(self, recipe_ids=None, attr_ids=None):
+        """Adds the matching links, after they were inserted, to the counts
+        of their tags or ingredients."""
+
+        if recipe_ids is not None and not recipe_ids or \
+                attr_ids is not None and not attr_ids:
+            return
+
+        table, attr_table, through_table, column = self._tables()
+        where, params = self._link_filter(column, recipe_ids, attr_ids)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({column}, user_id, count) '
+                f'SELECT a.id, a.user_id, COUNT(*) FROM {through_table} r '
+                f'INNER JOIN {attr_table} a ON a.id = r.{column} '
+                f'WHERE {where} GROUP BY a.id, a.user_id '
+                f'ON CONFLICT ({column}) DO UPDATE SET '
+                f'count = {table}.count + EXCLUDED.count',
+                params
+            )
+
+    def uncount_links(self, recipe_ids=None, attr_ids=None):
+        """Subtracts the matching links, before they are deleted, from the
+        counts of their tags or ingredients."""
+
+        if recipe_ids is not None and not recipe_ids or \
+                attr_ids is not None and not attr_ids:
+            return
+
+        table, _, through_table, column = self._tables()
+        where, params = self._link_filter(column, recipe_ids, attr_ids)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET count = GREATEST(count - ('
+                f'SELECT COUNT(*) FROM {through_table} r '
+                f'WHERE r.{column} = {table}.{column} AND {where}), 0) '
+                f'WHERE {column} IN (SELECT r.{column} FROM {through_table} r '
+                f'WHERE {where})',
+                [*params, *params]
+            )
+
+    def uncount(self, attr_ids):
+        """Subtracts one link from the counts of each of the given tags or
+        ingredients, for links of a single recipe already deleted."""
+
+        attr_ids = list(attr_ids)
+
+        if not attr_ids:
+            return
+
+        table, _, _, column = self._tables()
+        placeholders = ', '.join(['%s'] * len(attr_ids))
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET count = GREATEST(count - 1, 0) '
+                f'WHERE {column} IN ({placeholders})',
+                attr_ids
+            )
+
+    def refresh(self, attr_ids):
+        """Recomputes the counts of tags or ingredients from the through
+        table."""
+
+        attr_ids = list(attr_ids)
+
+        if not attr_ids:
+            return
+
+        table, attr_table, through_table, column = self._tables()
+        placeholders = ', '.join(['%s'] * len(attr_ids))
+        select = (
+            f'SELECT a.id, a.user_id, (SELECT COUNT(*) FROM {through_table} '
+            f'r WHERE r.{column} = a.id) FROM {attr_table} a '
+            f'WHERE a.id IN ({placeholders})'
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({column}, user_id, count) '
+                f'{select} ON CONFLICT ({column}) DO UPDATE SET '
+                f'count = EXCLUDED.count',
+                attr_ids
+            )
+
+    def top(self, user, limit):
+        """Returns the user's most used tags or ingredients as dicts with
+        their ID, name and count, most used first."""
+
+        attr_field = self.model.attr_field
+
+        rows = self.filter(user=user, count__gt=0) \
+            .order_by('-count', attr_field) \
+            .values_list(attr_field, f'{attr_field}__name', 'count')[:limit]
+
+        return [{'id': attr_id, 'name': name, 'count': count}
+                for attr_id, name, count in rows]
+
+
+class AttrUsage(models.Model):
+    """Base of the number of recipes using a tag or ingredient, kept up to
+    date by signal handlers and the bulk write paths, see core.signals."""
+
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+
+    objects = AttrUsageManager()
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=('user', '-count'),
+                         name='%(class)s_user_count_idx'),
+        ]
+
+    def __str__(self):
+        """Defines the string representation of an object."""
+
+        return f'{getattr(self, self.attr_field)}: {self.count}'
+
+
+class TagUsage(AttrUsage):
+    """Number of recipes using a tag."""
+
+    attr_field = 'tag'
+    relation = 'tags'
+
+    tag = models.OneToOneField(Tag, primary_key=True,
+                               on_delete=models.CASCADE,
+                               db_constraint=False, related_name='usage')
+
+
+class IngredientUsage(AttrUsage):
+    """Number of recipes using an ingredient."""
+
+    attr_field = 'ingredient'
+    relation = 'ingredients'
+
+    ingredient = models.OneToOneField(Ingredient, primary_key=True,
+                                      on_delete=models.CASCADE,
+                                      db_constraint=False,
+                                      related_name='usage')
+
+
+class SyncChangeManager(models.Manager):
+    """Manager for the sync change feed."""
+
+    def record(self, user_id, kind, object_ids, deleted=False):
+        """Moves objects of a kind to the head of their user's change feed,
+        as changed or as deleted, in one statement giving existing rows a
+        new ID.
+
+        The statement first takes a lock on the user's feed held until the
+        transaction ends, so the IDs of a user's changes are drawn in the
+        order they commit. Otherwise a transaction drawing an ID and
+        committing after another that drew a higher one would add a change
+        behind the cursor of a client that synced in between.
+        """
+
+        object_ids = list(dict.fromkeys(object_ids))
+
+        if not object_ids:
+            return
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        values = ', '.join(['(%s, %s, %s, %s)'] * len(object_ids))
+        params = [value for object_id in object_ids
+                  for value in (user_id, kind, object_id, deleted)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH feed_lock AS (SELECT pg_advisory_xact_lock('
+                f'hashtext(%s), %s)) '
+                f'INSERT INTO {table} (user_id, kind, object_id, deleted) '
+                f'SELECT v.* FROM (VALUES {values}) v CROSS JOIN feed_lock '
+                f'ON CONFLICT (kind, object_id) DO UPDATE SET '
+                f"id = nextval(pg_get_serial_sequence(%s, 'id')), "
+                f'user_id = EXCLUDED.user_id, deleted = EXCLUDED.deleted',
+                [self.model._meta.db_table, user_id, *params,
+                 self.model._meta.db_table]
+            )
+
+
+class SyncChange(models.Model):
+    """Latest change of a user's recipe, tag or ingredient.
+
+    Every object has at most one row, which moves to the head of the feed
+    (gets a new, higher ID) each time the object changes. The ID is the
+    sync cursor; rows of deleted objects are kept as tombstones.
+
+    Saves and deletes are recorded by signal handlers. A recipe's tags and
+    ingredients change together with a save of the recipe in the API and
+    the admin; code changing them on their own, or writing rows with raw
+    SQL or bulk operations, records the change itself.
+    """
+
+    KIND_CHOICES = (
+        ('recipe', 'Recipe'),
+        ('tag', 'Tag'),
+        ('ingredient', 'Ingredient'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    deleted = models.BooleanField(default=False)
+
+    objects = SyncChangeManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('kind', 'object_id'),
+                                    name='core_syncchange_kind_object_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=('user', 'id'), name='syncchange_user_id_idx'),
+        ]
+
+    def __str__(self):
+        """Defines the string representation of an object."""
+
+        return f'{self.kind} {self.object_id}'
+
+
+class AccountPurge(models.Model):
+    """Progress of the chunked background deletion of a user's data."""
+
+    user = models.OneToOneField(to=settings.AUTH_USER_MODEL, null=True,
+                                on_delete=models.SET_NULL)
+    email = models.EmailField(max_length=255)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    recipes_deleted = models.PositiveIntegerField(default=0)
+    tags_deleted = models.PositiveIntegerField(default=0)
+    ingredients_deleted = models.PositiveIntegerField(default=0)
+    images_deleted = models.PositiveIntegerField(default=0)
+
     objects = models.Manager()
 
     def __str__(self):
         """Defines the string representation of an object."""
 
-        return self.title
+        return self.email
+
+
+class TaskManager(models.Manager):
+    """Manager for the background task queue."""
+
+    def claim(self, now):
+        """Marks the most urgent task due at now as running and returns
+        its (id, name, arguments, priority, run_at, attempts, max_attempts),
+        or None if no task is due.
+
+        This is one statement, skipping the rows other workers have locked.
+        """
+
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = ('id', 'name', 'arguments', 'priority', 'run_at',
+                   'attempts', 'max_attempts')
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET status = 'running', "
+                f'attempts = attempts + 1, started_at = %s '
+                f'WHERE id = (SELECT id FROM {table} '
+                f"WHERE status = 'queued' AND run_at <= %s "
+                f'ORDER BY priority DESC, run_at, id LIMIT 1 '
+                f'FOR UPDATE SKIP LOCKED) '
+                f'RETURNING {", ".join(columns)}',
+                [now, now]
+            )
+            return cursor.fetchone()
+
+    def requeue_stale(self, before):
+        """Puts back tasks whose worker started them before a time and
+        presumably died, failing those out of attempts."""
+
+        stale = self.filter(status='running', started_at__lt=before)
+
+        stale.filter(attempts__gte=models.F('max_attempts')).update(
+            status='failed', finished_at=timezone.now(),
+            last_error='Timed out.'
+        )
+
+        return stale.update(status='queued', started_at=None)
+
+
+class Task(models.Model):
+    """A call of a background task waiting for, or being run by, a worker.
+
+    Rows of finished tasks are deleted, those of tasks out of attempts are
+    kept as failed along with their last error.
+    """
+
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=255)
+    arguments = models.TextField(default='{}')
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    objects = TaskManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('-priority', 'run_at', 'id'),
+                         name='task_queued_idx',
+                         condition=models.Q(status='queued')),
+            models.Index(fields=('started_at',), name='task_running_idx',
+                         condition=models.Q(status='running')),
+        ]
+
+    def __str__(self):
+        """Defines the string representation of an object."""
+
+        return f'{self.name} ({self.status})'
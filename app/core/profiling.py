@@ -0,0 +1,182 @@
+import cProfile
+import json
+import logging
+import pstats
+import random
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from core import sharding
+
+logger = logging.getLogger('slow_requests')
+
+TOGGLE_SIGNAL = getattr(signal, 'SIGUSR2', None)
+
+PROFILE_ENTRIES = 15
+
+
+class SlowRequestLog:
+    """Per-process switch and rate limiter of the slow request log."""
+
+    def __init__(self, enabled=False, interval=10.0):
+        self.enabled = enabled
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._logged_at = None
+
+    def toggle(self, *args):
+        """Flips the log on or off, usable as a signal handler."""
+
+        self.enabled = not self.enabled
+
+    def allow(self):
+        """Returns whether an entry may be logged now, at most one per
+        interval."""
+
+        now = time.monotonic()
+
+        with self._lock:
+            if self._logged_at is not None and \
+                    now - self._logged_at < self.interval:
+                return False
+
+            self._logged_at = now
+            return True
+
+
+state = SlowRequestLog(
+    enabled=getattr(settings, 'SLOW_REQUEST_LOG_ENABLED', False),
+    interval=getattr(settings, 'SLOW_REQUEST_LOG_INTERVAL', 10.0),
+)
+
+
+def install_signal_handler():
+    """Lets the slow request log be toggled by sending the process a
+    signal.
+
+    Called when the app is loaded and again as a warm-up hook, as servers
+    like gunicorn reset the signal handlers of the workers they fork.
+    """
+
+    if TOGGLE_SIGNAL is not None and \
+            threading.current_thread() is threading.main_thread():
+        signal.signal(TOGGLE_SIGNAL, state.toggle)
+
+
+def should_sample():
+    """Returns whether the current request should be profiled."""
+
+    rate = getattr(settings, 'SLOW_REQUEST_SAMPLE_RATE', 1.0)
+
+    return state.enabled and (rate >= 1 or random.random() < rate)
+
+
+def explain(sql, params, using=None):
+    """Returns the plan of a SELECT, executed and rolled back on the
+    database it ran on, the active shard by default."""
+
+    using = using or sharding.current()
+    connection = connections[using]
+
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+
+    plan = None
+
+    try:
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}', params
+                )
+                plan = cursor.fetchone()[0]
+            transaction.set_rollback(True, using=using)
+    except Exception as exc:  # the plan is best effort diagnostics
+        return {'error': str(exc)}
+
+    return plan
+
+
+def profile_summary(profiler):
+    """Returns the functions with the most cumulative time of a profile."""
+
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3],
+                  reverse=True)
+
+    return [
+        {
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'tottime': round(tottime, 6),
+            'cumtime': round(cumtime, 6),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _)
+        in rows[:PROFILE_ENTRIES]
+    ]
+
+
+def log_slow_request(request, response, elapsed, queries, profiler):
+    """Logs a slow request as one JSON document."""
+
+    slowest = max(queries, key=lambda query: query['time'], default=None)
+
+    entry = {
+        'event': 'slow_request',
+        'method': request.method,
+        'path': request.path,
+        'route': request.resolver_match.view_name
+        if request.resolver_match else None,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 3),
+        'query_count': len(queries),
+        'query_ms': round(sum(query['time'] for query in queries) * 1000, 3),
+        'queries': [
+            {'sql': query['sql'], 'ms': round(query['time'] * 1000, 3)}
+            for query in queries
+        ],
+        'slowest_query_plan': explain(slowest['sql'], slowest['params'],
+                                      slowest['database'])
+        if slowest else None,
+        'profile': profile_summary(profiler),
+    }
+
+    logger.warning(json.dumps(entry, default=str))
+
+
+def profile_request(get_response, request):
+    """Runs a request under cProfile and query tracking, logging it when it
+    exceeds the slow request threshold."""
+
+    queries = []
+
+    def track(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            queries.append({'sql': sql, 'params': params,
+                            'database': context['connection'].alias,
+                            'time': time.perf_counter() - started})
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+
+    with sharding.execute_wrapper(track):
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+
+    elapsed = time.perf_counter() - started
+    threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500) / 1000
+
+    if elapsed >= threshold and state.allow():
+        log_slow_request(request, response, elapsed, queries, profiler)
+
+    return response
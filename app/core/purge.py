@@ -0,0 +1,191 @@
+from django.utils import timezone
+
+from core import readmodel, sharding
+from core.models import AccountPurge, Recipe, Tag, Ingredient, SyncChange, \
+    TagUsage, IngredientUsage
+from core.sharding import connection
+
+USAGE = {
+    'tags': TagUsage,
+    'ingredients': IngredientUsage,
+}
+
+PURGE_CHUNK_SIZE = 1000
+
+
+def request_purge(user):
+    """Deactivates a user right away and queues their data for deletion."""
+
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+
+    purge, _ = AccountPurge.objects.get_or_create(
+        user=user, defaults={'email': user.email}
+    )
+
+    return purge
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _in(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _delete_ids(cursor, table, column, ids, user_ids):
+    """Deletes the rows with the IDs, looking only in the partitions of the
+    users."""
+
+    cursor.execute(
+        f'DELETE FROM {table} WHERE user_id IN ({_in(user_ids)}) '
+        f'AND {column} IN ({_in(ids)})',
+        [*user_ids, *ids]
+    )
+
+
+def _purge_recipes(purge, chunk_size):
+    """Deletes one chunk of recipes with their through rows, returns the
+    number deleted."""
+
+    with sharding.atomic():
+        rows = list(
+            Recipe.objects.filter(user_id=purge.user_id)
+            .order_by('id').values_list('id', 'image')[:chunk_size]
+        )
+
+        if not rows:
+            return 0
+
+        ids = [recipe_id for recipe_id, _ in rows]
+
+        for usage in USAGE.values():
+            usage.objects.uncount_links(recipe_ids=ids)
+
+        users = [purge.user_id]
+
+        with connection.cursor() as cursor:
+            _delete_ids(cursor, _table(Recipe.tags.through), 'recipe_id', ids,
+                        users)
+            _delete_ids(cursor, _table(Recipe.ingredients.through),
+                        'recipe_id', ids, users)
+            _delete_ids(cursor, _table(Recipe), 'id', ids, users)
+
+        purge.recipes_deleted += len(ids)
+        purge.save(update_fields=['recipes_deleted'])
+
+    # files go only once the rows are gone for good, and with the last
+    # recipe using them, as copies of a recipe can share its image
+    storage = Recipe._meta.get_field('image').storage
+    images = {image for _, image in rows if image}
+
+    if images:
+        images -= set(
+            Recipe.objects.filter(user_id=purge.user_id, image__in=images)
+            .values_list('image', flat=True)
+        )
+
+    for image in sorted(images):
+        storage.delete(image)
+
+    if images:
+        purge.images_deleted += len(images)
+        purge.save(update_fields=['images_deleted'])
+
+    return len(ids)
+
+
+def _purge_attrs(purge, model, relation, counter, chunk_size):
+    """Deletes one chunk of tags or ingredients, and any through rows still
+    pointing at them, returns the number deleted."""
+
+    through = getattr(Recipe, relation).through
+    column = f'{model._meta.model_name}_id'
+
+    with sharding.atomic():
+        ids = list(
+            model.objects.filter(user_id=purge.user_id)
+            .order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+
+        if not ids:
+            return 0
+
+        # other users' recipes still using them
+        links = list(
+            through.objects.filter(**{f'{column}__in': ids})
+            .values_list('user_id', 'recipe_id').distinct()
+        )
+        recipe_ids = [recipe_id for _, recipe_id in links]
+        users = [purge.user_id]
+
+        with connection.cursor() as cursor:
+            if links:
+                _delete_ids(cursor, _table(through), column, ids,
+                            sorted({user_id for user_id, _ in links}))
+            _delete_ids(cursor, _table(USAGE[relation]), column, ids, users)
+            _delete_ids(cursor, _table(model), 'id', ids, users)
+
+        readmodel.refresh(relation, recipe_ids)
+
+        setattr(purge, counter, getattr(purge, counter) + len(ids))
+        purge.save(update_fields=[counter])
+
+    return len(ids)
+
+
+def _purge_changes(purge, chunk_size):
+    """Deletes one chunk of the user's sync feed, returns the number of rows
+    deleted."""
+
+    with sharding.atomic():
+        ids = list(
+            SyncChange.objects.filter(user_id=purge.user_id)
+            .order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+
+        if ids:
+            with connection.cursor() as cursor:
+                _delete_ids(cursor, _table(SyncChange), 'id', ids,
+                            [purge.user_id])
+
+    return len(ids)
+
+
+def run_purge(purge, chunk_size=PURGE_CHUNK_SIZE, progress=None):
+    """Deletes all data of a purge's user chunk by chunk, then the user.
+
+    Every chunk is its own transaction on the user's shard and the
+    progress is saved with it, so an interrupted purge just picks up the
+    remaining rows when run again. `progress` is called with the purge
+    after every chunk.
+    """
+
+    if purge.finished_at:
+        return purge
+
+    steps = (
+        lambda: _purge_recipes(purge, chunk_size),
+        lambda: _purge_attrs(purge, Tag, 'tags', 'tags_deleted',
+                             chunk_size),
+        lambda: _purge_attrs(purge, Ingredient, 'ingredients',
+                             'ingredients_deleted', chunk_size),
+        lambda: _purge_changes(purge, chunk_size),
+    )
+
+    if purge.user_id is not None:
+        with sharding.use(purge.user.shard):
+            for step in steps:
+                while step():
+                    if progress is not None:
+                        progress(purge)
+
+        # only small related rows (tokens, permissions) are left
+        purge.user.delete()
+        purge.user = None
+
+    purge.finished_at = timezone.now()
+    purge.save(update_fields=['finished_at'])
+
+    return purge
@@ -0,0 +1,174 @@
+from core.models import Recipe
+from core.sharding import connection
+
+READ_MODEL_CHUNK_SIZE = 1000
+
+RELATIONS = ('tags', 'ingredients')
+
+
+def cached_fields(relation):
+    """Returns the names of the ID and name list columns of a relation."""
+
+    prefix = relation[:-1]
+
+    return f'cached_{prefix}_ids', f'cached_{prefix}_names'
+
+
+def _refresh_sql(relation, recipe_ids, user_id=None, bump_version=False):
+    """Returns an UPDATE recomputing the cached lists of one relation for
+    the recipes from the through table, and its params.
+
+    The links of each recipe are read from the partition of its user only,
+    and the recipes from their user's partition when all are of user_id.
+    """
+
+    field = Recipe._meta.get_field(relation)
+    through = field.remote_field.through
+    related = field.related_model
+    column = f'{related._meta.model_name}_id'
+    ids_field, names_field = cached_fields(relation)
+
+    quote = connection.ops.quote_name
+    recipe_table = quote(Recipe._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+
+    lists = (
+        "COALESCE(array_agg(a.id ORDER BY a.id), '{}'), "
+        "COALESCE(array_agg(a.name ORDER BY a.id), '{}') "
+        f'FROM {quote(through._meta.db_table)} r '
+        f'INNER JOIN {quote(related._meta.db_table)} a '
+        f'ON a.id = r.{column} '
+        f'WHERE r.user_id = {recipe_table}.user_id '
+        f'AND r.recipe_id = {recipe_table}.id'
+    )
+    where = f'id IN ({placeholders})'
+    params = list(recipe_ids)
+
+    if user_id is not None:
+        where = f'user_id = %s AND {where}'
+        params.insert(0, user_id)
+
+    version = ', version = version + 1' if bump_version else ''
+
+    return (
+        f'UPDATE {recipe_table} SET ({ids_field}, {names_field}) = '
+        f'(SELECT {lists}){version} WHERE {where}',
+        params
+    )
+
+
+def refresh(relation, recipe_ids, user_id=None, bump_version=False):
+    """Recomputes the cached tag or ingredient lists of recipes with one
+    UPDATE, returns them as {recipe_id: (ids, names)}.
+
+    Passing the user all the recipes belong to limits the UPDATE to their
+    partition. With bump_version the recipes also move to their next
+    version, for changes made without saving them.
+    """
+
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+
+    if not recipe_ids:
+        return {}
+
+    sql, params = _refresh_sql(relation, recipe_ids, user_id, bump_version)
+    ids_field, names_field = cached_fields(relation)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} RETURNING id, {ids_field}, {names_field}',
+                       params)
+
+        return {recipe_id: (ids, names)
+                for recipe_id, ids, names in cursor.fetchall()}
+
+
+def refresh_instance(recipe, relation):
+    """Recomputes the cached lists of one relation of a recipe, in the
+    database and on the instance."""
+
+    ids, names = refresh(relation, [recipe.id], recipe.user_id)[recipe.id]
+    ids_field, names_field = cached_fields(relation)
+
+    setattr(recipe, ids_field, ids)
+    setattr(recipe, names_field, names)
+
+
+def expected(relation, recipe_ids):
+    """Returns the lists of one relation the recipes should have cached, as
+    {recipe_id: (ids, names)}, read from the through table."""
+
+    field = Recipe._meta.get_field(relation)
+    through = field.remote_field.through
+    name = field.related_model._meta.model_name
+
+    lists = {recipe_id: ([], []) for recipe_id in recipe_ids}
+    rows = through.objects.filter(recipe_id__in=recipe_ids) \
+        .order_by(f'{name}_id') \
+        .values_list('recipe_id', f'{name}_id', f'{name}__name')
+
+    for recipe_id, related_id, related_name in rows:
+        lists[recipe_id][0].append(related_id)
+        lists[recipe_id][1].append(related_name)
+
+    return lists
+
+
+def iter_chunks(queryset, chunk_size=READ_MODEL_CHUNK_SIZE):
+    """Yields the IDs of a recipe queryset in chunks, in ID order."""
+
+    last_id = 0
+
+    while True:
+        ids = list(
+            queryset.filter(id__gt=last_id).order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+
+        if not ids:
+            return
+
+        yield ids
+
+        last_id = ids[-1]
+
+
+def rebuild(queryset=None, chunk_size=READ_MODEL_CHUNK_SIZE):
+    """Recomputes the read model of all (or the given) recipes chunk by
+    chunk, returns the number of recipes."""
+
+    total = 0
+
+    if queryset is None:
+        queryset = Recipe.objects.all()
+
+    for ids in iter_chunks(queryset, chunk_size):
+        for relation in RELATIONS:
+            refresh(relation, ids)
+
+        total += len(ids)
+
+    return total
+
+
+def verify(queryset=None, chunk_size=READ_MODEL_CHUNK_SIZE):
+    """Returns the IDs of recipes whose read model differs from their
+    relations."""
+
+    stale = []
+
+    if queryset is None:
+        queryset = Recipe.objects.all()
+
+    for ids in iter_chunks(queryset, chunk_size):
+        for relation in RELATIONS:
+            ids_field, names_field = cached_fields(relation)
+            cached = Recipe.objects.filter(id__in=ids) \
+                .values_list('id', ids_field, names_field)
+            lists = expected(relation, ids)
+
+            stale.extend(
+                recipe_id for recipe_id, cached_ids, cached_names in cached
+                if lists[recipe_id] != (cached_ids, cached_names)
+            )
+
+    return sorted(set(stale))
@@ -0,0 +1,275 @@
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, \
+    transaction
+
+from core import readmodel, sharding
+from core.models import Recipe, Tag, Ingredient, SyncChange, TagUsage, \
+    IngredientUsage
+
+MOVE_CHUNK_SIZE = 1000
+
+RELATIONS = {
+    'tags': (Tag, TagUsage),
+    'ingredients': (Ingredient, IngredientUsage),
+}
+
+
+class MoveFailed(Exception):
+    """Raised when a user's data cannot be copied to another shard."""
+
+
+def _table(alias, model):
+    return connections[alias].ops.quote_name(model._meta.db_table)
+
+
+def _owned(alias, model):
+    """Returns a subquery selecting the IDs of a user's rows of a model."""
+
+    return f'SELECT id FROM {_table(alias, model)} WHERE user_id = %s'
+
+
+def _copy_rows(source, target, model, where, params, chunk_size,
+               keep_ids=True, renumber_from=None):
+    """Copies the rows of a table matching a WHERE clause from one shard to
+    another, returns the number copied.
+
+    Rows keep their primary key unless keep_ids is false, which gives them
+    new ones, or renumber_from is given, which numbers them from there in
+    the order of their IDs. Values go over as the database returned them,
+    as all shards run the same engine.
+    """
+
+    pk = model._meta.pk
+    columns = [field.column for field in model._meta.concrete_fields
+               if field is not pk]
+
+    if keep_ids and renumber_from is None:
+        columns.insert(0, pk.column)
+
+    quote = connections[target].ops.quote_name
+    names = ', '.join(quote(column) for column in columns)
+    table = _table(target, model)
+    insert = f'INSERT INTO {table} ('
+
+    if renumber_from is not None:
+        insert += f'{quote(pk.column)}, '
+
+    insert += f'{names}) VALUES ({", ".join(["%s"] * len(columns))}'
+    insert += ', %s)' if renumber_from is not None else ')'
+
+    copied = 0
+
+    with connections[source].cursor() as reader, \
+            connections[target].cursor() as writer:
+        reader.execute(
+            f'SELECT {names} FROM {_table(source, model)} WHERE {where} '
+            f'ORDER BY {quote(pk.column)}',
+            params
+        )
+
+        while True:
+            rows = reader.fetchmany(chunk_size)
+
+            if not rows:
+                return copied
+
+            if renumber_from is not None:
+                rows = [(renumber_from + copied + i, *row)
+                        for i, row in enumerate(rows)]
+
+            writer.executemany(insert, rows)
+            copied += len(rows)
+
+
+def _max_id(alias, model):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'SELECT MAX(id) FROM {_table(alias, model)}')
+        return cursor.fetchone()[0] or 0
+
+
+def _check_ids_free(alias, model, user_id):
+    """Fails a move when a copied row has the ID of another user's row on
+    the target, which the primary keys of the partitioned tables, (id,
+    user_id), no longer rule out."""
+
+    table = _table(alias, model)
+
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM {table} WHERE user_id <> %s '
+            f'AND id IN ({_owned(alias, model)}) LIMIT 1',
+            [user_id, user_id]
+        )
+        row = cursor.fetchone()
+
+    if row:
+        raise MoveFailed(f'Copy to {alias} failed: ID {row[0]} of '
+                         f'{model._meta.db_table} is taken.')
+
+
+def delete_data(alias, user_id):
+    """Deletes a user's recipes, tags, ingredients and change feed from a
+    shard.
+
+    Other users' recipes linking the user's tags or ingredients, which the
+    API allows, lose those links; their read model and the usage counts of
+    what the user's recipes linked are refreshed.
+    """
+
+    stale = {}
+
+    with sharding.use(alias), sharding.atomic(), \
+            connections[alias].cursor() as cursor:
+        for relation, (model, usage) in RELATIONS.items():
+            through = _table(alias, getattr(Recipe, relation).through)
+            column = f'{model._meta.model_name}_id'
+            attrs = _owned(alias, model)
+
+            # links are kept in the partition of their recipe's user
+            cursor.execute(
+                f'SELECT DISTINCT user_id, recipe_id FROM {through} '
+                f'WHERE user_id <> %s AND {column} IN ({attrs})',
+                [user_id, user_id]
+            )
+            links = cursor.fetchall()
+            recipe_ids = [recipe_id for _, recipe_id in links]
+
+            cursor.execute(
+                f'SELECT DISTINCT {column} FROM {through} '
+                f'WHERE user_id = %s AND {column} NOT IN ({attrs})',
+                [user_id, user_id]
+            )
+            attr_ids = [row[0] for row in cursor.fetchall()]
+
+            stale[relation] = recipe_ids, attr_ids
+
+            cursor.execute(
+                f'DELETE FROM {through} WHERE user_id = %s', [user_id]
+            )
+
+            if links:
+                others = sorted({other for other, _ in links})
+                cursor.execute(
+                    f'DELETE FROM {through} WHERE user_id IN '
+                    f'({", ".join(["%s"] * len(others))}) '
+                    f'AND {column} IN ({attrs})',
+                    [*others, user_id]
+                )
+            cursor.execute(
+                f'DELETE FROM {_table(alias, usage)} WHERE user_id = %s',
+                [user_id]
+            )
+
+        for model in (SyncChange, Recipe, Tag, Ingredient):
+            cursor.execute(
+                f'DELETE FROM {_table(alias, model)} WHERE user_id = %s',
+                [user_id]
+            )
+
+        for relation, (recipe_ids, attr_ids) in stale.items():
+            readmodel.refresh(relation, recipe_ids)
+            RELATIONS[relation][1].objects.refresh(attr_ids)
+
+
+def _copy_data(user, source, target, chunk_size):
+    """Copies a user's data from their shard to another, where no partial
+    copy from an interrupted move is left."""
+
+    user_id = user.pk
+
+    delete_data(target, user_id)
+    sharding.copy_user(user, target)
+
+    for model in (Tag, Ingredient, Recipe):
+        _copy_rows(source, target, model, 'user_id = %s', [user_id],
+                   chunk_size)
+        _check_ids_free(target, model, user_id)
+
+    for relation, (model, usage) in RELATIONS.items():
+        column = f'{model._meta.model_name}_id'
+
+        # links to other users' tags or ingredients stay behind, the
+        # others get new IDs, which are not kept apart per shard
+        _copy_rows(
+            source, target, getattr(Recipe, relation).through,
+            f'user_id = %s AND {column} IN ({_owned(source, model)})',
+            [user_id, user_id], chunk_size, keep_ids=False
+        )
+
+    with sharding.use(target):
+        readmodel.rebuild(Recipe.objects.filter(user_id=user_id),
+                          chunk_size=chunk_size)
+
+        for model, usage in RELATIONS.values():
+            for ids in readmodel.iter_chunks(
+                    model.objects.filter(user_id=user_id), chunk_size):
+                usage.objects.refresh(ids)
+
+    # every entry gets an ID above any the client can have seen, so sync
+    # cursors held by clients still return the whole feed, in order
+    _copy_rows(source, target, SyncChange, 'user_id = %s', [user_id],
+               chunk_size, renumber_from=max(
+                   _max_id(source, SyncChange), _max_id(target, SyncChange)
+               ) + 1)
+
+    with connections[target].cursor() as cursor:
+        for sql in connections[target].ops.sequence_reset_sql(
+                no_style(), [SyncChange]):
+            cursor.execute(sql)
+
+
+def _delete_source(user):
+    """Deletes what a move left of a user on the shard they moved from."""
+
+    source = user.moved_from
+
+    delete_data(source, user.pk)
+
+    if source != DEFAULT_DB_ALIAS:
+        get_user_model().objects.using(source).filter(pk=user.pk).delete()
+
+    get_user_model().objects.filter(pk=user.pk).update(moved_from='')
+    user.moved_from = ''
+
+
+def move_user(user, target, chunk_size=MOVE_CHUNK_SIZE):
+    """Moves a user's data to another shard.
+
+    The user must be marked as moving to the target long enough before for
+    requests already past authentication to have finished. The copy is
+    committed on the target before the user is pointed at it, and only
+    then is the data deleted from the source, so an interrupted move is
+    just run again. The source is recorded along with the new shard until
+    it is cleaned up, so data left there by a move interrupted after the
+    switch is deleted by the next run. Recipes, tags and ingredients keep
+    their IDs, which are kept apart by core.sharding.reserve_ids; an ID
+    still taken on the target makes the move fail, leaving the user where
+    they were.
+    """
+
+    if user.moved_from:
+        _delete_source(user)
+
+    source = user.shard
+
+    if source == target:
+        if user.moving_to:
+            get_user_model().objects.filter(pk=user.pk).update(moving_to='')
+            user.moving_to = ''
+
+        return
+
+    try:
+        with transaction.atomic(using=target):
+            _copy_data(user, source, target, chunk_size)
+    except IntegrityError as exc:
+        raise MoveFailed(f'Copy to {target} failed: {exc}')
+
+    get_user_model().objects.filter(pk=user.pk) \
+        .update(shard=target, moving_to='', moved_from=source)
+    user.shard = target
+    user.moving_to = ''
+    user.moved_from = source
+
+    _delete_source(user)
@@ -0,0 +1,54 @@
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+
+def default(obj):
+    """Encodes types the fast codec does not know, the same way DRF does."""
+
+    return _encoder.default(obj)
+
+
+def dumps(data):
+    """Serializes data to compact UTF-8 JSON bytes using the fastest codec."""
+
+    if orjson is None:
+        return renderers.JSONRenderer().render(data)
+
+    return orjson.dumps(
+        data,
+        default=default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+    )
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """JSON renderer backed by orjson when it is installed.
+
+    Falls back to DRF's stdlib based renderer whenever the output has to be
+    indented or escaped to ASCII, since the fast codec only emits compact
+    UTF-8.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Renders data into JSON bytes."""
+
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        if orjson is None or indent or not api_settings.UNICODE_JSON \
+                or not api_settings.COMPACT_JSON:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data)
@@ -0,0 +1,77 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from core.compression import request_encoding
+from core.metrics import record_cache
+
+
+def enabled():
+    """Tells if response caching is on, RESPONSE_CACHE_TIMEOUT is 0 when
+    it is off."""
+
+    return bool(settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def make_key(request, name, *parts):
+    """Returns the cache key of a response to request, for a view name and
+    parts that change whenever the response would, like a data version."""
+
+    path = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+
+    return ':'.join(['response', name, *map(str, parts), path])
+
+
+def _variant(key, encoding):
+    return f'{key}:{encoding or "identity"}'
+
+
+def get(request, key):
+    """Returns the cached response of a key in the encoding the request
+    accepts, as it was sent first, or None."""
+
+    entry = caches[settings.RESPONSE_CACHE_ALIAS].get(
+        _variant(key, request_encoding(request))
+    )
+    record_cache(request, entry is not None)
+
+    if entry is None:
+        return None
+
+    content, content_type, encoding = entry
+
+    response = HttpResponse(content, content_type=content_type)
+    response.precompressed = True
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+
+    return response
+
+
+def cache_later(response, key):
+    """Marks a response to be cached under a key once the compression
+    middleware encoded it."""
+
+    response.response_cache_key = key
+
+
+def store(request, response):
+    """Caches the final bytes of a response marked by cache_later, in the
+    encoding negotiated for the request."""
+
+    key = getattr(response, 'response_cache_key', None)
+
+    if key is None or response.streaming or response.status_code != 200:
+        return
+
+    caches[settings.RESPONSE_CACHE_ALIAS].set(
+        _variant(key, request_encoding(request)),
+        (response.content, response['Content-Type'],
+         response.get('Content-Encoding')),
+        settings.RESPONSE_CACHE_TIMEOUT
+    )
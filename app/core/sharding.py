@@ -0,0 +1,168 @@
+import hashlib
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# models holding the data of a single user, kept together on their shard
+SHARDED_MODELS = {
+    'core.recipe',
+    'core.recipetag',
+    'core.recipeingredient',
+    'core.tag',
+    'core.ingredient',
+    'core.tagusage',
+    'core.ingredientusage',
+    'core.syncchange',
+}
+
+_active = ContextVar('shard', default=None)
+
+
+def enabled():
+    """Tells if users' data is spread over more than one database."""
+
+    return len(settings.SHARDS) > 1
+
+
+def shard_for(user_id):
+    """Returns the shard a user's data belongs on.
+
+    Shards are picked by rendezvous hashing of the user ID, so adding a
+    shard to SHARDS only moves the users that now hash to it.
+    """
+
+    return max(settings.SHARDS, key=lambda alias: hashlib.blake2b(
+        f'{alias}:{user_id}'.encode(), digest_size=8
+    ).digest())
+
+
+def placement(user_id):
+    """Returns the shard holding a user's data, read from the user row."""
+
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.using(DEFAULT_DB_ALIAS) \
+        .filter(pk=user_id).values_list('shard', flat=True).first()
+
+
+def current():
+    """Returns the alias of the active shard, the default database if none
+    is active."""
+
+    return _active.get() or DEFAULT_DB_ALIAS
+
+
+def activate(alias):
+    """Makes a shard the active one until another is activated, as done by
+    core.authentication for the rest of a request."""
+
+    _active.set(alias)
+
+
+@contextmanager
+def use(alias):
+    """Makes a shard the active one within the block."""
+
+    token = _active.set(alias)
+
+    try:
+        yield
+    finally:
+        _active.reset(token)
+
+
+def atomic(savepoint=True):
+    """Returns transaction.atomic() for the active shard."""
+
+    return transaction.atomic(using=current(), savepoint=savepoint)
+
+
+class ShardConnectionProxy:
+    """Proxy for the connection to the active shard, like
+    django.db.connection is for the default database."""
+
+    def __getattr__(self, item):
+        return getattr(connections[current()], item)
+
+
+connection = ShardConnectionProxy()
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """Installs a query wrapper on the connections to every shard, like
+    connection.execute_wrapper() does on one."""
+
+    with ExitStack() as stack:
+        for alias in settings.SHARDS:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+
+        yield
+
+
+def copy_user(user, alias):
+    """Copies a user row to a shard, where the foreign keys of the user's
+    data point to. The copy is never read."""
+
+    if alias == DEFAULT_DB_ALIAS:
+        return
+
+    model = type(user)
+    copy = model(**{field.attname: getattr(user, field.attname)
+                    for field in model._meta.concrete_fields})
+
+    model.objects.using(alias).bulk_create([copy], ignore_conflicts=True)
+
+
+def reserve_ids(alias):
+    """Moves the ID sequences of recipes, tags and ingredients on a shard to
+    its own range, so rows keep their IDs when moved between shards.
+    """
+
+    from core.models import Recipe, Tag, Ingredient
+
+    index = settings.SHARDS.index(alias) if alias in settings.SHARDS else 0
+
+    if not index:
+        return
+
+    with connections[alias].cursor() as cursor:
+        for model in (Recipe, Tag, Ingredient):
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                "GREATEST(nextval(pg_get_serial_sequence(%s, 'id')), %s))",
+                [model._meta.db_table, model._meta.db_table,
+                 index * settings.SHARD_ID_RANGE]
+            )
+
+
+class ShardRouter:
+    """Routes the queries on users' data to the active shard, or else to
+    the shard of the user owning the instance at hand.
+
+    Every database gets the whole schema; users, tokens and the task queue
+    are only used on the default database.
+    """
+
+    def _shard(self, model, instance=None, **hints):
+        if not enabled() or model._meta.label_lower not in SHARDED_MODELS:
+            return None
+
+        alias = _active.get()
+
+        if alias is None and getattr(instance, 'user_id', None):
+            alias = placement(instance.user_id)
+
+        return alias or None
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # users are copied to the shards of their data
+        return True if enabled() else None
@@ -0,0 +1,183 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, \
+    post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from core import readmodel, sharding
+from core.models import Recipe, Tag, Ingredient, SyncChange, TagUsage, \
+    IngredientUsage, deleting_users
+
+RELATION_OF = {
+    Recipe.tags.through: 'tags',
+    Recipe.ingredients.through: 'ingredients',
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+USAGE_OF = {
+    Recipe.tags.through: TagUsage,
+    Recipe.ingredients.through: IngredientUsage,
+}
+
+
+def _record(instance, deleted=False):
+    SyncChange.objects.record(instance.user_id, instance._meta.model_name,
+                              [instance.id], deleted=deleted)
+
+
+@receiver(request_started)
+@receiver(request_finished)
+def reset_shard(sender, **kwargs):
+    """Leaves no shard active between requests served by a thread."""
+
+    sharding.activate(None)
+
+
+@receiver(post_migrate)
+def reserve_shard_ids(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Gives a freshly migrated shard its own range of IDs."""
+
+    if sender.label == 'core':
+        sharding.reserve_ids(using)
+
+
+@receiver(post_save, sender=get_user_model())
+def place_user(sender, instance, created, raw=False, using=DEFAULT_DB_ALIAS,
+               **kwargs):
+    """Puts new users on the shard their ID hashes to."""
+
+    if not created or raw or using != DEFAULT_DB_ALIAS or \
+            not sharding.enabled():
+        return
+
+    instance.shard = sharding.shard_for(instance.pk)
+    sender.objects.filter(pk=instance.pk).update(shard=instance.shard)
+    sharding.copy_user(instance, instance.shard)
+
+
+@receiver(post_delete, sender=get_user_model())
+def delete_shard_user(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Deletes the copy of a deleted user on their shard."""
+
+    if using == DEFAULT_DB_ALIAS and instance.shard != DEFAULT_DB_ALIAS:
+        sender.objects.using(instance.shard).filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def record_save(sender, instance, raw=False, **kwargs):
+    """Puts saved recipes, tags and ingredients on the change feed."""
+
+    if not raw:
+        _record(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_delete(sender, instance, **kwargs):
+    """Leaves a tombstone on the change feed for deleted objects."""
+
+    if instance.user_id not in deleting_users:
+        _record(instance, deleted=True)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def record_detach(sender, instance, **kwargs):
+    """Puts the recipes losing a deleted tag or ingredient on the feed."""
+
+    if instance.user_id in deleting_users:
+        return
+
+    recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+
+    SyncChange.objects.record(instance.user_id, 'recipe', recipe_ids)
+
+    # the through rows go without m2m_changed, refreshed after the delete
+    instance._detached_recipe_ids = recipe_ids
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_detached(sender, instance, **kwargs):
+    """Drops a deleted tag or ingredient from its recipes' read model."""
+
+    recipe_ids = getattr(instance, '_detached_recipe_ids', None)
+
+    if recipe_ids:
+        readmodel.refresh(RELATION_OF[sender], recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_renamed(sender, instance, created, raw=False, **kwargs):
+    """Updates the read model of recipes using a changed tag or
+    ingredient."""
+
+    if created or raw:
+        return
+
+    readmodel.refresh(
+        RELATION_OF[sender],
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keeps the read model of recipes in step with their tags and
+    ingredients."""
+
+    relation = RELATION_OF[sender]
+
+    if not reverse:
+        if action == 'post_clear' or \
+                action in ('post_add', 'post_remove') and pk_set:
+            readmodel.refresh_instance(instance, relation)
+    elif action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        readmodel.refresh(relation, instance._cleared_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        readmodel.refresh(relation, pk_set)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_usage(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keeps the usage counts of tags and ingredients in step with their
+    recipe links."""
+
+    usage = USAGE_OF[sender].objects
+    links = {'attr_ids' if reverse else 'recipe_ids': [instance.pk]}
+
+    if action == 'post_add':
+        # only the newly linked IDs are left in pk_set
+        usage.count_links(**links, **{
+            'recipe_ids' if reverse else 'attr_ids': pk_set
+        })
+    elif action == 'pre_remove':
+        usage.uncount_links(**links, **{
+            'recipe_ids' if reverse else 'attr_ids': pk_set
+        })
+    elif action == 'pre_clear':
+        usage.uncount_links(**links)
+
+
+@receiver(pre_delete, sender=Recipe)
+def uncount_recipe(sender, instance, **kwargs):
+    """Drops a deleted recipe from the usage counts of its tags and
+    ingredients, whose links go without m2m_changed."""
+
+    for usage in USAGE_OF.values():
+        ids_field, _ = readmodel.cached_fields(usage.relation)
+
+        if getattr(instance, ids_field):
+            usage.objects.uncount_links(recipe_ids=[instance.pk])
@@ -0,0 +1,352 @@
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.metrics import registry
+from core.models import Task as TaskRow
+
+logger = logging.getLogger(__name__)
+
+Job = namedtuple('Job', ('id', 'name', 'args', 'kwargs', 'priority',
+                         'run_at', 'attempts', 'max_attempts'))
+
+_tasks = {}
+_backends = {}
+
+
+class Task:
+    """A function that can be run by a worker instead of by its caller.
+
+    Calling the task runs the function right away; `defer` and `enqueue`
+    queue a call with JSON serializable arguments for a worker.
+    """
+
+    def __init__(self, func, name, priority=0, max_attempts=None,
+                 retry_delay=None):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def defer(self, *args, **kwargs):
+        """Queues a call of the task with the given arguments."""
+
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, priority=None, delay=0):
+        """Queues a call of the task to run after delay seconds, with a
+        priority overriding the task's, and returns its ID.
+
+        With the database backend the call is queued in the current
+        transaction, so it only runs if that commits.
+        """
+
+        if self.max_attempts is None:
+            max_attempts = settings.TASKS_MAX_ATTEMPTS
+        else:
+            max_attempts = self.max_attempts
+
+        task_id = get_backend().enqueue(
+            self.name, list(args), kwargs or {},
+            self.priority if priority is None else priority,
+            timezone.now() + timedelta(seconds=delay),
+            max_attempts
+        )
+        registry.inc('tasks_enqueued_total', (('task', self.name),))
+
+        return task_id
+
+    def next_delay(self, attempts):
+        """Returns the seconds to wait before retrying a call that failed
+        for the given time: exponential backoff with jitter."""
+
+        if self.retry_delay is None:
+            base = settings.TASKS_RETRY_DELAY
+        else:
+            base = self.retry_delay
+
+        delay = min(base * 2 ** (attempts - 1),
+                    settings.TASKS_MAX_RETRY_DELAY)
+
+        # spread out retries of tasks that failed together
+        return delay * random.uniform(0.5, 1.0)
+
+
+def task(name=None, priority=0, max_attempts=None, retry_delay=None):
+    """Registers the decorated function as a background task.
+
+    Higher priorities run first. A failing call is retried until it made
+    max_attempts, TASKS_MAX_ATTEMPTS by default.
+    """
+
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+
+        if task_name in _tasks:
+            raise ValueError(f'Task {task_name} is already registered.')
+
+        _tasks[task_name] = Task(func, task_name, priority, max_attempts,
+                                 retry_delay)
+
+        return _tasks[task_name]
+
+    return decorator
+
+
+def get_task(name):
+    """Returns the registered task of a name."""
+
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise LookupError(f'Unknown task {name}.')
+
+
+class DatabaseBackend:
+    """Queue kept in the task table, shared by every worker process."""
+
+    def enqueue(self, name, args, kwargs, priority, run_at, max_attempts):
+        return TaskRow.objects.create(
+            name=name,
+            arguments=json.dumps({'args': args, 'kwargs': kwargs}),
+            priority=priority,
+            run_at=run_at,
+            max_attempts=max_attempts,
+        ).id
+
+    def claim(self, now):
+        row = TaskRow.objects.claim(now)
+
+        if row is None:
+            return None
+
+        task_id, name, arguments, *rest = row
+        arguments = json.loads(arguments)
+
+        return Job(task_id, name, arguments.get('args', []),
+                   arguments.get('kwargs', {}), *rest)
+
+    def complete(self, job):
+        TaskRow.objects.filter(id=job.id).delete()
+
+    def retry(self, job, run_at, error):
+        TaskRow.objects.filter(id=job.id).update(
+            status='queued', run_at=run_at, started_at=None,
+            last_error=error
+        )
+
+    def fail(self, job, error):
+        TaskRow.objects.filter(id=job.id).update(
+            status='failed', finished_at=timezone.now(), last_error=error
+        )
+
+    def requeue_stale(self, before):
+        return TaskRow.objects.requeue_stale(before)
+
+
+class InMemoryBackend:
+    """Queue held by the current process, for tests.
+
+    Calls are not tied to transactions, and lost ones are never requeued.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.queued = {}
+        self.failed = {}
+
+    def enqueue(self, name, args, kwargs, priority, run_at, max_attempts):
+        # round trip the arguments like the database backend does
+        arguments = json.loads(json.dumps({'args': args, 'kwargs': kwargs}))
+
+        with self._lock:
+            job = Job(next(self._ids), name, arguments['args'],
+                      arguments['kwargs'], priority, run_at, 0,
+                      max_attempts)
+            self.queued[job.id] = job
+
+        return job.id
+
+    def claim(self, now):
+        with self._lock:
+            due = [(-job.priority, job.run_at, job.id)
+                   for job in self.queued.values() if job.run_at <= now]
+
+            if not due:
+                return None
+
+            job = self.queued.pop(heapq.nsmallest(1, due)[0][2])
+
+        return job._replace(attempts=job.attempts + 1)
+
+    def complete(self, job):
+        pass
+
+    def retry(self, job, run_at, error):
+        with self._lock:
+            self.queued[job.id] = job._replace(run_at=run_at)
+
+    def fail(self, job, error):
+        with self._lock:
+            self.failed[job.id] = (job, error)
+
+    def requeue_stale(self, before):
+        return 0
+
+    def clear(self):
+        """Drops every queued and failed call."""
+
+        with self._lock:
+            self.queued.clear()
+            self.failed.clear()
+
+
+def get_backend():
+    """Returns the backend of the TASKS_BACKEND setting."""
+
+    path = settings.TASKS_BACKEND
+    backend = _backends.get(path)
+
+    if backend is None:
+        backend = _backends.setdefault(path, import_string(path)())
+
+    return backend
+
+
+def run_job(backend, job):
+    """Runs a claimed call, then completes it, or schedules a retry or
+    fails it if it raised. Returns 'succeeded', 'retried' or 'failed'."""
+
+    labels = (('task', job.name),)
+    started = time.monotonic()
+    registry.observe(
+        'task_queue_delay_seconds', labels,
+        max((timezone.now() - job.run_at).total_seconds(), 0.0)
+    )
+
+    try:
+        current = get_task(job.name)
+        current.func(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+
+        if job.attempts < job.max_attempts and job.name in _tasks:
+            outcome = 'retried'
+            backend.retry(job, timezone.now() + timedelta(
+                seconds=current.next_delay(job.attempts)
+            ), error)
+        else:
+            outcome = 'failed'
+            backend.fail(job, error)
+
+        logger.warning('Task %s %s %s after attempt %s.', job.name, job.id,
+                       outcome, job.attempts, exc_info=True)
+    else:
+        outcome = 'succeeded'
+        backend.complete(job)
+
+    registry.observe('task_duration_seconds', labels,
+                     time.monotonic() - started)
+    registry.inc('tasks_total', labels + (('outcome', outcome),))
+    registry.maybe_flush()
+
+    return outcome
+
+
+def run_pending(backend=None):
+    """Runs the due calls in the current thread until none is left and
+    returns their number."""
+
+    backend = backend or get_backend()
+    count = 0
+
+    while True:
+        job = backend.claim(timezone.now())
+
+        if job is None:
+            return count
+
+        run_job(backend, job)
+        count += 1
+
+
+class Worker:
+    """Runs calls from a backend on a pool of threads until stopped, or
+    in burst mode until none is due."""
+
+    def __init__(self, backend=None, threads=1, burst=False,
+                 poll_interval=None):
+        self.backend = backend or get_backend()
+        self.threads = threads
+        self.burst = burst
+        self.poll_interval = settings.TASKS_POLL_INTERVAL \
+            if poll_interval is None else poll_interval
+        self.stopping = threading.Event()
+
+    def stop(self):
+        """Lets the threads finish their current call and exit."""
+
+        self.stopping.set()
+
+    def _loop(self):
+        try:
+            while not self.stopping.is_set():
+                # closing would end a surrounding transaction, as in tests
+                if not connection.in_atomic_block:
+                    close_old_connections()
+
+                try:
+                    job = self.backend.claim(timezone.now())
+                except DatabaseError:
+                    logger.exception('Could not claim a task.')
+                    self.stopping.wait(self.poll_interval)
+                    continue
+
+                if job is not None:
+                    run_job(self.backend, job)
+                    continue
+
+                self.backend.requeue_stale(timezone.now() - timedelta(
+                    seconds=settings.TASKS_TIMEOUT
+                ))
+
+                if self.burst:
+                    return
+
+                self.stopping.wait(self.poll_interval)
+        finally:
+            if self.threads > 1:
+                connection.close()
+
+    def run(self):
+        """Runs the threads, the first one being the calling thread."""
+
+        threads = [threading.Thread(target=self._loop, daemon=True)
+                   for _ in range(self.threads - 1)]
+
+        for thread in threads:
+            thread.start()
+
+        self._loop()
+
+        for thread in threads:
+            thread.join()
+
+        registry.flush()
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.test.runner import DiscoverRunner
+from rest_framework.settings import api_settings
+
+TEST_SHARD = 'test_shard'
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner isolating shared state from running servers and from
+    previous test runs."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+
+        self._tmp_dir = tempfile.mkdtemp()
+        self._throttle_path = getattr(settings, 'THROTTLE_BUCKETS_PATH', None)
+        settings.THROTTLE_BUCKETS_PATH = os.path.join(self._tmp_dir,
+                                                      'throttle.buckets')
+
+        # throttling is tested with its own rates, elsewhere requests of
+        # many tests would share budgets
+        self._rest_framework = settings.REST_FRAMEWORK
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK,
+                                   'DEFAULT_THROTTLE_RATES': {}}
+        api_settings.reload()
+
+        # rolled back IDs are reused, so feed versions repeat across tests
+        self._response_cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+        settings.RESPONSE_CACHE_TIMEOUT = 0
+
+        # a second database for the sharding tests, created only for them
+        default = settings.DATABASES[DEFAULT_DB_ALIAS]
+        settings.DATABASES.setdefault(TEST_SHARD, {
+            **default, 'NAME': f'{default["NAME"]}_{TEST_SHARD}', 'TEST': {},
+        })
+
+    def teardown_test_environment(self, **kwargs):
+        settings.THROTTLE_BUCKETS_PATH = self._throttle_path
+        settings.REST_FRAMEWORK = self._rest_framework
+        api_settings.reload()
+        settings.RESPONSE_CACHE_TIMEOUT = self._response_cache_timeout
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+        super().teardown_test_environment(**kwargs)
@@ -1,7 +1,16 @@
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
+from core import sharding
+from core.admin import EstimatedCountPaginator
+from core.models import Recipe, RecipeTag, Tag, Ingredient
+from core.tests.runner import TEST_SHARD
+
 
 class AdminSiteTests(TestCase):
     """Test cases for admin site functionality."""
@@ -47,3 +56,163 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class RecipeAdminTests(TestCase):
+    """Test cases for the Recipe, Tag and Ingredient admin pages."""
+
+    def setUp(self):
+        self.client = Client()
+
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@fueanta.com',
+            password='admin1234',
+        )
+        self.client.force_login(self.admin_user)
+
+        self.tag = Tag.objects.create(user=self.admin_user, name='Vegan')
+        self.unused_tag = Tag.objects.create(user=self.admin_user,
+                                             name='Unused Tag')
+        self.ingredient = Ingredient.objects.create(user=self.admin_user,
+                                                    name='Salt')
+
+        self.recipe = Recipe.objects.create(
+            user=self.admin_user, title='Curry', time_in_minutes=30,
+            price=10.00
+        )
+        self.recipe.tags.add(self.tag)
+
+    def test_changelists(self):
+        """Testing if the changelists render with their users."""
+
+        for model, text in (('recipe', 'Curry'), ('tag', 'Vegan'),
+                            ('ingredient', 'Salt')):
+            res = self.client.get(reverse(f'admin:core_{model}_changelist'))
+
+            self.assertContains(res, text)
+            self.assertContains(res, self.admin_user.email)
+
+    def test_recipe_changelist_prefix_search(self):
+        """Testing if recipes are searched by title prefix."""
+
+        url = reverse('admin:core_recipe_changelist')
+
+        self.assertContains(self.client.get(url, {'q': 'cur'}), 'Curry')
+        self.assertNotContains(self.client.get(url, {'q': 'urry'}),
+                               'Curry</a>')
+
+    def test_recipe_change_page_does_not_list_all_tags(self):
+        """Testing if the change page only renders the selected tags."""
+
+        url = reverse('admin:core_recipe_change', args=[self.recipe.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'Vegan')
+        self.assertNotContains(res, 'Unused Tag')
+
+    def test_recipe_change_saves_links(self):
+        """Testing if tags and ingredients are linked with the recipe's
+        user from the change page."""
+
+        url = reverse('admin:core_recipe_change', args=[self.recipe.id])
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(fp=ntf, format='JPEG')
+            ntf.seek(0)
+
+            res = self.client.post(url, {
+                'user': self.admin_user.id, 'title': 'Curry',
+                'time_in_minutes': 30, 'price': '10.00', 'link': '',
+                'image': ntf, 'tags': [self.unused_tag.id],
+                'ingredients': [self.ingredient.id],
+            })
+
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(
+            list(RecipeTag.objects.values_list('user', 'recipe', 'tag')),
+            [(self.admin_user.id, self.recipe.id, self.unused_tag.id)]
+        )
+        self.assertEqual(list(self.recipe.ingredients.all()),
+                         [self.ingredient])
+
+    def test_changelist_does_not_count_twice(self):
+        """Testing if the unfiltered total is not counted separately."""
+
+        url = reverse('admin:core_recipe_changelist')
+
+        with patch.object(EstimatedCountPaginator, 'count', 1):
+            res = self.client.get(url, {'q': 'cur'})
+
+        self.assertNotContains(res, 'total')
+
+    def test_paginator_counts_small_tables(self):
+        """Testing if small or filtered tables are counted exactly."""
+
+        paginator = EstimatedCountPaginator(Recipe.objects.order_by('id'), 10)
+
+        self.assertEqual(paginator.count, 1)
+
+
+@override_settings(SHARDS=['default', TEST_SHARD])
+class ShardedAdminTests(TestCase):
+    """Test cases for admin pages of users' data spread over shards."""
+
+    databases = {'default', TEST_SHARD}
+
+    def setUp(self):
+        self.client = Client()
+
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@fueanta.com',
+            password='admin1234',
+        )
+        self.client.force_login(self.admin_user)
+
+        with patch('core.sharding.shard_for', return_value=TEST_SHARD):
+            self.user = get_user_model().objects.create_user(
+                'test@fueanta.com', 'pass123'
+            )
+
+        with sharding.use(TEST_SHARD):
+            self.tag = Tag.objects.create(user=self.user, name='Vegan')
+            self.recipe = Recipe.objects.create(
+                user=self.user, title='Curry', time_in_minutes=30,
+                price=10.00
+            )
+            self.recipe.tags.add(self.tag)
+
+    def test_changelist_filtered_by_user_lists_their_shard(self):
+        """Testing if the changelist filtered by a user lists the data on
+        their shard, and says the unfiltered one does not."""
+
+        url = reverse('admin:core_recipe_changelist')
+
+        res = self.client.get(url, {'user__id__exact': self.user.id})
+        self.assertContains(res, 'Curry')
+
+        res = self.client.get(url)
+        self.assertNotContains(res, 'Curry')
+        self.assertContains(res, 'filter by user')
+
+    def test_change_page_reads_shard(self):
+        """Testing if the change page of a row finds it on its shard."""
+
+        url = reverse('admin:core_recipe_change', args=[self.recipe.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'Vegan')
+
+    def test_delete_on_shard(self):
+        """Testing if a row is deleted from its shard with its links."""
+
+        url = reverse('admin:core_recipe_delete', args=[self.recipe.id])
+        res = self.client.post(url, {'post': 'yes'})
+
+        self.assertEqual(res.status_code, 302)
+        self.assertFalse(Recipe.objects.using(TEST_SHARD).exists())
+        self.assertFalse(RecipeTag.objects.using(TEST_SHARD).exists())
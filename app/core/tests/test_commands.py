@@ -1,8 +1,24 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import sharding
+from core.management.commands.benchmark import InProcessTransport
+from core.models import Recipe, Tag, TagUsage
+from core.tests.runner import TEST_SHARD
 
 
 class CommandTests(TestCase):
@@ -24,3 +40,268 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test cases for the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@fueanta.com', 'pass123'
+        )
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'recipes.ndjson')
+        self.checkpoint = os.path.join(self.tmp_dir.name, 'checkpoint')
+
+        with open(self.path, 'w') as file:
+            for i in range(5):
+                file.write(json.dumps({
+                    'title': f'Recipe {i}',
+                    'time_in_minutes': 10,
+                    'price': '2.00',
+                    'tags': ['Vegan'],
+                }) + '\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_import_recipes_with_checkpoint(self):
+        """Testing if records are imported in batches with a checkpoint."""
+
+        out = StringIO()
+        call_command('import_recipes', self.path, email=self.user.email,
+                     batch_size=2, checkpoint=self.checkpoint, stdout=out)
+
+        with open(self.checkpoint) as file:
+            self.assertEqual(file.read(), '5')
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        self.assertIn('Imported 4 records', out.getvalue())
+
+    def test_import_recipes_resumes_from_checkpoint(self):
+        """Testing if an import resumes after the checkpointed record."""
+
+        with open(self.checkpoint, 'w') as file:
+            file.write('3')
+
+        call_command('import_recipes', self.path, email=self.user.email,
+                     checkpoint=self.checkpoint, stdout=StringIO())
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id')
+                 .values_list('title', flat=True)),
+            ['Recipe 3', 'Recipe 4']
+        )
+
+    def test_import_recipes_unknown_user(self):
+        """Testing if importing for an unknown user fails."""
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', self.path,
+                         email='nobody@fueanta.com', stdout=StringIO())
+
+
+class SeedDataCommandTests(TestCase):
+    """Test cases for the seed_data command."""
+
+    def _seed(self, **options):
+        call_command('seed_data', users=2, recipes=5, stdout=StringIO(),
+                     **options)
+
+        return list(Recipe.objects.order_by('id').values_list(
+            'user__email', 'title', 'time_in_minutes', 'price'
+        ))
+
+    def test_seed_data_is_deterministic(self):
+        """Testing if the same seed generates the same data."""
+
+        first = self._seed(seed=7)
+        tags = Tag.objects.count()
+
+        get_user_model().objects.all().delete()
+
+        self.assertEqual(self._seed(seed=7), first)
+        self.assertEqual(Tag.objects.count(), tags)
+        self.assertEqual(get_user_model().objects.count(), 2)
+
+    def test_seed_data_skips_existing_users(self):
+        """Testing if seeding twice does not duplicate recipes."""
+
+        first = self._seed()
+
+        self.assertEqual(self._seed(), first)
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test cases for the benchmark command."""
+
+    databases = {'default', TEST_SHARD}
+
+    def test_benchmark_requires_seed_users(self):
+        """Testing if benchmarking without seed data fails."""
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark', stdout=StringIO())
+
+    def test_benchmark_writes_results(self):
+        """Testing if benchmark results are reported as JSON."""
+
+        call_command('seed_data', users=1, recipes=5, stdout=StringIO())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'results.json')
+
+            call_command('benchmark', scenario=['recipe-list', 'tag-list'],
+                         requests=3, concurrency=1, host='testserver',
+                         output=output, stdout=StringIO())
+
+            with open(output) as file:
+                results = json.load(file)
+
+            result = results['recipe-list']
+            self.assertEqual(result['requests'], 3)
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['queries_per_request'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+            result['queries_per_request'] = 0
+
+            with open(output, 'w') as file:
+                json.dump(results, file)
+
+            with self.assertRaises(CommandError):
+                call_command('benchmark', scenario=['recipe-list'],
+                             requests=3, concurrency=1, host='testserver',
+                             compare=output, stdout=StringIO())
+
+    def test_benchmark_without_successful_requests(self):
+        """Testing if a scenario where every request failed is reported."""
+
+        call_command('seed_data', users=1, recipes=1, stdout=StringIO())
+        out = StringIO()
+
+        with patch('core.management.commands.benchmark.InProcessTransport'
+                   '.request', return_value=(500, 0, 0)):
+            call_command('benchmark', scenario=['tag-list'], requests=2,
+                         concurrency=1, host='testserver', stdout=out)
+
+        self.assertIn('p50 n/a, p95 n/a, p99 n/a', out.getvalue())
+        self.assertIn('2 errors', out.getvalue())
+
+    @override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'cheap': '300/min', 'expensive': '2/min'},
+    })
+    def test_benchmark_not_throttled(self):
+        """Testing if in process requests, all sent from one address, are
+        only rate limited when asked to."""
+
+        call_command('seed_data', users=2, recipes=1, stdout=StringIO())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'results.json')
+            results = []
+
+            with self.settings(THROTTLE_BUCKETS_PATH=os.path.join(
+                    tmp_dir, 'buckets')):
+                for args in ([], ['--throttle']):
+                    call_command('benchmark', *args, scenario=['token'],
+                                 requests=4, users=2, concurrency=1,
+                                 host='testserver', output=output,
+                                 stdout=StringIO())
+
+                    with open(output) as file:
+                        results.append(json.load(file)['token'])
+
+        self.assertEqual(results[0]['errors'], 0)
+        self.assertEqual(results[1]['throttled'], 2)
+
+    @override_settings(SHARDS=['default', TEST_SHARD])
+    def test_benchmark_counts_shard_queries(self):
+        """Testing if queries run on a user's shard are counted too."""
+
+        with patch('core.sharding.shard_for', return_value=TEST_SHARD):
+            user = get_user_model().objects.create_user('test@fueanta.com',
+                                                        'pass123')
+
+        with sharding.use(TEST_SHARD):
+            Tag.objects.create(user=user, name='Vegan')
+
+        transport = InProcessTransport('testserver')
+        token = Token.objects.create(user=user).key
+
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections[TEST_SHARD]) as shard:
+            status, queries, _ = transport.request(
+                'GET', reverse('recipe:tag-list'), token=token
+            )
+
+        self.assertEqual(status, 200)
+        self.assertGreater(len(shard), 0)
+        self.assertEqual(queries, len(default) + len(shard))
+
+
+class RebuildReadModelCommandTests(TestCase):
+    """Test cases for the rebuild_read_model command."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'test@fueanta.com', 'pass123'
+        )
+
+        self.tag = Tag.objects.create(user=user, name='Vegan')
+        self.recipe = Recipe.objects.create(
+            user=user, title='Salad', time_in_minutes=5, price=1.00
+        )
+        self.recipe.tags.add(self.tag)
+
+        Recipe.objects.filter(id=self.recipe.id).update(cached_tag_ids=[])
+
+    def test_verify_reports_stale_recipes(self):
+        """Testing if --verify fails listing recipes out of step."""
+
+        with self.assertRaisesMessage(CommandError, str(self.recipe.id)):
+            call_command('rebuild_read_model', '--verify', stdout=StringIO())
+
+    def test_rebuild_read_model(self):
+        """Testing if a rebuild brings every recipe back in step."""
+
+        out = StringIO()
+        call_command('rebuild_read_model', '--chunk-size', '1', stdout=out)
+
+        self.recipe.refresh_from_db()
+
+        self.assertIn('Rebuilt 1 recipes', out.getvalue())
+        self.assertEqual(self.recipe.cached_tag_ids, [self.tag.id])
+
+        call_command('rebuild_read_model', '--verify', stdout=out)
+        self.assertIn('up to date', out.getvalue())
+
+
+class ReconcileUsageCommandTests(TestCase):
+    """Test cases for the reconcile_usage command."""
+
+    def test_reconcile_usage(self):
+        """Testing if the usage counts are recomputed from the links."""
+
+        user = get_user_model().objects.create_user(
+            'test@fueanta.com', 'pass123'
+        )
+        tag = Tag.objects.create(user=user, name='Vegan')
+        unused = Tag.objects.create(user=user, name='Unused')
+        recipe = Recipe.objects.create(
+            user=user, title='Salad', time_in_minutes=5, price=1.00
+        )
+        recipe.tags.add(tag)
+
+        TagUsage.objects.update(count=7)
+
+        out = StringIO()
+        call_command('reconcile_usage', '--chunk-size', '1', stdout=out)
+
+        self.assertIn('Reconciled 2 tags', out.getvalue())
+        self.assertEqual(
+            dict(TagUsage.objects.values_list('tag_id', 'count')),
+            {tag.id: 1, unused.id: 0}
+        )
@@ -0,0 +1,182 @@
+import gzip
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, RequestFactory, \
+    override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import compression
+from core.middleware import CompressionMiddleware
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+BODY = json.dumps([{'title': f'Recipe {i}'} for i in range(100)]).encode()
+
+
+class NegotiationTests(SimpleTestCase):
+    """Test cases for picking a content encoding."""
+
+    def test_negotiate(self):
+        """Testing if the highest rated available encoding is picked,
+        preferring the better compressing one on ties."""
+
+        available = {'zstd': None, 'br': None, 'gzip': None}
+
+        with patch('core.compression.COMPRESSORS', available):
+            cases = {
+                '': None,
+                'identity': None,
+                'gzip': 'gzip',
+                'gzip, deflate, br': 'br',
+                'gzip, br, zstd': 'zstd',
+                'gzip;q=1.0, br;q=0.5': 'gzip',
+                'GZIP;Q=0.1': 'gzip',
+                'br;q=0, gzip': 'gzip',
+                '*': 'zstd',
+                '*;q=0.5, gzip': 'gzip',
+                'gzip;q=0': None,
+                'gzip;q=oops': None,
+            }
+
+            for header, encoding in cases.items():
+                self.assertEqual(compression.negotiate(header), encoding,
+                                 header)
+
+    def test_streamed_compression(self):
+        """Testing if chunked output decompresses to the whole input."""
+
+        chunks = compression.iter_compress(iter([BODY[:10], BODY[10:]]),
+                                           'gzip')
+
+        self.assertEqual(gzip.decompress(b''.join(chunks)), BODY)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test cases for compressing API responses."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def respond(self, response, path='/api/recipe/', **headers):
+        middleware = CompressionMiddleware(lambda request: response)
+
+        return middleware(self.factory.get(path, **headers))
+
+    def test_compressed_when_accepted(self):
+        """Testing if a large JSON response is gzipped."""
+
+        res = self.respond(HttpResponse(BODY,
+                                        content_type='application/json'),
+                           HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+        self.assertEqual(gzip.decompress(res.content), BODY)
+
+    def test_left_alone(self):
+        """Testing if responses not worth or not asked to compress are
+        sent as they are."""
+
+        cases = (
+            (HttpResponse(BODY, content_type='application/json'), {}),
+            (HttpResponse(b'{}', content_type='application/json'),
+             {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+            (HttpResponse(BODY, content_type='image/png'),
+             {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+        )
+
+        for response, headers in cases:
+            res = self.respond(response, **headers)
+
+            self.assertFalse(res.has_header('Content-Encoding'))
+            self.assertEqual(res.content, response.content)
+
+    def test_only_api_paths(self):
+        """Testing if paths outside COMPRESSION_PATHS are not compressed."""
+
+        res = self.respond(HttpResponse(BODY, content_type='text/html'),
+                           path='/admin/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_streaming_compressed(self):
+        """Testing if streamed responses are compressed on the fly."""
+
+        res = self.respond(
+            StreamingHttpResponse(iter([BODY, BODY]),
+                                  content_type='application/x-ndjson'),
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(res.streaming_content)),
+                         BODY + BODY)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=60)
+class ResponseCacheTests(TestCase):
+    """Test cases for caching the encoded recipe list."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = get_user_model().objects.create_user('test@fueanta.com',
+                                                         'pass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        for i in range(30):
+            Recipe.objects.create(user=self.user, title=f'Recipe {i}',
+                                  time_in_minutes=10, price=5.00)
+
+    def test_hit_sends_cached_bytes(self):
+        """Testing if an unchanged list is sent from the cache, in each
+        encoding asked for."""
+
+        first = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        with patch('core.compression.compress') as compress, \
+                self.assertNumQueries(1):
+            second = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        compress.assert_not_called()
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(len(json.loads(gzip.decompress(second.content))),
+                         30)
+
+        plain = self.client.get(RECIPES_URL)
+
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(plain.content),
+                         json.loads(gzip.decompress(first.content)))
+
+    def test_change_misses(self):
+        """Testing if a change to the user's recipes is seen at once."""
+
+        self.client.get(RECIPES_URL)
+        Recipe.objects.create(user=self.user, title='New',
+                              time_in_minutes=10, price=5.00)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.json()), 31)
+
+    def test_other_users_not_shared(self):
+        """Testing if users never get each other's cached lists."""
+
+        self.client.get(RECIPES_URL)
+
+        other = get_user_model().objects.create_user('test2@fueanta.com',
+                                                     'pass123')
+        self.client.force_authenticate(other)
+
+        self.assertEqual(self.client.get(RECIPES_URL).json(), [])
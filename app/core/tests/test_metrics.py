@@ -0,0 +1,174 @@
+import glob
+import os
+import tempfile
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.metrics import Registry, record_cache
+from core.middleware import MetricsMiddleware
+from core.tests.utils import TIMING_ENV
+
+
+class MetricsTests(TestCase):
+    """Test cases for request metrics and the /metrics endpoint."""
+
+    def setUp(self):
+        self.registry = Registry()
+
+        for target in ('core.middleware.registry', 'core.views.registry'):
+            patcher = patch(target, self.registry)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+
+    def test_metrics_recorded_per_route(self):
+        """Testing if requests are recorded under their route name."""
+
+        user = get_user_model().objects.create_user('test@fueanta.com',
+                                                    'pass123')
+        self.client.force_authenticate(user)
+        self.client.get(reverse('recipe:recipe-list'))
+
+        with self.settings(METRICS_TOKEN='secret'):
+            res = self.client.get(reverse('metrics'),
+                                  HTTP_AUTHORIZATION='Bearer secret')
+        body = res.content.decode()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn('http_requests_total{route="recipe:recipe-list",'
+                      'method="GET",status="200"} 1', body)
+        self.assertIn('http_request_duration_seconds_count'
+                      '{route="recipe:recipe-list"} 1', body)
+        self.assertIn('http_request_db_queries_total'
+                      '{route="recipe:recipe-list"}', body)
+        self.assertIn('http_response_size_bytes_total'
+                      '{route="recipe:recipe-list"} 2', body)
+
+    def test_cache_hits_recorded(self):
+        """Testing if cache hits noted on a request are counted."""
+
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+
+        def view(req):
+            record_cache(req, hit=True)
+            record_cache(req, hit=False)
+            record_cache(req, hit=True)
+            return HttpResponse()
+
+        MetricsMiddleware(view)(request)
+
+        body = self.registry.render()
+
+        self.assertIn('http_cache_hits_total{route="<unresolved>"} 2', body)
+        self.assertIn('http_cache_misses_total{route="<unresolved>"} 1',
+                      body)
+
+    def test_metrics_aggregated_across_processes(self):
+        """Testing if values dumped by other workers are summed."""
+
+        with tempfile.TemporaryDirectory() as directory:
+            other = Registry(directory=directory)
+            other.inc('http_requests_total', (('route', 'x'),), 2)
+            other.observe('http_request_duration_seconds', (('route', 'x'),),
+                          0.02)
+            other.flush()
+            path, = glob.glob(os.path.join(directory, 'metrics-*.json'))
+            os.rename(path, os.path.join(directory,
+                                         f'metrics-{os.getppid()}.json'))
+
+            registry = Registry(directory=directory)
+            registry.inc('http_requests_total', (('route', 'x'),), 3)
+
+            body = registry.render()
+
+        self.assertIn('http_requests_total{route="x"} 5', body)
+        self.assertIn('http_request_duration_seconds_bucket'
+                      '{route="x",le="0.025"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket'
+                      '{route="x",le="0.01"} 0', body)
+
+    def test_metrics_of_exited_processes_dropped(self):
+        """Testing if files left by processes no longer running are removed
+        instead of summed."""
+
+        def kill(pid, signal):
+            if pid == 99999:
+                raise ProcessLookupError
+
+        with tempfile.TemporaryDirectory() as directory, \
+                patch('core.metrics.os.kill', side_effect=kill):
+            other = Registry(directory=directory)
+            other.inc('http_requests_total', (('route', 'x'),), 2)
+            other.flush()
+            path, = glob.glob(os.path.join(directory, 'metrics-*.json'))
+            os.rename(path, os.path.join(directory, 'metrics-99999.json'))
+
+            registry = Registry(directory=directory)
+            registry.inc('http_requests_total', (('route', 'x'),), 3)
+
+            body = registry.render()
+            left = glob.glob(os.path.join(directory, 'metrics-*.json'))
+
+        self.assertIn('http_requests_total{route="x"} 3', body)
+        self.assertEqual(left, [os.path.join(directory,
+                                             f'metrics-{os.getpid()}.json')])
+
+    def test_metrics_restricted(self):
+        """Testing if metrics are only served to staff and to scrapers
+        with the token."""
+
+        user = get_user_model().objects.create_user('test@fueanta.com',
+                                                    'pass123')
+        url = reverse('metrics')
+
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.assertEqual(
+                self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong')
+                .status_code, 403
+            )
+            self.assertEqual(
+                self.client.get(url, HTTP_AUTHORIZATION='Bearer secret')
+                .status_code, 200
+            )
+
+            self.client.force_login(user)
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+            user.is_staff = True
+            user.save()
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.logout()
+        self.assertEqual(
+            self.client.get(url, HTTP_AUTHORIZATION='Bearer ').status_code,
+            403
+        )
+
+    @skipUnless(os.environ.get(TIMING_ENV), 'timing benchmarks disabled')
+    def test_middleware_overhead(self):
+        """Testing if the middleware costs less than 50 µs per request."""
+
+        response = HttpResponse(b'{}')
+        middleware = MetricsMiddleware(lambda req: response)
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        runs = 2000
+
+        started = time.perf_counter()
+        for _ in range(runs):
+            middleware(request)
+        elapsed = (time.perf_counter() - started) / runs
+
+        self.assertLess(elapsed, 50e-6,
+                        f'{elapsed * 1e6:.1f} us per request')
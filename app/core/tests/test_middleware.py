@@ -0,0 +1,111 @@
+import os
+import time
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.http import HttpResponse
+from django.test import SimpleTestCase, RequestFactory, override_settings
+
+from core.middleware import ScopedMiddleware
+from core.tests.utils import TIMING_ENV
+
+FULL_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+def middleware_chain(middleware):
+    """Builds a handler running middleware around a trivial view."""
+
+    with override_settings(MIDDLEWARE=middleware):
+        handler = BaseHandler()
+        handler._get_response = lambda request: HttpResponse(b'{}')
+        handler.load_middleware()
+
+    return handler._middleware_chain
+
+
+class ScopedMiddlewareTests(SimpleTestCase):
+    """Test cases for the path scoped middleware stack."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.requests = []
+
+        def view(request):
+            self.requests.append(request)
+            return HttpResponse()
+
+        self.middleware = ScopedMiddleware(view)
+
+    def test_api_requests_skip_scoped_middleware(self):
+        """Testing if API requests get no session, user or messages."""
+
+        self.middleware(self.factory.get('/api/recipe/recipes/'))
+
+        request = self.requests[0]
+
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertFalse(hasattr(request, 'user'))
+        self.assertFalse(hasattr(request, '_messages'))
+
+    def test_admin_requests_run_scoped_middleware(self):
+        """Testing if admin requests still get the full stack."""
+
+        self.middleware(self.factory.get('/admin/'))
+
+        request = self.requests[0]
+
+        self.assertTrue(hasattr(request, 'session'))
+        self.assertTrue(hasattr(request, 'user'))
+        self.assertTrue(hasattr(request, '_messages'))
+
+    def test_csrf_enforced_outside_api(self):
+        """Testing if CSRF protection still guards non API views."""
+
+        def view(request):
+            return HttpResponse()
+
+        res = self.middleware.process_view(
+            self.factory.post('/admin/login/'), view, (), {}
+        )
+        api_res = self.middleware.process_view(
+            self.factory.post('/api/user/token/'), view, (), {}
+        )
+
+        self.assertEqual(res.status_code, 403)
+        self.assertIsNone(api_res)
+
+    @skipUnless(os.environ.get(TIMING_ENV), 'timing benchmarks disabled')
+    def test_api_stack_faster_than_full_stack(self):
+        """Benchmark the API middleware stack against the full one."""
+
+        runs = 5000
+        timings = {}
+
+        for name, middleware in (('full', FULL_MIDDLEWARE),
+                                 ('scoped', settings.MIDDLEWARE)):
+            chain = middleware_chain(middleware)
+            requests = [
+                self.factory.get('/api/recipe/recipes/',
+                                 HTTP_COOKIE='sessionid=x; csrftoken=y')
+                for _ in range(runs)
+            ]
+
+            started = time.perf_counter()
+            for request in requests:
+                chain(request)
+            timings[name] = (time.perf_counter() - started) / runs
+
+        self.assertLess(
+            timings['scoped'], timings['full'],
+            f'API middleware overhead: full {timings["full"] * 1e6:.1f} us, '
+            f'scoped {timings["scoped"] * 1e6:.1f} us per request'
+        )
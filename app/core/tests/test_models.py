@@ -1,6 +1,8 @@
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_delete
 from django.test import TestCase
 
 from core import models
@@ -73,6 +75,18 @@ class TestUserModel(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_names_unique_per_user_once_normalized(self):
+        """Testing if a user cannot have two tags differing only in case or
+        spacing."""
+
+        user = sample_user()
+        tag = models.Tag.objects.create(user=user, name='Sea  Salt ')
+
+        self.assertEqual(tag.normalized_name, 'sea salt')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='sea salt')
+
     def test_recipe_object_representation(self):
         """Testing if a recipe object is represented by its title."""
 
@@ -98,3 +112,89 @@ class TestUserModel(TestCase):
         exp_path = f'uploads/images/{uuid}.jpg'
 
         self.assertEqual(file_path, exp_path)
+
+    def test_failed_user_delete_keeps_tombstones(self):
+        """Testing if a user whose deletion failed still gets tombstones for
+        the objects deleted afterwards."""
+
+        user = sample_user()
+        recipe = models.Recipe.objects.create(
+            user=user, title='Curry', time_in_minutes=5, price=2.00
+        )
+
+        def fail(**kwargs):
+            raise RuntimeError('failed')
+
+        post_delete.connect(fail, sender=models.Recipe)
+        self.addCleanup(post_delete.disconnect, fail, sender=models.Recipe)
+
+        for delete in (user.delete,
+                       get_user_model().objects.filter(pk=user.pk).delete):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                delete()
+
+        post_delete.disconnect(fail, sender=models.Recipe)
+        recipe_id = recipe.id
+        recipe.delete()
+
+        self.assertEqual(models.deleting_users, set())
+        self.assertTrue(models.SyncChange.objects.filter(
+            kind='recipe', object_id=recipe_id, deleted=True
+        ).exists())
+
+
+class TestPartitioning(TestCase):
+    """Test cases for users' data partitioned by user."""
+
+    def test_user_data_partitioned(self):
+        """Testing if recipes, tags, ingredients and their links are
+        partitioned tables split by user_id hash."""
+
+        for model in (models.Recipe, models.Tag, models.Ingredient,
+                      models.RecipeTag, models.RecipeIngredient):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_get_partkeydef(%s::regclass), COUNT(*) '
+                    'FROM pg_inherits WHERE inhparent = %s::regclass',
+                    [model._meta.db_table] * 2
+                )
+
+                self.assertEqual(cursor.fetchone(), ('HASH (user_id)', 8))
+
+    def test_links_carry_recipe_user(self):
+        """Testing if links get the user of their recipe, their partition
+        key."""
+
+        user = sample_user()
+        recipe = models.Recipe.objects.create(
+            user=user, title='Curry', time_in_minutes=5, price=2.00
+        )
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        ingredient = models.Ingredient.objects.create(user=user, name='Salt')
+
+        recipe.tags.add(tag)
+        models.RecipeIngredient.objects.create(recipe=recipe,
+                                               ingredient=ingredient)
+
+        self.assertEqual(models.RecipeTag.objects.get().user, user)
+        self.assertEqual(models.RecipeIngredient.objects.get().user, user)
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_links_checked_against_recipe_user(self):
+        """Testing if a link whose user does not own its recipe is refused
+        by the composite foreign key."""
+
+        user = sample_user()
+        other = sample_user('test2@fueanta.com')
+        recipe = models.Recipe.objects.create(
+            user=user, title='Curry', time_in_minutes=5, price=2.00
+        )
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+
+        with self.assertRaises(IntegrityError), transaction.atomic(), \
+                connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO core_recipe_tags (user_id, recipe_id, tag_id) '
+                'VALUES (%s, %s, %s)', [other.id, recipe.id, tag.id]
+            )
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
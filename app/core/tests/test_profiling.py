@@ -0,0 +1,117 @@
+import json
+import os
+import subprocess
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import profiling
+from core.tests.runner import TEST_SHARD
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+class SlowRequestLogTests(TestCase):
+    """Test cases for the slow request log."""
+
+    databases = {'default', TEST_SHARD}
+
+    def setUp(self):
+        self.state = profiling.SlowRequestLog(enabled=True, interval=60)
+        patcher = patch('core.profiling.state', self.state)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = get_user_model().objects.create_user('test@fueanta.com',
+                                                    'pass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    @patch('core.profiling.logger')
+    def test_slow_request_logged(self, logger):
+        """Testing if a slow request is logged with queries and profile."""
+
+        self.client.get(RECIPES_URL)
+
+        entry = json.loads(logger.warning.call_args[0][0])
+
+        self.assertEqual(entry['event'], 'slow_request')
+        self.assertEqual(entry['route'], 'recipe:recipe-list')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['query_count'], len(entry['queries']))
+        self.assertGreater(entry['query_count'], 0)
+        self.assertTrue(entry['profile'])
+        self.assertIn('slowest_query_plan', entry)
+
+    @patch('core.profiling.logger')
+    def test_slow_request_log_rate_limited(self, logger):
+        """Testing if at most one entry is logged per interval."""
+
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(logger.warning.call_count, 1)
+
+    @patch('core.profiling.logger')
+    def test_disabled_log_does_not_profile(self, logger):
+        """Testing if nothing is profiled or logged while disabled."""
+
+        self.state.enabled = False
+
+        with patch('core.profiling.profile_request') as profile_request:
+            self.client.get(RECIPES_URL)
+
+        profile_request.assert_not_called()
+        logger.warning.assert_not_called()
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=60000)
+    @patch('core.profiling.logger')
+    def test_fast_request_not_logged(self, logger):
+        """Testing if requests below the threshold are not logged."""
+
+        self.client.get(RECIPES_URL)
+
+        logger.warning.assert_not_called()
+
+    def test_toggle_with_command(self):
+        """Testing if the command toggles the log through a signal."""
+
+        profiling.install_signal_handler()
+
+        call_command('slow_requests', os.getpid(), stdout=StringIO())
+
+        self.assertFalse(self.state.enabled)
+
+    def test_command_refuses_process_without_handler(self):
+        """Testing if the command does not signal a process the signal
+        would terminate."""
+
+        process = subprocess.Popen(['sleep', '30'])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+
+        with self.assertRaisesMessage(CommandError, 'has no handler'):
+            call_command('slow_requests', process.pid, stdout=StringIO())
+
+        self.assertIsNone(process.poll())
+
+    def test_explain_slowest_query(self):
+        """Testing if a SELECT is explained with its execution plan."""
+
+        plan = profiling.explain('SELECT %s', [1])
+
+        self.assertIn('Plan', plan[0])
+
+    def test_explain_on_query_database(self):
+        """Testing if a query is explained on the database it ran on."""
+
+        plan = profiling.explain('SELECT current_database()', [], TEST_SHARD)
+
+        self.assertIn('Plan', plan[0])
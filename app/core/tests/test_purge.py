@@ -0,0 +1,137 @@
+import os
+import tempfile
+from io import StringIO
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Recipe, Tag, Ingredient, SyncChange
+from core.purge import request_purge, run_purge
+
+
+def sample_user(email='test@fueanta.com'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, 'pass123')
+
+
+class AccountPurgeTests(TestCase):
+    """Test cases for chunked account purges."""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.other_user = sample_user('test2@fueanta.com')
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='Salt')
+
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_in_minutes=5,
+                price=1.00
+            )
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+
+        self.other_recipe = Recipe.objects.create(
+            user=self.other_user, title='Not mine', time_in_minutes=5,
+            price=1.00
+        )
+        self.other_recipe.tags.add(self.tag)
+
+    def test_request_purge_deactivates_user(self):
+        """Testing if requesting a purge deactivates the user only."""
+
+        purge = request_purge(self.user)
+
+        self.user.refresh_from_db()
+
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(purge.email, self.user.email)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+
+    def test_run_purge_in_chunks(self):
+        """Testing if all data of the user is deleted chunk by chunk."""
+
+        purge = request_purge(self.user)
+        progress = []
+
+        run_purge(purge, chunk_size=2, progress=progress.append)
+
+        purge.refresh_from_db()
+
+        # 3 + 1 + 1 chunks of data, 4 of its 7 sync feed rows
+        self.assertEqual(len(progress), 9)
+        self.assertIsNotNone(purge.finished_at)
+        self.assertIsNone(purge.user)
+        self.assertEqual(purge.recipes_deleted, 5)
+        self.assertEqual(purge.tags_deleted, 1)
+        self.assertEqual(purge.ingredients_deleted, 1)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertEqual(list(Recipe.objects.all()), [self.other_recipe])
+        self.assertEqual(self.other_recipe.tags.count(), 0)
+        self.assertFalse(SyncChange.objects.filter(user_id=self.user.id))
+
+    def test_run_purge_resumes(self):
+        """Testing if an interrupted purge finishes when run again."""
+
+        purge = request_purge(self.user)
+
+        def interrupt(purge):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            run_purge(purge, chunk_size=2, progress=interrupt)
+
+        purge.refresh_from_db()
+        self.assertEqual(purge.recipes_deleted, 2)
+        self.assertIsNone(purge.finished_at)
+
+        call_command('purge_accounts', stdout=StringIO())
+
+        purge.refresh_from_db()
+        self.assertEqual(purge.recipes_deleted, 5)
+        self.assertIsNotNone(purge.finished_at)
+
+    def test_run_purge_deletes_images(self):
+        """Testing if recipe images are removed from storage."""
+
+        recipe = Recipe.objects.filter(user=self.user).first()
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(fp=ntf, format='JPEG')
+            ntf.seek(0)
+            recipe.image.save('test.jpg', File(ntf))
+
+        path = recipe.image.path
+        self.assertTrue(os.path.exists(path))
+
+        purge = run_purge(request_purge(self.user))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(purge.images_deleted, 1)
+
+    def test_run_purge_counts_shared_images_once(self):
+        """Testing if an image shared by copies of a recipe is deleted, and
+        counted, once with the last of them."""
+
+        recipe, copy = Recipe.objects.filter(user=self.user)[:2]
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(fp=ntf, format='JPEG')
+            ntf.seek(0)
+            recipe.image.save('test.jpg', File(ntf))
+
+        Recipe.objects.filter(id__in=[recipe.id, copy.id]) \
+            .update(image=recipe.image.name)
+
+        purge = run_purge(request_purge(self.user), chunk_size=1)
+
+        self.assertFalse(os.path.exists(recipe.image.path))
+        self.assertEqual(purge.images_deleted, 1)
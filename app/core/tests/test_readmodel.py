@@ -0,0 +1,144 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import readmodel
+from core.models import Recipe, Tag, Ingredient
+from core.purge import request_purge, run_purge
+from recipe.duplicates import duplicate_recipes
+from recipe.imports import RecipeImporter
+from recipe.merges import merge_attrs
+
+
+def sample_user(email='test@fueanta.com'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, 'pass123')
+
+
+def sample_recipe(user, title='Salad'):
+    """Creates and returns a sample recipe."""
+
+    return Recipe.objects.create(user=user, title=title, time_in_minutes=5,
+                                 price=1.00)
+
+
+class ReadModelTests(TestCase):
+    """Test cases for keeping the recipe read model in step."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        self.recipe = sample_recipe(self.user)
+
+    def cached(self, recipe):
+        recipe = Recipe.objects.get(id=recipe.id)
+
+        return (recipe.cached_tag_ids, recipe.cached_tag_names,
+                recipe.cached_ingredient_ids, recipe.cached_ingredient_names)
+
+    def assertInStep(self):
+        self.assertEqual(readmodel.verify(), [])
+
+    def test_add_remove_clear(self):
+        """Testing if changing a recipe's relations updates its lists."""
+
+        self.recipe.tags.add(self.quick, self.vegan)
+        self.recipe.ingredients.add(self.salt)
+
+        self.assertEqual(
+            self.cached(self.recipe),
+            ([self.vegan.id, self.quick.id], ['Vegan', 'Quick'],
+             [self.salt.id], ['Salt'])
+        )
+        self.assertEqual(self.recipe.cached_tag_ids,
+                         [self.vegan.id, self.quick.id])
+
+        self.recipe.tags.remove(self.vegan)
+        self.assertEqual(self.cached(self.recipe)[0], [self.quick.id])
+
+        self.recipe.tags.clear()
+        self.assertEqual(self.cached(self.recipe)[:2], ([], []))
+
+        self.quick.recipe_set.add(self.recipe)
+        self.assertEqual(self.cached(self.recipe)[0], [self.quick.id])
+
+        self.quick.recipe_set.clear()
+        self.assertEqual(self.cached(self.recipe)[0], [])
+        self.assertInStep()
+
+    def test_rename_and_delete(self):
+        """Testing if renamed and deleted tags show in the lists."""
+
+        self.recipe.tags.add(self.vegan, self.quick)
+
+        self.vegan.name = 'Plant based'
+        self.vegan.save()
+        self.assertEqual(self.cached(self.recipe)[1], ['Plant based', 'Quick'])
+
+        self.quick.delete()
+        self.assertEqual(self.cached(self.recipe)[:2],
+                         ([self.vegan.id], ['Plant based']))
+        self.assertInStep()
+
+    def test_merge(self):
+        """Testing if merged tags are replaced by the target."""
+
+        self.recipe.tags.add(self.quick)
+        merge_attrs(self.user, Tag, self.vegan.id, [self.quick.id])
+
+        self.assertEqual(self.cached(self.recipe)[:2],
+                         ([self.vegan.id], ['Vegan']))
+        self.assertInStep()
+
+    def test_duplicate_and_import(self):
+        """Testing if copied and imported recipes get their lists."""
+
+        self.recipe.tags.add(self.vegan)
+        self.recipe.ingredients.add(self.salt)
+
+        copy_id, = duplicate_recipes(self.user, [self.recipe.id])
+        RecipeImporter(self.user).run([{
+            'title': 'Soup', 'time_in_minutes': 10, 'price': '2.00',
+            'tags': ['Quick', 'Vegan'], 'ingredients': ['Water'],
+        }])
+
+        soup = Recipe.objects.get(title='Soup')
+
+        self.assertEqual(self.cached(Recipe(id=copy_id)),
+                         self.cached(self.recipe))
+        self.assertEqual(self.cached(soup)[:2],
+                         ([self.vegan.id, self.quick.id], ['Vegan', 'Quick']))
+        self.assertEqual(self.cached(soup)[3], ['Water'])
+        self.assertInStep()
+
+    def test_purge_updates_other_users(self):
+        """Testing if purged tags drop from other users' recipes."""
+
+        other_recipe = sample_recipe(sample_user('test2@fueanta.com'))
+        other_recipe.tags.add(self.vegan)
+
+        run_purge(request_purge(self.user))
+
+        self.assertEqual(self.cached(other_recipe)[:2], ([], []))
+        self.assertInStep()
+
+    def test_overlap_lookup(self):
+        """Testing if the overlap lookup matches any shared element."""
+
+        self.recipe.tags.add(self.vegan)
+        sample_recipe(self.user, 'Bread').tags.add(self.quick)
+
+        def titles(tag_ids):
+            return sorted(
+                Recipe.objects.filter(cached_tag_ids__overlap=tag_ids)
+                .values_list('title', flat=True)
+            )
+
+        self.assertEqual(titles([self.vegan.id]), ['Salad'])
+        self.assertEqual(titles([self.vegan.id, self.quick.id]),
+                         ['Bread', 'Salad'])
+        self.assertEqual(titles([0]), [])
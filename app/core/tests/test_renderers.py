@@ -0,0 +1,103 @@
+import io
+import json
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+
+from core.parsers import JSONParser
+from core.renderers import JSONRenderer
+
+
+class JSONRendererTests(SimpleTestCase):
+    """Test cases for the fast JSON renderer."""
+
+    def setUp(self):
+        self.renderer = JSONRenderer()
+
+    def test_render_decimal_and_uuid(self):
+        """Testing if Decimal and UUID values are rendered like DRF does."""
+
+        key = uuid.uuid4()
+        data = {'price': Decimal('5.50'), 'key': key}
+
+        rendered = self.renderer.render(data)
+
+        self.assertEqual(json.loads(rendered),
+                         {'price': 5.5, 'key': str(key)})
+
+    def test_render_is_compact(self):
+        """Testing if rendered output has no insignificant whitespace."""
+
+        rendered = self.renderer.render({'id': 1, 'tags': [1, 2]})
+
+        self.assertEqual(rendered, b'{"id":1,"tags":[1,2]}')
+
+    def test_render_none_is_empty(self):
+        """Testing if rendering None returns an empty body."""
+
+        self.assertEqual(self.renderer.render(None), b'')
+
+    def test_render_matches_stdlib(self):
+        """Testing if the fast codec output equals DRF's stdlib output."""
+
+        data = [
+            {'id': i, 'title': f'Recipe {i} é', 'price': Decimal('1.25'),
+             'tags': [1, 2, 3], 'link': ''}
+            for i in range(1000)
+        ]
+
+        rendered = self.renderer.render(data)
+        expected = renderers.JSONRenderer().render(data)
+
+        self.assertEqual(json.loads(rendered), json.loads(expected))
+
+    def test_render_indent_falls_back_to_stdlib(self):
+        """Testing if an indent request is honoured."""
+
+        rendered = self.renderer.render(
+            {'id': 1}, 'application/json; indent=4'
+        )
+
+        self.assertEqual(rendered, b'{\n    "id": 1\n}')
+
+    @patch('core.renderers.orjson', None)
+    def test_render_without_fast_codec(self):
+        """Testing if the renderer works when orjson is not installed."""
+
+        rendered = self.renderer.render({'price': Decimal('2.00')})
+
+        self.assertEqual(rendered, b'{"price":2.0}')
+
+
+class JSONParserTests(SimpleTestCase):
+    """Test cases for the fast JSON parser."""
+
+    def setUp(self):
+        self.parser = JSONParser()
+
+    def test_parse_valid_json(self):
+        """Testing if a valid JSON body is parsed."""
+
+        stream = io.BytesIO(b'{"title": "Boiled Rice", "tags": [1, 2]}')
+
+        data = self.parser.parse(stream)
+
+        self.assertEqual(data, {'title': 'Boiled Rice', 'tags': [1, 2]})
+
+    def test_parse_invalid_json(self):
+        """Testing if an invalid JSON body raises a parse error."""
+
+        with self.assertRaises(ParseError):
+            self.parser.parse(io.BytesIO(b'{"title": '))
+
+    @patch('core.parsers.orjson', None)
+    def test_parse_without_fast_codec(self):
+        """Testing if the parser works when orjson is not installed."""
+
+        data = self.parser.parse(io.BytesIO(b'{"id": 1}'))
+
+        self.assertEqual(data, {'id': 1})
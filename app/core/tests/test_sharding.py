@@ -0,0 +1,327 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import readmodel, sharding
+from core.models import Recipe, RecipeTag, Tag, Ingredient, SyncChange, \
+    TagUsage
+from core.tests.runner import TEST_SHARD
+
+TAGS_URL = reverse('recipe:tag-list')
+SHARDS = ['default', TEST_SHARD]
+
+
+def sample_user(email='test@fueanta.com', shard='default'):
+    """Creates and returns sample user object placed on a shard."""
+
+    with patch('core.sharding.shard_for', return_value=shard):
+        return get_user_model().objects.create_user(email, 'pass123')
+
+
+def sample_data(user):
+    """Creates and returns sample recipes of a user with tags and
+    ingredients."""
+
+    vegan = Tag.objects.create(user=user, name='Vegan')
+    quick = Tag.objects.create(user=user, name='Quick')
+    salt = Ingredient.objects.create(user=user, name='Salt')
+
+    recipes = []
+    for i in range(3):
+        recipe = Recipe.objects.create(user=user, title=f'Recipe {i}',
+                                       time_in_minutes=5, price=1.00)
+        recipe.tags.add(vegan, *([quick] if i else []))
+        recipe.ingredients.add(salt)
+        recipes.append(recipe)
+
+    return recipes
+
+
+def rebalance(target, *args):
+    """Runs the rebalance command with every user hashing to a shard,
+    returns its output."""
+
+    out = StringIO()
+
+    with patch('core.sharding.shard_for', return_value=target):
+        call_command('rebalance_shards', '--drain-seconds', '0', *args,
+                     stdout=out, stderr=out)
+
+    return out.getvalue()
+
+
+@override_settings(SHARDS=SHARDS)
+class ShardRoutingTests(TestCase):
+    """Test cases for routing users' data to their shard."""
+
+    databases = {'default', TEST_SHARD}
+
+    def setUp(self):
+        self.user = sample_user(shard=TEST_SHARD)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def test_shard_for_moves_users_to_new_shard_only(self):
+        """Testing if adding a shard only moves users onto the new one."""
+
+        with override_settings(SHARDS=['default', 'a']):
+            before = [sharding.shard_for(user_id) for user_id in range(500)]
+
+        with override_settings(SHARDS=['default', 'a', 'b']):
+            after = [sharding.shard_for(user_id) for user_id in range(500)]
+
+        moved = [new for old, new in zip(before, after) if old != new]
+
+        self.assertTrue(moved)
+        self.assertEqual(set(moved), {'b'})
+        self.assertEqual(set(before), {'default', 'a'})
+
+    def test_new_user_placed_on_shard(self):
+        """Testing if a new user is put on a shard, with a copy there."""
+
+        self.user.refresh_from_db()
+
+        self.assertEqual(self.user.shard, TEST_SHARD)
+        self.assertTrue(get_user_model().objects.using(TEST_SHARD)
+                        .filter(pk=self.user.pk).exists())
+
+    def test_active_shard_routes_queries(self):
+        """Testing if user data is read and written on the active shard."""
+
+        with sharding.use(TEST_SHARD):
+            tag = Tag.objects.create(user=self.user, name='Vegan')
+
+            self.assertEqual(Tag.objects.get().name, 'Vegan')
+
+        self.assertEqual(tag._state.db, TEST_SHARD)
+        self.assertFalse(Tag.objects.using('default').exists())
+        self.assertEqual(sharding.current(), 'default')
+
+    def test_reserved_ids(self):
+        """Testing if a shard hands out IDs from its own range."""
+
+        sharding.reserve_ids(TEST_SHARD)
+
+        with sharding.use(TEST_SHARD):
+            tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertGreaterEqual(tag.id, settings.SHARD_ID_RANGE)
+
+    def test_duplicate_on_shard(self):
+        """Testing if recipes duplicated on a shard get IDs from its range
+        and keep their links."""
+
+        sharding.reserve_ids(TEST_SHARD)
+
+        with sharding.use(TEST_SHARD):
+            recipe = sample_data(self.user)[1]
+
+        res = self.client.post(
+            reverse('recipe:recipe-duplicate', args=[recipe.id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(res.data['id'], recipe.id)
+        self.assertEqual(
+            sorted(RecipeTag.objects.using(TEST_SHARD)
+                   .filter(recipe_id=res.data['id'])
+                   .values_list('user', 'tag__name')),
+            [(self.user.id, 'Quick'), (self.user.id, 'Vegan')]
+        )
+        self.assertFalse(Recipe.objects.using('default').exists())
+
+    def test_token_activates_user_shard(self):
+        """Testing if token authenticated requests use the user's shard."""
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Tag.objects.using(TEST_SHARD)
+                        .filter(name='Vegan').exists())
+        self.assertFalse(Tag.objects.using('default').exists())
+        self.assertTrue(SyncChange.objects.using(TEST_SHARD)
+                        .filter(user=self.user).exists())
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan'])
+        self.assertEqual(sharding.current(), 'default')
+
+    def test_moving_user_asked_to_retry(self):
+        """Testing if requests of a user being moved fail with 503."""
+
+        get_user_model().objects.filter(pk=self.user.pk) \
+            .update(moving_to='default')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+    def test_delete_user_deletes_shard_copy(self):
+        """Testing if deleting a user deletes their copy on the shard."""
+
+        self.user.delete()
+
+        self.assertFalse(get_user_model().objects.using(TEST_SHARD).exists())
+
+
+@override_settings(SHARDS=SHARDS)
+class RebalanceShardsTests(TestCase):
+    """Test cases for moving users' data between shards."""
+
+    databases = {'default', TEST_SHARD}
+
+    def setUp(self):
+        self.user = sample_user()
+        self.other_user = sample_user('test2@fueanta.com')
+
+        self.recipes = sample_data(self.user)
+        sample_data(self.other_user)
+
+        self.feed = list(SyncChange.objects.filter(user=self.user)
+                         .order_by('id').values_list('kind', 'object_id'))
+        self.last_change = SyncChange.objects.order_by('id').last().id
+
+    def test_dry_run(self):
+        """Testing if a dry run only lists the users to move."""
+
+        output = rebalance(TEST_SHARD, '--dry-run')
+
+        self.assertIn(f'{self.user.email}: default -> {TEST_SHARD}', output)
+        self.assertIn('2 users to move.', output)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.shard, 'default')
+
+    def test_move_user(self):
+        """Testing if a user's data is moved with its read model, usage
+        counts and change feed intact."""
+
+        output = rebalance(TEST_SHARD, '--user', self.user.email,
+                           '--chunk-size', '2')
+
+        self.assertIn('Moved 1 users.', output)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.shard, TEST_SHARD)
+        self.assertEqual(self.user.moving_to, '')
+
+        self.assertFalse(Recipe.objects.using('default')
+                         .filter(user=self.user).exists())
+        self.assertEqual(Recipe.objects.using('default').count(), 3)
+        self.assertEqual(
+            list(Recipe.objects.using(TEST_SHARD).order_by('id')
+                 .values_list('id', 'title', 'created_at')),
+            [(recipe.id, recipe.title, recipe.created_at)
+             for recipe in self.recipes]
+        )
+
+        with sharding.use(TEST_SHARD):
+            self.assertEqual(readmodel.verify(), [])
+            self.assertEqual(Recipe.objects.get(pk=self.recipes[0].pk)
+                             .cached_tag_names, ['Vegan'])
+            self.assertEqual(
+                dict(TagUsage.objects.values_list('tag__name', 'count')),
+                {'Vegan': 3, 'Quick': 2}
+            )
+
+            changes = list(SyncChange.objects.order_by('id'))
+
+        self.assertEqual([(change.kind, change.object_id)
+                          for change in changes], self.feed)
+        self.assertGreater(changes[0].id, self.last_change)
+
+        # the sequence was reset past the renumbered feed
+        with sharding.use(TEST_SHARD):
+            SyncChange.objects.record(self.user.id, 'recipe',
+                                      [self.recipes[0].id])
+
+            self.assertGreater(
+                SyncChange.objects.get(object_id=self.recipes[0].id,
+                                       kind='recipe').id,
+                changes[-1].id
+            )
+
+    def test_moved_user_served_from_shard(self):
+        """Testing if requests of a moved user see their data."""
+
+        rebalance(TEST_SHARD, '--user', self.user.email)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token '
+                           f'{Token.objects.create(user=self.user)}')
+
+        res = client.get(TAGS_URL)
+
+        self.assertEqual(sorted(tag['name'] for tag in res.data),
+                         ['Quick', 'Vegan'])
+
+    def test_move_back(self):
+        """Testing if moving a user back removes their shard copy."""
+
+        rebalance(TEST_SHARD, '--user', self.user.email)
+        rebalance('default', '--user', self.user.email)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.shard, 'default')
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertFalse(get_user_model().objects.using(TEST_SHARD).exists())
+        self.assertFalse(Recipe.objects.using(TEST_SHARD).exists())
+
+    def test_taken_id_aborts_move(self):
+        """Testing if a move finding an ID taken on the target shard leaves
+        the user where they were."""
+
+        squatter = sample_user('test3@fueanta.com', shard=TEST_SHARD)
+        get_user_model().objects.filter(pk=squatter.pk).update(is_active=False)
+
+        taken = Tag.objects.filter(user=self.user).first().id
+
+        with sharding.use(TEST_SHARD):
+            Tag.objects.create(id=taken, user=squatter, name='Taken')
+
+        with self.assertRaisesMessage(CommandError, '1 users could not'):
+            rebalance(TEST_SHARD, '--user', self.user.email)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.shard, 'default')
+        self.assertEqual(self.user.moving_to, '')
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertFalse(Recipe.objects.using(TEST_SHARD).exists())
+
+    def test_interrupted_cleanup_resumed(self):
+        """Testing if data left on the source by a move interrupted after
+        the switch is deleted by the next run."""
+
+        with patch('core.rebalance._delete_source',
+                   side_effect=RuntimeError('killed')), \
+                self.assertRaises(RuntimeError):
+            rebalance(TEST_SHARD, '--user', self.user.email)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.shard, TEST_SHARD)
+        self.assertEqual(self.user.moved_from, 'default')
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+        output = rebalance(TEST_SHARD, '--dry-run')
+
+        self.assertIn(f'{self.user.email}: {TEST_SHARD} -> {TEST_SHARD}',
+                      output)
+
+        rebalance(TEST_SHARD, '--user', self.user.email)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.moved_from, '')
+        self.assertEqual(self.user.moving_to, '')
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+        self.assertEqual(Recipe.objects.using(TEST_SHARD).count(), 3)
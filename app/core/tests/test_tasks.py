@@ -0,0 +1,201 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.metrics import Registry
+from core.models import Task
+
+calls = []
+
+
+@tasks.task(name='tests.record')
+def record(value, suffix=''):
+    calls.append(f'{value}{suffix}')
+
+
+@tasks.task(name='tests.fail', max_attempts=2, retry_delay=30)
+def fail():
+    raise ValueError('Broken.')
+
+
+class TaskTests(TestCase):
+    """Test cases for background tasks on the database backend."""
+
+    def setUp(self):
+        calls.clear()
+
+        self.registry = Registry()
+        patcher = patch('core.tasks.registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_defer_queues_call(self):
+        """Testing if deferring a task queues its arguments, not a run."""
+
+        task_id = record.defer(1, suffix='!')
+
+        task = Task.objects.get(id=task_id)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(task.name, 'tests.record')
+        self.assertEqual(task.status, 'queued')
+        self.assertEqual(task.max_attempts, 5)
+
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, ['1!'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_priority_then_due_time_order(self):
+        """Testing if higher priorities run first, then older calls, and
+        calls not due yet do not run."""
+
+        record.defer('low')
+        record.enqueue(['high'], priority=5)
+        record.enqueue(['later'], priority=10, delay=60)
+        record.defer('low 2')
+
+        tasks.run_pending()
+
+        self.assertEqual(calls, ['high', 'low', 'low 2'])
+        self.assertEqual(Task.objects.get().arguments,
+                         '{"args": ["later"], "kwargs": {}}')
+
+    def test_failure_retried_with_backoff(self):
+        """Testing if a failing call is retried later, then kept as
+        failed once out of attempts."""
+
+        task_id = fail.defer()
+        before = timezone.now()
+
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(tasks.run_pending(), 1)
+
+        task = Task.objects.get(id=task_id)
+        self.assertEqual(task.status, 'queued')
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('Broken.', task.last_error)
+        self.assertGreaterEqual(task.run_at, before + timedelta(seconds=15))
+        self.assertLessEqual(task.run_at,
+                             timezone.now() + timedelta(seconds=30))
+
+        with patch('core.tasks.timezone.now',
+                   return_value=task.run_at + timedelta(seconds=1)), \
+                self.assertLogs('core.tasks', 'WARNING'):
+            tasks.run_pending()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertEqual(task.attempts, 2)
+        self.assertIsNotNone(task.finished_at)
+
+    def test_backoff_doubles_up_to_maximum(self):
+        """Testing if retry delays double per attempt and are capped."""
+
+        with patch('core.tasks.random.uniform', return_value=1.0), \
+                self.settings(TASKS_MAX_RETRY_DELAY=100):
+            delays = [fail.next_delay(attempts) for attempts in (1, 2, 3)]
+
+        self.assertEqual(delays, [30, 60, 100])
+
+    def test_unknown_task_fails(self):
+        """Testing if a call of a task not registered fails."""
+
+        task = Task.objects.create(name='tests.missing', max_attempts=3)
+
+        with self.assertLogs('core.tasks', 'WARNING'):
+            tasks.run_pending()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertIn('Unknown task tests.missing.', task.last_error)
+
+    def test_stale_running_tasks_requeued(self):
+        """Testing if calls whose worker died are put back in the queue."""
+
+        started = timezone.now() - timedelta(hours=1)
+        lost = Task.objects.create(name='tests.record', status='running',
+                                   attempts=1, max_attempts=2,
+                                   started_at=started)
+        spent = Task.objects.create(name='tests.record', status='running',
+                                    attempts=2, max_attempts=2,
+                                    started_at=started)
+        running = Task.objects.create(name='tests.record',
+                                      status='running', attempts=1,
+                                      max_attempts=2,
+                                      started_at=timezone.now())
+
+        Task.objects.requeue_stale(timezone.now() - timedelta(minutes=10))
+
+        statuses = dict(Task.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {lost.id: 'queued', spent.id: 'failed',
+                                    running.id: 'running'})
+
+    def test_metrics_recorded(self):
+        """Testing if enqueued calls and outcomes are counted."""
+
+        record.defer(1)
+        fail.defer()
+
+        with self.assertLogs('core.tasks', 'WARNING'):
+            tasks.run_pending()
+
+        counters = {(name, tuple(map(tuple, labels))): value
+                    for name, labels, value
+                    in self.registry.snapshot()['counters']}
+
+        self.assertEqual(counters[('tasks_enqueued_total',
+                                   (('task', 'tests.record'),))], 1)
+        self.assertEqual(counters[('tasks_total', (
+            ('task', 'tests.record'), ('outcome', 'succeeded')))], 1)
+        self.assertEqual(counters[('tasks_total', (
+            ('task', 'tests.fail'), ('outcome', 'retried')))], 1)
+
+    def test_run_workers_burst(self):
+        """Testing if the command runs the due calls and exits."""
+
+        record.defer(1)
+        record.defer(2)
+        out = StringIO()
+
+        call_command('run_workers', '--burst', stdout=out)
+
+        self.assertEqual(sorted(calls), ['1', '2'])
+        self.assertIn('Workers stopped.', out.getvalue())
+
+
+@override_settings(TASKS_BACKEND='core.tasks.InMemoryBackend')
+class InMemoryBackendTests(TestCase):
+    """Test cases for the in-memory task backend."""
+
+    def setUp(self):
+        calls.clear()
+        self.backend = tasks.get_backend()
+        self.addCleanup(self.backend.clear)
+
+    def test_runs_without_database(self):
+        """Testing if calls are queued in memory and run in order."""
+
+        record.defer('low')
+        record.enqueue(['high'], priority=1)
+
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(tasks.run_pending(), 2)
+        self.assertEqual(calls, ['high', 'low'])
+
+    def test_failed_calls_kept(self):
+        """Testing if calls out of attempts are kept with their error."""
+
+        fail.enqueue(delay=0)
+
+        with patch('core.tasks.Task.next_delay', return_value=0), \
+                self.assertLogs('core.tasks', 'WARNING'):
+            tasks.run_pending()
+
+        [(job, error)] = self.backend.failed.values()
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('Broken.', error)
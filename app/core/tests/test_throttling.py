@@ -0,0 +1,218 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import SharedBuckets, default_path, parse_rate
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+TMP_DIR = tempfile.mkdtemp()
+
+REST_FRAMEWORK = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'cheap': '5/min', 'expensive': '2/min'},
+}
+
+
+class SharedBucketsTests(TestCase):
+    """Test cases for the shared memory token buckets."""
+
+    def setUp(self):
+        self.path = os.path.join(TMP_DIR, 'buckets')
+        self.buckets = SharedBuckets(self.path, slot_count=16)
+        self.buckets.reset()
+
+    @patch('core.throttling.time.time', return_value=1000.0)
+    def test_bucket_refills_over_time(self, now):
+        """Testing if a bucket allows bursts and refills at its rate."""
+
+        self.assertEqual(self.buckets.consume('a', 2, 1.0), 0)
+        self.assertEqual(self.buckets.consume('a', 2, 1.0), 0)
+        self.assertEqual(self.buckets.consume('a', 2, 1.0), 1.0)
+
+        now.return_value = 1000.5
+        self.assertEqual(self.buckets.consume('a', 2, 1.0), 0.5)
+
+        now.return_value = 1001.5
+        self.assertEqual(self.buckets.consume('a', 2, 1.0), 0)
+
+    def test_buckets_are_independent(self):
+        """Testing if keys do not share tokens."""
+
+        self.buckets.consume('a', 1, 1.0)
+
+        self.assertEqual(self.buckets.consume('b', 1, 1.0), 0)
+
+    def test_buckets_shared_between_mappings(self):
+        """Testing if separate mappings of the file (as in other worker
+        processes) see each other's counts."""
+
+        other = SharedBuckets(self.path, slot_count=16)
+
+        self.buckets.consume('a', 1, 0.001)
+
+        self.assertGreater(other.consume('a', 1, 0.001), 0)
+
+    def test_full_table_evicts_least_recently_used(self):
+        """Testing if a key still gets a bucket when its probes are full."""
+
+        for i in range(32):
+            self.buckets.consume(f'key-{i}', 1, 0.001)
+
+        self.assertEqual(self.buckets.consume('new', 1, 0.001), 0)
+
+    def test_link_not_followed(self):
+        """Testing if a link planted as the buckets file is refused."""
+
+        target = os.path.join(TMP_DIR, 'target')
+        link = os.path.join(TMP_DIR, 'link')
+        open(target, 'w').close()
+        os.symlink(target, link)
+        self.addCleanup(os.remove, link)
+        self.addCleanup(os.remove, target)
+
+        with self.assertRaises(OSError):
+            SharedBuckets(link, slot_count=16)
+
+        self.assertEqual(os.path.getsize(target), 0)
+
+    def test_default_path_in_private_directory(self):
+        """Testing if the default file is kept where only the user can
+        reach it, and a shared directory is refused."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch('core.throttling.tempfile.gettempdir',
+                      return_value=tmp_dir):
+            path = default_path()
+            directory = os.path.dirname(path)
+
+            self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+            os.chmod(directory, 0o777)
+
+            with self.assertRaises(ImproperlyConfigured):
+                default_path()
+
+    def test_parse_rate(self):
+        """Testing if rates are read as requests per period."""
+
+        self.assertEqual(parse_rate('30/min'), (30, 60))
+        self.assertEqual(parse_rate('5/second'), (5, 1))
+        self.assertEqual(parse_rate('1000/day'), (1000, 86400))
+
+        for rate in ('30', '30/week', 'x/min', '0/min', '/min', None):
+            with self.assertRaises(ImproperlyConfigured):
+                parse_rate(rate)
+
+
+@override_settings(REST_FRAMEWORK=REST_FRAMEWORK,
+                   THROTTLE_BUCKETS_PATH=os.path.join(TMP_DIR, 'api'))
+class ThrottlingApiTests(TestCase):
+    """Test cases for API rate limiting."""
+
+    def setUp(self):
+        SharedBuckets(os.path.join(TMP_DIR, 'api')).reset()
+
+        self.user = get_user_model().objects.create_user('test@fueanta.com',
+                                                         'pass123')
+        self.client = APIClient()
+
+    def test_expensive_requests_have_own_budget(self):
+        """Testing if filtered lists are limited separately from cheap ones."""
+
+        self.client.force_authenticate(self.user)
+
+        for _ in range(2):
+            res = self.client.get(RECIPES_URL, {'tags': '1'})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(RECIPES_URL, {'tags': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_budgets_are_per_user(self):
+        """Testing if one user exhausting a budget does not affect others."""
+
+        self.client.force_authenticate(self.user)
+
+        for _ in range(5):
+            self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        other = get_user_model().objects.create_user('test2@fueanta.com',
+                                                     'pass123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_login_is_expensive(self):
+        """Testing if token requests are limited by the expensive budget."""
+
+        payload = {'email': 'test@fueanta.com', 'password': 'wrong'}
+
+        for _ in range(2):
+            self.client.post(TOKEN_URL, payload)
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    def test_login_budget_per_address(self):
+        """Testing if token requests for other accounts from the same
+        address share its budget."""
+
+        for _ in range(2):
+            self.client.post(TOKEN_URL, {'email': 'test@fueanta.com',
+                                         'password': 'wrong'})
+
+        res = self.client.post(TOKEN_URL, {'email': 'test2@fueanta.com',
+                                           'password': 'wrong'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_login_budget_per_account(self):
+        """Testing if token requests for one account from other addresses
+        share its budget."""
+
+        for address in ('10.0.0.1', '10.0.0.2'):
+            self.client.post(TOKEN_URL, {'email': 'test@fueanta.com',
+                                         'password': 'wrong'},
+                             REMOTE_ADDR=address)
+
+        res = self.client.post(TOKEN_URL, {'email': 'Test2@fueanta.com',
+                                           'password': 'wrong'},
+                               REMOTE_ADDR='10.0.0.3')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, {'email': ' TEST@fueanta.com',
+                                           'password': 'wrong'},
+                               REMOTE_ADDR='10.0.0.4')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_login_body_not_an_object(self):
+        """Testing if a token request whose body is not an object is
+        rejected as invalid."""
+
+        res = self.client.post(TOKEN_URL, [1, 2], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
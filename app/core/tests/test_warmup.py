@@ -0,0 +1,77 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core import warmup
+from core.management.commands.profile_imports import parse_importtime
+
+IMPORTTIME = '''import time: self [us] | cumulative | imported package
+import time:       120 |        120 | _io
+import time:      2500 |       4000 | django.utils
+import time:      1500 |       1500 |   django.utils.version
+'''
+
+
+def broken():
+    raise ValueError('Broken.')
+
+
+class WarmupTests(TestCase):
+    """Test cases for warming up a worker before it takes traffic."""
+
+    def test_run_times_each_hook(self):
+        """Testing if every hook runs and gets its own timing."""
+
+        timings = warmup.run(['core.warmup.compile_urls',
+                              'core.warmup.prime_token_lookup'])
+
+        self.assertEqual([path for path, _ in timings],
+                         ['core.warmup.compile_urls',
+                          'core.warmup.prime_token_lookup'])
+        self.assertTrue(all(seconds >= 0 for _, seconds in timings))
+
+    def test_failing_hook_logged(self):
+        """Testing if a failing hook is logged and the others still run."""
+
+        with self.assertLogs('core.warmup', 'ERROR') as logs:
+            timings = warmup.run(['core.tests.test_warmup.broken',
+                                  'core.warmup.connect_databases'])
+
+        self.assertEqual(len(timings), 2)
+        self.assertIn('core.tests.test_warmup.broken', logs.output[0])
+        self.assertIsNotNone(connection.connection)
+
+    def test_build_serializers(self):
+        """Testing if project serializers are built without warnings."""
+
+        with patch('core.warmup.logger') as logger:
+            warmup.build_serializers()
+
+        logger.warning.assert_not_called()
+
+
+class ProfileImportsTests(SimpleTestCase):
+    """Test cases for profiling the cold start of a worker."""
+
+    def test_parse_importtime(self):
+        """Testing if import timings are read per module."""
+
+        self.assertEqual(parse_importtime(IMPORTTIME), [
+            ('_io', 120, 120),
+            ('django.utils', 2500, 4000),
+            ('django.utils.version', 1500, 1500),
+        ])
+
+    def test_profile_imports(self):
+        """Testing if a fresh worker is profiled, warm-up included."""
+
+        out = StringIO()
+
+        call_command('profile_imports', '--limit', '3', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('modules imported in', output)
+        self.assertIn('core.warmup.compile_urls', output)
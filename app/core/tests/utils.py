@@ -0,0 +1,106 @@
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+FIXTURE_SIZES = (1, 10, 100)
+
+# Wall-clock budgets are only enforced when this is set, timings are too
+# noisy on shared CI machines to fail builds by default.
+TIMING_ENV = 'QUERY_BUDGET_TIMING'
+
+# Path of a JSON file the issued queries per endpoint are merged into.
+REPORT_ENV = 'QUERY_BUDGET_REPORT'
+
+
+class QueryBudgetTestCase(TestCase):
+    """Test case asserting SQL query budgets for API endpoints."""
+
+    report = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.report = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        path = os.environ.get(REPORT_ENV)
+
+        if path and cls.report:
+            existing = {}
+            if os.path.exists(path):
+                with open(path) as file:
+                    existing = json.load(file)
+
+            existing.update(cls.report)
+
+            with open(path, 'w') as file:
+                json.dump(existing, file, indent=2, sort_keys=True)
+
+        super().tearDownClass()
+
+    @contextmanager
+    def assertQueryBudget(self, name, max_queries, max_ms=None):
+        """Asserts the wrapped block stays within a query (and time) budget
+        and issues no duplicated queries."""
+
+        started = time.perf_counter()
+
+        with CaptureQueriesContext(connection) as context:
+            yield context
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        queries = [query['sql'] for query in context.captured_queries]
+
+        self.report[name] = {
+            'count': len(queries),
+            'elapsed_ms': round(elapsed_ms, 2),
+            'queries': queries,
+        }
+
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{name} issued {len(queries)} queries, budget is '
+            f'{max_queries}:\n' + '\n'.join(queries)
+        )
+
+        duplicates = [sql for sql, count in Counter(queries).items()
+                      if count > 1]
+        self.assertFalse(
+            duplicates,
+            f'{name} issued duplicated queries:\n' + '\n'.join(duplicates)
+        )
+
+        if max_ms is not None and os.environ.get(TIMING_ENV):
+            self.assertLessEqual(
+                elapsed_ms, max_ms,
+                f'{name} took {elapsed_ms:.1f} ms, budget is {max_ms} ms.'
+            )
+
+    def assertConstantQueries(self, name, max_queries, grow, request,
+                              sizes=FIXTURE_SIZES, max_ms=None):
+        """Asserts `request()` issues the same number of queries, within
+        budget, while `grow(size)` enlarges the fixture to each size."""
+
+        counts = []
+
+        for size in sizes:
+            grow(size)
+
+            with self.assertQueryBudget(f'{name}[{size}]', max_queries,
+                                        max_ms) as context:
+                request()
+
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(
+            len(set(counts)), 1,
+            f'{name} query count grows with fixture size: '
+            f'{dict(zip(sizes, counts))}'
+        )
@@ -0,0 +1,228 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+SLOT = struct.Struct('<Qdd')
+
+SLOT_COUNT = 65536
+
+PROBES = 8
+
+DEFAULT_SCOPE = 'cheap'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Returns the number of requests and period in seconds of a
+    `num/period` rate, the period read from its first letter like DRF
+    does."""
+
+    try:
+        num, period = rate.split('/')
+        num_requests, duration = int(num), PERIODS[period[0]]
+    except (AttributeError, ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f'Invalid throttle rate {rate!r}.')
+
+    if num_requests < 1:
+        raise ImproperlyConfigured(f'Invalid throttle rate {rate!r}.')
+
+    return num_requests, duration
+
+
+class SharedBuckets:
+    """Token buckets kept in a memory mapped file shared by all worker
+    processes of a host.
+
+    Every bucket occupies a fixed size slot (key hash, tokens, last update)
+    found by open addressing, and is updated under a file lock so the read,
+    refill and take steps are atomic across processes and threads.
+    """
+
+    def __init__(self, path, slot_count=SLOT_COUNT):
+        self.path = path
+        self.slot_count = slot_count
+        self._lock = threading.Lock()
+
+        size = SLOT.size * slot_count
+        # a link planted in its place is not followed
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW,
+                           0o600)
+
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+
+        self._map = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+
+        # zero marks a free slot
+        return int.from_bytes(digest, 'little') or 1
+
+    def _find_slot(self, key_hash):
+        """Returns the offset of the key's slot, or of the slot to take over
+        for it (a free one, else the least recently used probe)."""
+
+        start = key_hash % self.slot_count
+        victim = None
+
+        for probe in range(PROBES):
+            offset = (start + probe) % self.slot_count * SLOT.size
+            slot_hash, _, updated = SLOT.unpack_from(self._map, offset)
+
+            if slot_hash in (key_hash, 0):
+                return offset
+
+            if victim is None or updated < victim[1]:
+                victim = (offset, updated)
+
+        return victim[0]
+
+    def consume(self, key, capacity, rate, cost=1):
+        """Takes cost tokens from the bucket of key if it has enough.
+
+        Returns the seconds to wait before the request would be allowed,
+        zero when the tokens were taken.
+        """
+
+        key_hash = self._hash(key)
+        now = time.time()
+
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset = self._find_slot(key_hash)
+                slot_hash, tokens, updated = SLOT.unpack_from(self._map,
+                                                              offset)
+
+                if slot_hash != key_hash:
+                    tokens, updated = capacity, now
+
+                tokens = min(capacity, tokens + (now - updated) * rate)
+
+                if tokens >= cost:
+                    tokens -= cost
+                    wait = 0
+                else:
+                    wait = (cost - tokens) / rate
+
+                SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        return wait
+
+    def reset(self):
+        """Empties every bucket."""
+
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._map[:] = bytes(len(self._map))
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def default_path():
+    """Returns the buckets file in a directory of the temp directory only
+    the current user can access, creating the directory."""
+
+    directory = os.path.join(tempfile.gettempdir(),
+                             f'recipe-app-{os.getuid()}')
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    info = os.lstat(directory)
+
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or \
+            info.st_mode & 0o077:
+        raise ImproperlyConfigured(
+            f'{directory} is not a private directory, set '
+            f'THROTTLE_BUCKETS_PATH.'
+        )
+
+    return os.path.join(directory, 'throttle.buckets')
+
+
+def get_buckets():
+    """Returns the shared buckets of the configured file."""
+
+    path = getattr(settings, 'THROTTLE_BUCKETS_PATH', None) or default_path()
+
+    with _buckets_lock:
+        if path not in _buckets:
+            _buckets[path] = SharedBuckets(path)
+
+        return _buckets[path]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttles each user (or client IP) with a token bucket per scope.
+
+    The scope comes from the view's `get_throttle_scope(request)` or its
+    `throttle_scope` attribute, falling back to `cheap`. Anonymous requests
+    are limited per client IP and, when the view's
+    `get_throttle_account(request)` names an account, per account too, so
+    neither one address trying many accounts nor many addresses trying one
+    get past the rate. A rate of `num/period` in DEFAULT_THROTTLE_RATES
+    allows bursts of num requests, refilled evenly over the period.
+    """
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_scope(self, request, view):
+        if hasattr(view, 'get_throttle_scope'):
+            return view.get_throttle_scope(request)
+
+        return getattr(view, 'throttle_scope', DEFAULT_SCOPE)
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+        if rate is None:
+            return True
+
+        num_requests, duration = parse_rate(rate)
+
+        if request.user and request.user.is_authenticated:
+            idents = [f'user:{request.user.pk}']
+        else:
+            idents = [f'ip:{self.get_ident(request)}']
+
+            if hasattr(view, 'get_throttle_account'):
+                account = view.get_throttle_account(request)
+
+                if account:
+                    idents.append(f'account:{account}')
+
+        for ident in idents:
+            wait = get_buckets().consume(f'{scope}:{ident}', num_requests,
+                                         num_requests / duration)
+
+            if wait:
+                self.retry_after = math.ceil(wait)
+                return False
+
+        return True
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from core.metrics import registry
+
+
+def _may_scrape(request):
+    """Lets staff users in, and scrapers sending the METRICS_TOKEN as a
+    bearer token."""
+
+    user = getattr(request, 'user', None)
+
+    if user is not None and user.is_active and user.is_staff:
+        return True
+
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    scheme, _, credentials = \
+        request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+
+    return bool(token) and scheme.lower() == 'bearer' and \
+        constant_time_compare(credentials.strip(), token)
+
+
+def metrics(request):
+    """Expose the request metrics of all workers in Prometheus format."""
+
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,90 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from django.utils.module_loading import autodiscover_modules, import_string
+from rest_framework.authtoken.models import Token
+from rest_framework.serializers import Serializer
+
+logger = logging.getLogger(__name__)
+
+
+def _walk(resolver):
+    for pattern in resolver.url_patterns:
+        # compiled lazily on first use otherwise
+        pattern.pattern.regex
+
+        if isinstance(pattern, URLResolver):
+            pattern.reverse_dict
+            _walk(pattern)
+
+
+def compile_urls():
+    """Imports the URLconfs with their views, compiles every URL pattern
+    and fills the reverse lookup tables."""
+
+    resolver = get_resolver()
+    resolver.reverse_dict
+    _walk(resolver)
+
+
+def connect_databases():
+    """Opens the connection to every configured database."""
+
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def build_serializers():
+    """Builds the fields of every project serializer once, filling the
+    model metadata caches their fields are built from."""
+
+    autodiscover_modules('serializers')
+
+    for serializer_class in set(_subclasses(Serializer)):
+        if serializer_class.__module__.startswith('rest_framework.'):
+            continue
+
+        try:
+            serializer_class().fields
+        except Exception:
+            logger.warning('Could not warm up %s.', serializer_class,
+                           exc_info=True)
+
+
+def prime_token_lookup():
+    """Runs the token authentication query once, so its SQL compilation
+    code and the database side of the lookup are warm."""
+
+    Token.objects.select_related('user').filter(key='').first()
+
+
+def run(hooks=None):
+    """Calls the warm-up hooks, WARMUP_HOOKS by default, and returns how
+    long each took as (path, seconds) pairs.
+
+    Failing hooks are logged and skipped, warming up never stops a worker
+    from starting.
+    """
+
+    timings = []
+
+    for path in settings.WARMUP_HOOKS if hooks is None else hooks:
+        started = time.perf_counter()
+
+        try:
+            import_string(path)()
+        except Exception:
+            logger.exception('Warm-up hook %s failed.', path)
+
+        timings.append((path, time.perf_counter() - started))
+
+    return timings
@@ -0,0 +1,150 @@
+import os
+
+from django.utils import timezone
+
+from core import sharding
+from core.models import Recipe, SyncChange, TagUsage, IngredientUsage, \
+    image_file_path
+from core.sharding import connection
+
+COPIED_COLUMNS = ('title', 'time_in_minutes', 'price', 'link', 'image',
+                  'user_id', 'cached_tag_ids', 'cached_tag_names',
+                  'cached_ingredient_ids', 'cached_ingredient_names')
+
+TIMESTAMP_COLUMNS = ('created_at', 'updated_at')
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _mapping(id_map):
+    """Returns SQL selecting the old -> new ID pairs, and its params."""
+
+    sql = ' UNION ALL '.join(
+        ['SELECT %s AS old_id, %s AS new_id'] * len(id_map)
+    )
+
+    return sql, [value for pair in id_map.items() for value in pair]
+
+
+def _columns():
+    """Returns the copied and the timestamp column lists of a recipe row."""
+
+    return (', '.join(_quote(column) for column in COPIED_COLUMNS),
+            ', '.join(_quote(column) for column in TIMESTAMP_COLUMNS))
+
+
+def _now():
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    return [now] * len(TIMESTAMP_COLUMNS)
+
+
+def _insert_copies(cursor, user, recipe_ids):
+    """Copies all the user's recipe rows with one INSERT ... SELECT,
+    returns the old -> new ID mapping.
+
+    The new IDs are drawn from the table's sequence first, so every copy
+    is known to belong to its source without relying on insert order.
+    """
+
+    table = _quote(Recipe._meta.db_table)
+    columns, timestamps = _columns()
+
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+        "FROM generate_series(1, %s)",
+        [Recipe._meta.db_table, len(recipe_ids)]
+    )
+    id_map = dict(zip(recipe_ids, (row[0] for row in cursor.fetchall())))
+
+    mapping, params = _mapping(id_map)
+    cursor.execute(
+        f'INSERT INTO {table} ({_quote("id")}, {columns}, {timestamps}, '
+        f'version) SELECT m.new_id, {columns}, %s, %s, 1 FROM {table} '
+        f'INNER JOIN ({mapping}) m ON {table}.{_quote("id")} = m.old_id '
+        f'WHERE {table}.user_id = %s',
+        [*_now(), *params, user.id]
+    )
+
+    return id_map
+
+
+def _copy_through_rows(cursor, through, column, user, id_map):
+    """Copies the through rows of every source recipe of the user to its
+    copy in one INSERT ... SELECT joined against the old -> new ID
+    mapping."""
+
+    mapping, params = _mapping(id_map)
+    table = _quote(through._meta.db_table)
+
+    cursor.execute(
+        f'INSERT INTO {table} (user_id, recipe_id, {_quote(column)}) '
+        f'SELECT t.user_id, m.new_id, t.{_quote(column)} FROM {table} t '
+        f'INNER JOIN ({mapping}) m ON t.recipe_id = m.old_id '
+        f'WHERE t.user_id = %s',
+        [*params, user.id]
+    )
+
+
+def _copy_image(recipe):
+    """Gives a recipe its own copy of its image file, returns its name."""
+
+    storage = recipe.image.storage
+
+    with storage.open(recipe.image.name) as source:
+        name = storage.save(
+            image_file_path(recipe, os.path.basename(recipe.image.name)),
+            source
+        )
+
+    Recipe.objects.filter(id=recipe.id).update(image=name)
+
+    return name
+
+
+def duplicate_recipes(user, recipe_ids, copy_image=False):
+    """Duplicates recipes of a user with their tags and ingredients in one
+    transaction, returns the IDs of the copies in the order given.
+
+    Copies share the source image file unless copy_image is set. Image
+    files copied by a duplication that fails are deleted again, as no row
+    refers to them once the transaction is rolled back.
+    """
+
+    id_map = {}
+    copied = []
+
+    if not recipe_ids:
+        return []
+
+    try:
+        with sharding.atomic():
+            with connection.cursor() as cursor:
+                id_map = _insert_copies(cursor, user, recipe_ids)
+
+                _copy_through_rows(cursor, Recipe.tags.through, 'tag_id',
+                                   user, id_map)
+                _copy_through_rows(cursor, Recipe.ingredients.through,
+                                   'ingredient_id', user, id_map)
+
+            TagUsage.objects.count_links(recipe_ids=id_map.values())
+            IngredientUsage.objects.count_links(recipe_ids=id_map.values())
+
+            SyncChange.objects.record(user.id, 'recipe', id_map.values())
+
+            if copy_image:
+                copies = Recipe.objects.filter(id__in=id_map.values(),
+                                               image__gt='')
+                for recipe in copies:
+                    copied.append(_copy_image(recipe))
+    except BaseException:
+        storage = Recipe._meta.get_field('image').storage
+
+        for name in copied:
+            storage.delete(name)
+
+        raise
+
+    return [id_map[recipe_id] for recipe_id in recipe_ids]
@@ -0,0 +1,76 @@
+from itertools import islice
+
+from core.models import Recipe
+from core.renderers import dumps
+
+EXPORT_CHUNK_SIZE = 2000
+
+RECIPE_FIELDS = ('id', 'title', 'time_in_minutes', 'price', 'link', 'image',
+                 'cached_tag_ids', 'cached_tag_names',
+                 'cached_ingredient_ids', 'cached_ingredient_names')
+
+
+def _related(ids, names):
+    """Pairs the cached IDs and names of one of a recipe's relations."""
+
+    return [{'id': related_id, 'name': name}
+            for related_id, name in zip(ids, names)]
+
+
+def iter_recipes(user, request=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields every recipe of a user as a plain dict, chunk by chunk.
+
+    Recipe rows are read through a server-side cursor, tags and
+    ingredients included from the read model, so memory stays bounded by
+    the chunk size.
+    """
+
+    storage = Recipe._meta.get_field('image').storage
+
+    rows = Recipe.objects.filter(user=user).order_by('id') \
+        .values(*RECIPE_FIELDS).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+
+        if not chunk:
+            return
+
+        for row in chunk:
+            image = row['image']
+            if image:
+                image = storage.url(image)
+                if request is not None:
+                    image = request.build_absolute_uri(image)
+
+            yield {
+                'id': row['id'],
+                'title': row['title'],
+                'ingredients': _related(row['cached_ingredient_ids'],
+                                        row['cached_ingredient_names']),
+                'tags': _related(row['cached_tag_ids'],
+                                 row['cached_tag_names']),
+                'time_in_minutes': row['time_in_minutes'],
+                'price': str(row['price']),
+                'link': row['link'],
+                'image': image or None,
+            }
+
+
+def iter_ndjson(recipes):
+    """Encodes recipes as newline delimited JSON."""
+
+    for recipe in recipes:
+        yield dumps(recipe) + b'\n'
+
+
+def iter_json(recipes):
+    """Encodes recipes as a single JSON array without buffering it."""
+
+    separator = b'['
+
+    for recipe in recipes:
+        yield separator + dumps(recipe)
+        separator = b','
+
+    yield b'[]' if separator == b'[' else b']'
@@ -0,0 +1,262 @@
+import codecs
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from core import sharding
+from core.models import Recipe, Tag, Ingredient, SyncChange, TagUsage, \
+    IngredientUsage, normalize_name
+from core.sharding import connection
+
+IMPORT_BATCH_SIZE = 1000
+
+CSV_LIST_SEPARATOR = ';'
+
+# range of the integer columns
+MIN_INT, MAX_INT = -2 ** 31, 2 ** 31 - 1
+
+
+def iter_ndjson(stream):
+    """Yields one record per non-blank line of an NDJSON text stream."""
+
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv(stream):
+    """Yields one record per row of a CSV text stream with a header row.
+
+    The `tags` and `ingredients` columns hold names separated by `;`.
+    """
+
+    for row in csv.DictReader(stream):
+        for field in ('tags', 'ingredients'):
+            row[field] = (row.get(field) or '').split(CSV_LIST_SEPARATOR)
+
+        yield row
+
+
+def iter_records(stream, input_format):
+    """Decodes a binary stream of NDJSON or CSV into recipe records."""
+
+    text = codecs.getreader('utf-8')(stream)
+
+    if input_format == 'csv':
+        return iter_csv(text)
+
+    return iter_ndjson(text)
+
+
+def _max_length(model, name):
+    return model._meta.get_field(name).max_length
+
+
+def _check_length(value, max_length, what, number):
+    if len(value) > max_length:
+        raise ValueError(f'Record {number}: {what} may be at most '
+                         f'{max_length} characters.')
+
+    return value
+
+
+def _clean_names(names, model, number):
+    """Returns the stripped, non-blank names in input order, dropping those
+    equal to an earlier one once normalized."""
+
+    cleaned = {}
+    max_length = _max_length(model, 'name')
+
+    for name in names or []:
+        name = str(name).strip()
+
+        if name:
+            _check_length(name, max_length, 'names', number)
+            cleaned.setdefault(normalize_name(name), name)
+
+    return list(cleaned.values())
+
+
+def _check_price(price, number):
+    """Refuses a price the price column cannot hold."""
+
+    field = Recipe._meta.get_field('price')
+    limit = Decimal(10) ** (field.max_digits - field.decimal_places)
+
+    if not price.is_finite() or abs(price) >= limit:
+        raise ValueError(f'Record {number}: price must be less than '
+                         f'{limit}.')
+
+    return price
+
+
+def _clean_record(record, number):
+    """Validates a raw record and converts it into recipe field values."""
+
+    try:
+        title = str(record['title']).strip()
+        time_in_minutes = int(record['time_in_minutes'])
+        price = Decimal(str(record['price'])).quantize(Decimal('0.01'))
+    except (KeyError, TypeError, ValueError, InvalidOperation) as exc:
+        raise ValueError(f'Record {number}: invalid or missing {exc}.')
+
+    if not title:
+        raise ValueError(f'Record {number}: title may not be blank.')
+
+    if not MIN_INT <= time_in_minutes <= MAX_INT:
+        raise ValueError(f'Record {number}: time_in_minutes is out of '
+                         f'range.')
+
+    return {
+        'title': _check_length(title, _max_length(Recipe, 'title'),
+                               'title', number),
+        'time_in_minutes': time_in_minutes,
+        'price': _check_price(price, number),
+        'link': _check_length(str(record.get('link') or ''),
+                              _max_length(Recipe, 'link'), 'link', number),
+        'tags': _clean_names(record.get('tags'), Tag, number),
+        'ingredients': _clean_names(record.get('ingredients'), Ingredient,
+                                    number),
+    }
+
+
+class RecipeImporter:
+    """Bulk loads recipe records, with their tags and ingredients, for a user.
+
+    Records are processed in batches, each in its own transaction on the
+    user's shard, so an interrupted import can be resumed by skipping the
+    records that were already processed.
+    """
+
+    def __init__(self, user, batch_size=IMPORT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+
+    def run(self, records, start=0, progress=None):
+        """Imports records, skipping the first `start`, and returns the
+        number of records processed so far including the skipped ones.
+
+        `progress` is called with that number after every batch commits.
+        """
+
+        records = iter(records)
+        processed = start
+
+        for _ in islice(records, start):
+            pass
+
+        while True:
+            batch = [
+                _clean_record(record, processed + i + 1)
+                for i, record in enumerate(islice(records, self.batch_size))
+            ]
+
+            if not batch:
+                return processed
+
+            with sharding.use(self.user.shard), sharding.atomic():
+                self._import_batch(batch)
+
+            processed += len(batch)
+
+            if progress is not None:
+                progress(processed)
+
+    def _resolve_names(self, model, names):
+        """Maps names to the user's objects, creating missing ones."""
+
+        objs = model.objects.get_or_create_names(self.user, names)
+
+        return {name: objs[normalize_name(name)] for name in names}
+
+    def _create_recipes(self, batch, tags, ingredients):
+        """Creates the recipe rows of a batch, with their read model filled
+        in, and returns them with IDs."""
+
+        recipes = []
+
+        for record in batch:
+            recipe_tags = sorted((tags[name] for name in record['tags']),
+                                 key=lambda obj: obj.id)
+            recipe_ingredients = sorted(
+                (ingredients[name] for name in record['ingredients']),
+                key=lambda obj: obj.id
+            )
+
+            recipes.append(Recipe(
+                user=self.user,
+                title=record['title'],
+                time_in_minutes=record['time_in_minutes'],
+                price=record['price'],
+                link=record['link'],
+                cached_tag_ids=[obj.id for obj in recipe_tags],
+                cached_tag_names=[obj.name for obj in recipe_tags],
+                cached_ingredient_ids=[obj.id for obj in recipe_ingredients],
+                cached_ingredient_names=[
+                    obj.name for obj in recipe_ingredients
+                ],
+            ))
+
+        return Recipe.objects.bulk_create(recipes)
+
+    def _import_batch(self, batch):
+        tags = self._resolve_names(
+            Tag, {name for record in batch for name in record['tags']}
+        )
+        ingredients = self._resolve_names(
+            Ingredient,
+            {name for record in batch for name in record['ingredients']}
+        )
+
+        recipes = self._create_recipes(batch, tags, ingredients)
+
+        # bulk inserts send no post_save
+        SyncChange.objects.record(self.user.id, 'recipe',
+                                  [recipe.id for recipe in recipes])
+
+        tag_rows = []
+        ingredient_rows = []
+
+        for recipe, record in zip(recipes, batch):
+            tag_rows.extend(
+                (recipe.id, tags[name].id) for name in record['tags']
+            )
+            ingredient_rows.extend(
+                (recipe.id, ingredients[name].id)
+                for name in record['ingredients']
+            )
+
+        copy_through_rows(Recipe.tags.through, 'tag_id', self.user.id,
+                          tag_rows)
+        copy_through_rows(Recipe.ingredients.through, 'ingredient_id',
+                          self.user.id, ingredient_rows)
+
+        recipe_ids = [recipe.id for recipe in recipes]
+
+        if tag_rows:
+            TagUsage.objects.count_links(recipe_ids=recipe_ids)
+        if ingredient_rows:
+            IngredientUsage.objects.count_links(recipe_ids=recipe_ids)
+
+
+def copy_through_rows(through, column, user_id, rows):
+    """Inserts (recipe_id, <column>) pairs of a user's recipes into an M2M
+    through table with COPY."""
+
+    if not rows:
+        return
+
+    buffer = io.StringIO(
+        ''.join(f'{user_id}\t{recipe_id}\t{other_id}\n'
+                for recipe_id, other_id in rows)
+    )
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {connection.ops.quote_name(through._meta.db_table)} '
+            f'(user_id, recipe_id, {connection.ops.quote_name(column)}) '
+            f'FROM STDIN',
+            buffer
+        )
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.db.models import Max
+
+from core.models import SyncChange
+
+INDEX_CACHE_SIZE = 64
+
+# bounds staleness from writes committed out of feed order
+INDEX_MAX_AGE = 60
+
+# more recipe changes than this since an index was built rebuild it
+INDEX_MAX_CHANGES = 100
+
+_caches = []
+
+
+def to_int(positions, size):
+    """Returns an int with the bits at the given positions set."""
+
+    bits = bytearray((size + 7) // 8)
+
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+
+    return int.from_bytes(bits, 'little')
+
+
+def iter_positions(bits):
+    """Yields the positions of the set bits of an int in ascending order."""
+
+    for offset, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8,
+                                                'little')):
+        while byte:
+            low = byte & -byte
+            yield offset * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def add_planes(bitsets):
+    """Adds up bitsets into bit planes: bit i of plane j is bit j of the
+    number of sets having bit i."""
+
+    planes = []
+
+    for carry in bitsets:
+        for plane, bits in enumerate(planes):
+            planes[plane] = bits ^ carry
+            carry &= bits
+
+            if not carry:
+                break
+
+        if carry:
+            planes.append(carry)
+
+    return planes
+
+
+def count_planes(counts):
+    """Returns the bit planes of a list of non-negative numbers."""
+
+    positions = []
+
+    for position, count in enumerate(counts):
+        for plane in range(count.bit_length()):
+            while plane >= len(positions):
+                positions.append([])
+
+            if count >> plane & 1:
+                positions[plane].append(position)
+
+    return [to_int(plane, len(counts)) for plane in positions]
+
+
+def equal_bits(planes, value, all_bits):
+    """Returns the bits of the numbers in planes that equal value."""
+
+    if value.bit_length() > len(planes):
+        return 0
+
+    bits = all_bits
+
+    for plane, plane_bits in enumerate(planes):
+        bits &= plane_bits if value >> plane & 1 else all_bits ^ plane_bits
+
+    return bits
+
+
+def current_version(user_id):
+    """Returns the head of a user's change feed, which moves on every
+    recorded write to their recipes."""
+
+    return SyncChange.objects.filter(user_id=user_id) \
+        .aggregate(version=Max('id'))['version'] or 0
+
+
+class IndexCache:
+    """Per process cache of in-memory indexes over the recipes of the most
+    recently used users.
+
+    An index is reused while the head of its user's change feed stays put
+    and it is younger than INDEX_MAX_AGE. Index classes with an `updated`
+    method are brought up to date from the recipes changed on the feed
+    since, others are rebuilt.
+    """
+
+    def __init__(self, index_class, size=INDEX_CACHE_SIZE):
+        self.index_class = index_class
+        self.size = size
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+        _caches.append(self)
+
+    def _changes(self, user_id, version):
+        """Returns the recipes changed after a version as {id: deleted}, or
+        None if there are too many of them."""
+
+        changes = list(
+            SyncChange.objects.filter(user_id=user_id, kind='recipe',
+                                      id__gt=version)
+            .values_list('object_id', 'deleted')[:INDEX_MAX_CHANGES + 1]
+        )
+
+        if len(changes) > INDEX_MAX_CHANGES:
+            return None
+
+        return dict(changes)
+
+    def get(self, user_id):
+        """Returns the index of a user, building or updating it as needed."""
+
+        version = current_version(user_id)
+
+        with self._lock:
+            index = self._indexes.get(user_id)
+
+        if index is not None and \
+                time.monotonic() - index.built_at >= INDEX_MAX_AGE:
+            index = None
+
+        if index is not None and index.version != version:
+            changes = None
+
+            if hasattr(index, 'updated'):
+                changes = self._changes(user_id, index.version)
+
+            index = None if changes is None \
+                else index.updated(user_id, changes, version)
+
+        if index is None:
+            index = self.index_class.build(user_id, version)
+
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+
+            while len(self._indexes) > self.size:
+                self._indexes.popitem(last=False)
+
+        return index
+
+    def clear(self):
+        """Drops every index."""
+
+        with self._lock:
+            self._indexes.clear()
+
+
+def clear_caches():
+    """Drops the indexes of every cache, for tests rolling back the data
+    they were built from."""
+
+    for cache in _caches:
+        cache.clear()
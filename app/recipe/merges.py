@@ -0,0 +1,78 @@
+from core import readmodel, sharding
+from core.models import Recipe, Tag, Ingredient, SyncChange, TagUsage, \
+    IngredientUsage
+from core.sharding import connection
+
+RELATIONS = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+USAGE = {
+    Tag: TagUsage,
+    Ingredient: IngredientUsage,
+}
+
+
+def merge_attrs(user, model, target_id, source_ids):
+    """Moves every recipe of the user's source tags or ingredients onto the
+    target and deletes the sources, in one transaction.
+
+    Recipes are re-pointed with one INSERT ... SELECT that skips those
+    already linked to the target, followed by one DELETE of the source
+    links, whatever the number of recipes involved. Both are limited to the
+    partitions of the users whose recipes were found using the sources.
+    The recipes move to their next version, so writes naming the version
+    read before the merge fail.
+    """
+
+    through = getattr(Recipe, RELATIONS[model]).through
+    column = f'{model._meta.model_name}_id'
+
+    quote = connection.ops.quote_name
+    table = quote(through._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(source_ids))
+
+    with sharding.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT DISTINCT user_id, recipe_id FROM {table} '
+            f'WHERE {quote(column)} IN ({placeholders})',
+            source_ids
+        )
+        rows = cursor.fetchall()
+        recipe_ids = [recipe_id for _, recipe_id in rows]
+        user_ids = sorted({user_id for user_id, _ in rows})
+
+        if user_ids:
+            users = 'user_id IN ({})'.format(', '.join(['%s'] * len(user_ids)))
+
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, recipe_id, {quote(column)}) '
+                f'SELECT DISTINCT user_id, recipe_id, %s FROM {table} '
+                f'WHERE {users} AND {quote(column)} IN ({placeholders}) '
+                f'ON CONFLICT DO NOTHING',
+                [target_id, *user_ids, *source_ids]
+            )
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {users} '
+                f'AND {quote(column)} IN ({placeholders})',
+                [*user_ids, *source_ids]
+            )
+
+        cursor.execute(
+            f'DELETE FROM {quote(USAGE[model]._meta.db_table)} '
+            f'WHERE user_id = %s AND {quote(column)} IN ({placeholders})',
+            [user.id, *source_ids]
+        )
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE user_id = %s AND id IN ({placeholders})',
+            [user.id, *source_ids]
+        )
+
+        readmodel.refresh(RELATIONS[model], recipe_ids, bump_version=True)
+        USAGE[model].objects.refresh([target_id])
+
+        SyncChange.objects.record(user.id, 'recipe', recipe_ids)
+        SyncChange.objects.record(user.id, model._meta.model_name,
+                                  source_ids, deleted=True)
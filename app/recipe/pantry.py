@@ -0,0 +1,86 @@
+import time
+
+from core.models import Recipe
+from recipe.indexes import IndexCache, add_planes, count_planes, \
+    equal_bits, iter_positions, to_int
+
+
+class PantryIndex:
+    """Bitsets over the recipes of one user, for ranking them by how many
+    of their ingredients are missing from a pantry.
+
+    Bit i of every set stands for the user's i-th recipe in ID order. Each
+    ingredient maps to the set of recipes using it, and the number of
+    ingredients of every recipe is kept bit-sliced: plane j holds bit j of
+    each recipe's count. Ranking adds up the pantry's sets into bit planes
+    the same way and subtracts them from the counts, so it takes a few
+    big-int operations per pantry ingredient, whatever the number of
+    recipes.
+    """
+
+    def __init__(self, recipe_ids, ingredient_bits, count_planes, version):
+        self.recipe_ids = recipe_ids
+        self.ingredient_bits = ingredient_bits
+        self.count_planes = count_planes
+        self.version = version
+        self.built_at = time.monotonic()
+        self.all_bits = (1 << len(recipe_ids)) - 1
+
+    @classmethod
+    def build(cls, user_id, version):
+        """Builds the index of a user's recipes from their read model."""
+
+        rows = Recipe.objects.filter(user_id=user_id).order_by('id') \
+            .values_list('id', 'cached_ingredient_ids')
+
+        recipe_ids = []
+        counts = []
+        positions = {}
+
+        for position, (recipe_id, ingredient_ids) in enumerate(rows):
+            recipe_ids.append(recipe_id)
+            counts.append(len(ingredient_ids))
+
+            for ingredient_id in ingredient_ids:
+                positions.setdefault(ingredient_id, []).append(position)
+
+        size = len(recipe_ids)
+
+        return cls(
+            recipe_ids,
+            {ingredient_id: to_int(ingredient_positions, size)
+             for ingredient_id, ingredient_positions in positions.items()},
+            count_planes(counts),
+            version
+        )
+
+    def ranked(self, pantry_ids, max_missing=0):
+        """Yields (recipe_id, missing) pairs of the recipes with at most
+        max_missing ingredients not in the pantry, fewest missing first,
+        then by ID."""
+
+        have = add_planes(self.ingredient_bits.get(ingredient_id, 0)
+                          for ingredient_id in set(pantry_ids))
+        missing = []
+        borrow = 0
+
+        # have never exceeds the count, so the planes of count cover it
+        for plane, count_bits in enumerate(self.count_planes):
+            have_bits = have[plane] if plane < len(have) else 0
+            missing.append(count_bits ^ have_bits ^ borrow)
+            borrow = (self.all_bits ^ count_bits) & (have_bits | borrow) | \
+                have_bits & borrow
+
+        for count in range(max_missing + 1):
+            for position in iter_positions(
+                    equal_bits(missing, count, self.all_bits)):
+                yield self.recipe_ids[position], count
+
+
+_indexes = IndexCache(PantryIndex)
+
+
+def get_index(user_id):
+    """Returns the pantry index of a user, see IndexCache."""
+
+    return _indexes.get(user_id)
@@ -0,0 +1,66 @@
+from core import readmodel, sharding
+from core.models import Recipe, TagUsage, IngredientUsage
+from core.sharding import connection
+
+USAGE = {
+    'tags': TagUsage,
+    'ingredients': IngredientUsage,
+}
+
+
+def _replace_sql(table, column, recipe, related_ids):
+    """Returns one statement deleting the links of a recipe to anything but
+    the given IDs and inserting the missing ones, which returns the
+    (related ID, added) of the links changed, and its params. Both only
+    touch the partition of the recipe's user."""
+
+    return (
+        f'WITH removed AS ('
+        f'DELETE FROM {table} WHERE user_id = %s AND recipe_id = %s '
+        f'AND NOT ({column} = ANY(%s::integer[])) RETURNING {column}'
+        f'), added AS ('
+        f'INSERT INTO {table} (user_id, recipe_id, {column}) '
+        f'SELECT %s, %s, unnest(%s::integer[]) '
+        f'ON CONFLICT (user_id, recipe_id, {column}) DO NOTHING '
+        f'RETURNING {column}'
+        f') SELECT {column}, false FROM removed '
+        f'UNION ALL SELECT {column}, true FROM added',
+        [recipe.user_id, recipe.id, related_ids,
+         recipe.user_id, recipe.id, related_ids]
+    )
+
+
+def replace(recipe, relation, related_ids):
+    """Makes the given IDs the tags or ingredients of a recipe, returns
+    the added and the removed IDs.
+
+    Unlike the related manager's set(), which reads the current links and
+    diffs them in Python, this deletes the links no longer wanted and
+    inserts the new ones in a single statement, skipping those that
+    exist. Usage counts and the read model are updated after it, as no
+    m2m_changed signal is sent.
+    """
+
+    related_ids = list(dict.fromkeys(related_ids))
+
+    field = Recipe._meta.get_field(relation)
+    quote = connection.ops.quote_name
+    table = quote(field.remote_field.through._meta.db_table)
+    column = quote(f'{field.related_model._meta.model_name}_id')
+
+    with sharding.atomic(savepoint=False), connection.cursor() as cursor:
+        cursor.execute(*_replace_sql(table, column, recipe, related_ids))
+        changed = cursor.fetchall()
+
+        added = [related_id for related_id, is_added in changed if is_added]
+        removed = [related_id for related_id, is_added in changed
+                   if not is_added]
+
+        if added or removed:
+            usage = USAGE[relation].objects
+            usage.count_links(recipe_ids=[recipe.id], attr_ids=added)
+            usage.uncount(removed)
+
+            readmodel.refresh_instance(recipe, relation)
+
+    return added, removed
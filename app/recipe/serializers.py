@@ -1,7 +1,33 @@
 from rest_framework import serializers
 
+from core import readmodel, sharding
+from recipe import relations
+from recipe.shopping import SHOPPING_MAX_RECIPES
+from recipe.similar import METRICS
+from recipe.versions import PreconditionFailed
 from core.models import Tag, Ingredient, Recipe
 
+SYNC_PAGE_SIZE = 500
+
+SYNC_MAX_PAGE_SIZE = 1000
+
+STATS_LIMIT = 10
+
+STATS_MAX_LIMIT = 100
+
+PANTRY_LIMIT = 100
+
+PANTRY_MAX_LIMIT = 1000
+
+PANTRY_MAX_MISSING = 10
+
+SIMILAR_LIMIT = 10
+
+SIMILAR_MAX_LIMIT = 100
+
+# largest value of the integer primary keys
+MAX_ID = 2 ** 31 - 1
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for Tag model."""
@@ -21,38 +47,338 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeAttrMergeSerializer(serializers.Serializer):
+    """Serializer for merging tags or ingredients into one of them."""
+
+    target = serializers.IntegerField(min_value=1)
+
+    sources = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=100
+    )
+
+    def validate(self, attrs):
+        """Drops repeated sources and rejects merging into a source."""
+
+        attrs['sources'] = list(dict.fromkeys(attrs['sources']))
+
+        if attrs['target'] in attrs['sources']:
+            raise serializers.ValidationError(
+                {'sources': ['Must not contain the target.']}
+            )
+
+        return attrs
+
+
+class RecipeVersionMixin:
+    """Mixin for serializers writing to existing recipes."""
+
+    def bump_version(self, instance, validated_data):
+        """Moves the recipe to its next version, returns False instead if
+        it no longer has one of the versions passed as `if_match` to
+        save()."""
+
+        return Recipe.objects.bump_version(
+            instance, validated_data.pop('if_match', None)
+        )
+
+
+class RecipeSerializer(RecipeVersionMixin, serializers.ModelSerializer):
     """Serializes a recipe."""
 
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
-        queryset=Ingredient.objects.all()
+        queryset=Ingredient.objects.all(),
+        write_only=True,
+        required=False
     )
 
     tags = serializers.PrimaryKeyRelatedField(
         many=True,
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        write_only=True,
+        required=False
+    )
+
+    ingredient_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        write_only=True,
+        required=False
+    )
+
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        write_only=True,
+        required=False
     )
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags',
-                  'time_in_minutes', 'price', 'link')
-        read_only_fields = ('id',)
+                  'time_in_minutes', 'price', 'link',
+                  'ingredient_names', 'tag_names', 'version')
+        read_only_fields = ('id', 'version')
+
+    def _resolve_names(self, validated_data, instance=None):
+        """Adds the user's tags and ingredients named in the payload to the
+        given ones, creating the missing ones."""
+
+        for field, model in (('ingredients', Ingredient), ('tags', Tag)):
+            names = validated_data.pop(f'{model._meta.model_name}_names',
+                                       None)
+
+            if names is None:
+                continue
+
+            user = validated_data['user'] if instance is None \
+                else instance.user
+            objs = model.objects.get_or_create_names(user, names)
+
+            validated_data[field] = list(dict.fromkeys(
+                [*validated_data.get(field, []), *objs.values()]
+            ))
+
+    def _pop_relations(self, validated_data):
+        """Takes the tags and ingredients out of the payload, for
+        _replace_relations() to link instead of the related managers'
+        set()."""
+
+        return {relation: validated_data.pop(relation)
+                for relation in readmodel.RELATIONS
+                if relation in validated_data}
+
+    def _replace_relations(self, instance, related):
+        """Links the recipe to the given tags and ingredients only, leaving
+        alone the relations its read model shows unchanged."""
+
+        for relation, objs in related.items():
+            ids_field, _ = readmodel.cached_fields(relation)
+            related_ids = [obj.id for obj in objs]
+
+            if sorted(set(related_ids)) != getattr(instance, ids_field):
+                relations.replace(instance, relation, related_ids)
+
+    def create(self, validated_data):
+        """Creates a recipe, resolving tag and ingredient names.
+
+        The recipe and its relations are committed together, so readers of
+        the change feed never see the save without them.
+        """
+
+        with sharding.atomic(savepoint=False):
+            self._resolve_names(validated_data)
+            related = self._pop_relations(validated_data)
+
+            instance = super().create(validated_data)
+            self._replace_relations(instance, related)
+
+            return instance
+
+    def update(self, instance, validated_data):
+        """Updates a recipe as a new version, resolving tag and ingredient
+        names, in one transaction like create().
+
+        The version is bumped first, so a write expecting a version the
+        recipe no longer has fails before changing anything.
+        """
+
+        with sharding.atomic(savepoint=False):
+            if self.bump_version(instance, validated_data):
+                self._resolve_names(validated_data, instance)
+                related = self._pop_relations(validated_data)
+
+                instance = super().update(instance, validated_data)
+                self._replace_relations(instance, related)
+
+                return instance
+
+        # raised once out of the transaction, as nothing was written
+        raise PreconditionFailed()
+
+    def cached_relation(self, instance, relation):
+        """Returns the tags or ingredients of a recipe from its read
+        model."""
+
+        ids_field, _ = readmodel.cached_fields(relation)
+
+        return list(getattr(instance, ids_field))
+
+    def to_representation(self, instance):
+        """Serializes a recipe, reading its tags and ingredients from the
+        read model instead of the relations."""
+
+        data = super().to_representation(instance)
+
+        for relation in readmodel.RELATIONS:
+            data[relation] = self.cached_relation(instance, relation)
+
+        return {name: data[name] for name in self.Meta.fields
+                if name in data}
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for the details of a recipe."""
 
-    ingredients = IngredientSerializer(many=True, read_only=True)
+    def cached_relation(self, instance, relation):
+        """Returns the tags or ingredients of a recipe with their names."""
 
-    tags = TagSerializer(many=True, read_only=True)
+        ids_field, names_field = readmodel.cached_fields(relation)
 
+        return [
+            {'id': related_id, 'name': name}
+            for related_id, name in zip(getattr(instance, ids_field),
+                                        getattr(instance, names_field))
+        ]
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+
+class RecipeImageSerializer(RecipeVersionMixin,
+                            serializers.ModelSerializer):
     """Serializer for uploading images to recipe."""
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'version')
+        read_only_fields = ('id', 'version')
+
+    def update(self, instance, validated_data):
+        """Sets the image of a recipe as a new version."""
+
+        with sharding.atomic(savepoint=False):
+            if self.bump_version(instance, validated_data):
+                return super().update(instance, validated_data)
+
+        raise PreconditionFailed()
+
+
+class RecipeDuplicateSerializer(serializers.Serializer):
+    """Serializer for the options of duplicating a recipe."""
+
+    copy_image = serializers.BooleanField(default=False)
+
+
+class RecipeBatchDuplicateSerializer(RecipeDuplicateSerializer):
+    """Serializer for duplicating many recipes at once."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=100
+    )
+
+    def validate_ids(self, value):
+        """Drops repeated IDs, keeping the first occurrence."""
+
+        return list(dict.fromkeys(value))
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of a sync request."""
+
+    since = serializers.IntegerField(min_value=0, default=0)
+
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=SYNC_MAX_PAGE_SIZE,
+        default=SYNC_PAGE_SIZE
+    )
+
+
+class StatsQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of a usage stats request."""
+
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=STATS_MAX_LIMIT,
+        default=STATS_LIMIT
+    )
+
+
+def _parse_ids(value):
+    """Converts comma separated IDs to a list without repeats."""
+
+    try:
+        ids = list(dict.fromkeys(int(str_id) for str_id in value.split(',')))
+    except ValueError:
+        ids = None
+
+    if not ids or not all(1 <= obj_id <= MAX_ID for obj_id in ids):
+        raise serializers.ValidationError('Enter comma separated IDs.')
+
+    return ids
+
+
+class RecipeFilterQuerySerializer(serializers.Serializer):
+    """Serializer for the tag and ingredient filters of recipe requests."""
+
+    tags = serializers.CharField(required=False, allow_blank=True)
+    ingredients = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_tags(self, value):
+        """Converts the comma separated tag IDs to a list."""
+
+        return _parse_ids(value) if value else []
+
+    def validate_ingredients(self, value):
+        """Converts the comma separated ingredient IDs to a list."""
+
+        return _parse_ids(value) if value else []
+
+
+class PantryQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of a pantry recipe search."""
+
+    pantry = serializers.CharField(allow_blank=True)
+
+    missing = serializers.IntegerField(
+        min_value=0,
+        max_value=PANTRY_MAX_MISSING,
+        default=0
+    )
+
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=PANTRY_MAX_LIMIT,
+        default=PANTRY_LIMIT
+    )
+
+    def validate_pantry(self, value):
+        """Converts the comma separated ingredient IDs to a list."""
+
+        return _parse_ids(value) if value else []
+
+
+class RecipeSimilarQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of a similar recipes request."""
+
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=SIMILAR_MAX_LIMIT,
+        default=SIMILAR_LIMIT
+    )
+
+    metric = serializers.ChoiceField(choices=METRICS, default=METRICS[0])
+
+
+class ShoppingListQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of a shopping list request."""
+
+    ids = serializers.CharField()
+
+    def validate_ids(self, value):
+        """Converts comma separated recipe IDs to a list without repeats."""
+
+        try:
+            ids = list(dict.fromkeys(int(str_id) for str_id
+                                     in value.split(',')))
+        except ValueError:
+            raise serializers.ValidationError(
+                'Enter comma separated recipe IDs.'
+            )
+
+        if len(ids) > SHOPPING_MAX_RECIPES:
+            raise serializers.ValidationError(
+                f'Ensure there are no more than {SHOPPING_MAX_RECIPES} IDs.'
+            )
+
+        return ids
@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from core.models import Recipe, Ingredient
+from core.sharding import connection
+
+SHOPPING_MAX_RECIPES = 100
+
+
+def _ingredient_rows(user, recipe_ids):
+    """Returns (id, name, recipe_ids) of the ingredients of a user's
+    recipes, by name, grouped from the through table in one query."""
+
+    through = Recipe.ingredients.through
+    quote = connection.ops.quote_name
+    through_table = quote(through._meta.db_table)
+    ingredient_table = quote(Ingredient._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT a.id, a.name, array_agg(r.recipe_id ORDER BY '
+            f'r.recipe_id) FROM {through_table} r '
+            f'INNER JOIN {ingredient_table} a ON a.id = r.ingredient_id '
+            f'WHERE r.user_id = %s AND r.recipe_id IN ({placeholders}) '
+            'GROUP BY a.id, a.user_id ORDER BY a.normalized_name, a.id',
+            [user.id, *recipe_ids]
+        )
+
+        return cursor.fetchall()
+
+
+def shopping_list(user, recipes):
+    """Returns the combined ingredients of a queryset of the user's recipes,
+    each with the recipes needing it, and their total time and price."""
+
+    rows = list(recipes.order_by('id')
+                .values_list('id', 'time_in_minutes', 'price'))
+    recipe_ids = [recipe_id for recipe_id, _, _ in rows]
+
+    return {
+        'recipes': recipe_ids,
+        'time_in_minutes': sum(minutes for _, minutes, _ in rows),
+        'price': str(sum((price for _, _, price in rows), Decimal('0.00'))),
+        'ingredients': [
+            {'id': ingredient_id, 'name': name, 'recipes': ids}
+            for ingredient_id, name, ids
+            in (_ingredient_rows(user, recipe_ids) if recipe_ids else [])
+        ],
+    }
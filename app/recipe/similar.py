@@ -0,0 +1,202 @@
+import heapq
+import math
+import time
+
+from core.models import Recipe
+from recipe.indexes import IndexCache, add_planes, count_planes, \
+    equal_bits, iter_positions, to_int
+
+METRICS = ('jaccard', 'cosine')
+
+
+def _features(tag_ids, ingredient_ids):
+    """Returns the feature keys of a recipe's tags and ingredients."""
+
+    return (*(('tag', tag_id) for tag_id in tag_ids),
+            *(('ingredient', ingredient_id)
+              for ingredient_id in ingredient_ids))
+
+
+def _score(metric, shared, size, other_size):
+    if metric == 'cosine':
+        return shared / math.sqrt(size * other_size)
+
+    return shared / (size + other_size - shared)
+
+
+def _value_at(planes_bytes, position):
+    """Returns the number stored bit-sliced at a position."""
+
+    byte, shift = position >> 3, position & 7
+
+    return sum((plane[byte] >> shift & 1) << index
+               for index, plane in enumerate(planes_bytes))
+
+
+class SimilarityIndex:
+    """Sparse binary vectors of the tags and ingredients of one user's
+    recipes, stored column-wise as bitsets.
+
+    Bit i of every set stands for the recipe at position i. Each tag and
+    ingredient maps to the set of recipes having it, and the number of
+    features of every recipe is kept bit-sliced. The overlap of all
+    recipes with one of them is the bit-sliced sum of that recipe's
+    feature sets, a few big-int operations per feature.
+    """
+
+    def __init__(self, recipe_ids, recipe_features, feature_bits,
+                 size_planes, version, built_at=None):
+        self.recipe_ids = recipe_ids
+        self.recipe_features = recipe_features
+        self.feature_bits = feature_bits
+        self.size_planes = size_planes
+        self.version = version
+        self.built_at = time.monotonic() if built_at is None else built_at
+        self.positions = {recipe_id: position for position, recipe_id
+                          in enumerate(recipe_ids) if recipe_id is not None}
+        self.all_bits = (1 << len(recipe_ids)) - 1
+
+    @staticmethod
+    def _rows(user_id, recipe_ids=None):
+        queryset = Recipe.objects.filter(user_id=user_id)
+
+        if recipe_ids is not None:
+            queryset = queryset.filter(id__in=recipe_ids)
+
+        return queryset.order_by('id') \
+            .values_list('id', 'cached_tag_ids', 'cached_ingredient_ids')
+
+    @classmethod
+    def build(cls, user_id, version):
+        """Builds the index of a user's recipes from their read model."""
+
+        recipe_ids = []
+        recipe_features = []
+        positions = {}
+
+        for position, (recipe_id, tag_ids, ingredient_ids) in \
+                enumerate(cls._rows(user_id)):
+            features = _features(tag_ids, ingredient_ids)
+
+            recipe_ids.append(recipe_id)
+            recipe_features.append(features)
+
+            for feature in features:
+                positions.setdefault(feature, []).append(position)
+
+        size = len(recipe_ids)
+
+        return cls(
+            recipe_ids,
+            recipe_features,
+            {feature: to_int(feature_positions, size)
+             for feature, feature_positions in positions.items()},
+            count_planes([len(features) for features in recipe_features]),
+            version
+        )
+
+    def updated(self, user_id, changes, version):
+        """Returns a copy of the index with the changed recipes, given as
+        {recipe_id: deleted}, re-read from the database."""
+
+        recipe_ids = list(self.recipe_ids)
+        recipe_features = list(self.recipe_features)
+        feature_bits = dict(self.feature_bits)
+        size_planes = list(self.size_planes)
+        positions = dict(self.positions)
+
+        rows = {recipe_id: _features(tag_ids, ingredient_ids)
+                for recipe_id, tag_ids, ingredient_ids in self._rows(
+                    user_id, [recipe_id for recipe_id, deleted
+                              in changes.items() if not deleted]
+                )}
+
+        for recipe_id in sorted(changes):
+            position = positions.get(recipe_id)
+
+            if position is None:
+                if recipe_id not in rows:
+                    continue
+
+                position = len(recipe_ids)
+                positions[recipe_id] = position
+                recipe_ids.append(recipe_id)
+                recipe_features.append(())
+            else:
+                bit = 1 << position
+
+                for feature in recipe_features[position]:
+                    feature_bits[feature] &= ~bit
+                size_planes = [plane & ~bit for plane in size_planes]
+
+            if recipe_id not in rows:
+                recipe_ids[position] = None
+                recipe_features[position] = ()
+                continue
+
+            features = rows[recipe_id]
+            bit = 1 << position
+            recipe_features[position] = features
+
+            for feature in features:
+                feature_bits[feature] = feature_bits.get(feature, 0) | bit
+
+            size = len(features)
+            while size.bit_length() > len(size_planes):
+                size_planes.append(0)
+            size_planes = [plane | bit if size >> index & 1 else plane
+                           for index, plane in enumerate(size_planes)]
+
+        return type(self)(recipe_ids, recipe_features, feature_bits,
+                          size_planes, version, self.built_at)
+
+    def similar(self, recipe_id, limit=10, metric='jaccard'):
+        """Returns (recipe_id, score) pairs of the recipes sharing features
+        with a recipe, most similar first, then by ID."""
+
+        position = self.positions.get(recipe_id)
+
+        if position is None or not self.recipe_features[position]:
+            return []
+
+        features = self.recipe_features[position]
+        size = len(features)
+        others = ~(1 << position)
+
+        shared = [plane & others for plane in add_planes(
+            self.feature_bits[feature] for feature in features
+        )]
+
+        length = (len(self.recipe_ids) + 7) // 8
+        size_bytes = [plane.to_bytes(length, 'little')
+                      for plane in self.size_planes]
+        best = []
+
+        # the fewer shared features, the lower the best possible score
+        for count in range(size, 0, -1):
+            if len(best) == limit and \
+                    best[0][0] > _score(metric, count, size, count):
+                break
+
+            for other in iter_positions(
+                    equal_bits(shared, count, self.all_bits)):
+                other_size = _value_at(size_bytes, other)
+                item = (_score(metric, count, size, other_size),
+                        -self.recipe_ids[other])
+
+                if len(best) < limit:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+
+        return [(-negative_id, score)
+                for score, negative_id in sorted(best, reverse=True)]
+
+
+_indexes = IndexCache(SimilarityIndex)
+
+
+def get_index(user_id):
+    """Returns the similarity index of a user, see IndexCache."""
+
+    return _indexes.get(user_id)
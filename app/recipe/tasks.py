@@ -0,0 +1,20 @@
+from django.conf import settings
+
+from core.models import Recipe
+from core.tasks import task
+
+
+@task()
+def delete_unused_images(names):
+    """Deletes the image files of a list no recipe, on any shard, refers to
+    anymore."""
+
+    used = set()
+    for alias in settings.SHARDS:
+        used.update(Recipe.objects.using(alias).filter(image__in=names)
+                    .values_list('image', flat=True))
+
+    storage = Recipe._meta.get_field('image').storage
+
+    for name in set(names) - used:
+        storage.delete(name)
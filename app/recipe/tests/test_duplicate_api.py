@@ -0,0 +1,190 @@
+import os
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.duplicates import duplicate_recipes
+
+DUPLICATE_MANY_URL = reverse('recipe:recipe-duplicate-many')
+
+
+def duplicate_url(recipe_id):
+    """Returns the duplicate URL of a recipe."""
+
+    return reverse('recipe:recipe-duplicate', args=[recipe_id])
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Creates and returns a sample recipe."""
+
+    defaults = {
+        'title': 'Sample recipe',
+        'time_in_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicRecipeDuplicateApiTests(TestCase):
+    """Test unauthenticated recipe duplicate API access."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_required_auth(self):
+        """Test the authentication is required"""
+
+        res = self.client.post(DUPLICATE_MANY_URL, {'ids': [1]})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeDuplicateApiTests(TestCase):
+    """Test authenticated recipe duplicate API access."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Hot')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='Chilli')
+
+        self.recipe = sample_recipe(user=self.user, title='Curry',
+                                    link='https://fueanta.com/curry')
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_duplicate_recipe(self):
+        """Testing if a copy gets the fields, tags and ingredients."""
+
+        res = self.client.post(duplicate_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(res.data['id'], self.recipe.id)
+
+        copy = Recipe.objects.get(id=res.data['id'])
+
+        self.assertEqual(copy.title, 'Curry')
+        self.assertEqual(copy.link, 'https://fueanta.com/curry')
+        self.assertEqual(copy.user, self.user)
+        self.assertEqual(list(copy.tags.all()), [self.tag])
+        self.assertEqual(list(copy.ingredients.all()), [self.ingredient])
+        self.assertEqual(res.data['tags'], [self.tag.id])
+        self.assertEqual(self.recipe.tags.count(), 1)
+
+    def test_duplicate_other_users_recipe_fails(self):
+        """Testing if recipes of other users cannot be duplicated."""
+
+        other = sample_recipe(user=sample_user(email='test2@fueanta.com'))
+
+        res = self.client.post(duplicate_url(other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_duplicate_shares_image(self):
+        """Testing if copies share the image file unless asked otherwise."""
+
+        self.recipe.image.save('curry.jpg', ContentFile(b'jpg'))
+        self.addCleanup(self.recipe.image.delete, save=False)
+
+        res = self.client.post(duplicate_url(self.recipe.id))
+
+        copy = Recipe.objects.get(id=res.data['id'])
+
+        self.assertEqual(copy.image.name, self.recipe.image.name)
+
+    def test_duplicate_copies_image(self):
+        """Testing if copy_image gives the copy its own image file."""
+
+        self.recipe.image.save('curry.jpg', ContentFile(b'jpg'))
+        self.addCleanup(self.recipe.image.delete, save=False)
+
+        res = self.client.post(duplicate_url(self.recipe.id),
+                               {'copy_image': True})
+
+        copy = Recipe.objects.get(id=res.data['id'])
+        self.addCleanup(copy.image.delete, save=False)
+
+        self.assertNotEqual(copy.image.name, self.recipe.image.name)
+        self.assertTrue(os.path.exists(copy.image.path))
+
+        with copy.image.open() as image:
+            self.assertEqual(image.read(), b'jpg')
+
+    def test_failed_duplicate_deletes_copied_images(self):
+        """Testing if image files copied before a duplication failed are
+        deleted with it."""
+
+        salad = sample_recipe(user=self.user, title='Salad')
+
+        for recipe in (self.recipe, salad):
+            recipe.image.save('curry.jpg', ContentFile(b'jpg'))
+            self.addCleanup(recipe.image.delete, save=False)
+
+        storage = self.recipe.image.storage
+        name = 'uploads/images/copy.jpg'
+
+        with patch('recipe.duplicates.image_file_path',
+                   side_effect=[name, OSError('disk full')]), \
+                self.assertRaises(OSError):
+            duplicate_recipes(self.user, [self.recipe.id, salad.id],
+                              copy_image=True)
+
+        self.assertFalse(storage.exists(name))
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_duplicate_many(self):
+        """Testing if a batch of recipes is duplicated in the order given."""
+
+        salad = sample_recipe(user=self.user, title='Salad')
+
+        res = self.client.post(
+            DUPLICATE_MANY_URL,
+            {'ids': [self.recipe.id, salad.id, self.recipe.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['title'] for r in res.data], ['Curry', 'Salad'])
+        self.assertEqual(res.data[0]['ingredients'], [self.ingredient.id])
+        self.assertEqual(res.data[1]['tags'], [])
+        self.assertEqual(Recipe.objects.count(), 4)
+
+    def test_duplicate_many_other_users_recipe_fails(self):
+        """Testing if a batch with foreign recipes copies nothing."""
+
+        other = sample_recipe(user=sample_user(email='test2@fueanta.com'))
+
+        res = self.client.post(DUPLICATE_MANY_URL,
+                               {'ids': [self.recipe.id, other.id]},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', res.data)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_duplicate_many_limits_batch_size(self):
+        """Testing if over-sized batches are rejected."""
+
+        res = self.client.post(DUPLICATE_MANY_URL,
+                               {'ids': list(range(1, 102))}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,122 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import exports
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Creates and returns a sample recipe."""
+
+    defaults = {
+        'title': 'Sample recipe',
+        'time_in_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicRecipeExportApiTests(TestCase):
+    """Test unauthenticated recipe export API access."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_required_auth(self):
+        """Test the authentication is required"""
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeExportApiTests(TestCase):
+    """Test authenticated recipe export API access."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.recipe = sample_recipe(user=self.user, title='Curry')
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Hot'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Chilli')
+        )
+        sample_recipe(user=self.user, title='Salad')
+
+        other_user = sample_user(email='test2@fueanta.com')
+        sample_recipe(user=other_user, title='Not mine')
+
+    def test_export_ndjson(self):
+        """Testing if recipes are exported one JSON object per line."""
+
+        res = self.client.get(EXPORT_URL)
+
+        lines = b''.join(res.streaming_content).splitlines()
+        recipes = [json.loads(line) for line in lines]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([r['title'] for r in recipes], ['Curry', 'Salad'])
+        self.assertEqual(recipes[0]['tags'][0]['name'], 'Hot')
+        self.assertEqual(recipes[0]['ingredients'][0]['name'], 'Chilli')
+        self.assertEqual(recipes[0]['price'], '5.00')
+        self.assertIsNone(recipes[0]['image'])
+        self.assertEqual(recipes[1]['tags'], [])
+
+    def test_export_json(self):
+        """Testing if recipes can be exported as a JSON array."""
+
+        res = self.client.get(EXPORT_URL, {'output': 'json'})
+
+        recipes = json.loads(b''.join(res.streaming_content))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(recipes), 2)
+
+    def test_export_gzip(self):
+        """Testing if the export is gzipped when the client accepts it."""
+
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        content = gzip.decompress(b''.join(res.streaming_content))
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(len(content.splitlines()), 2)
+
+    def test_export_invalid_output(self):
+        """Testing if an unknown output format is rejected."""
+
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_queries_per_chunk(self):
+        """Testing if tags and ingredients need no queries of their own."""
+
+        for i in range(4):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        # the read model rides along on the cursor query
+        with self.assertNumQueries(1):
+            recipes = list(exports.iter_recipes(self.user, chunk_size=2))
+
+        self.assertEqual(len(recipes), 6)
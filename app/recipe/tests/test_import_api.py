@@ -0,0 +1,139 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def ndjson(*records):
+    """Encodes records as an NDJSON request body."""
+
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+class PublicRecipeImportApiTests(TestCase):
+    """Test unauthenticated recipe import API access."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_required_auth(self):
+        """Test the authentication is required"""
+
+        res = self.client.post(IMPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeImportApiTests(TestCase):
+    """Test authenticated recipe import API access."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson(self):
+        """Testing if NDJSON records are imported with tags/ingredients."""
+
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+
+        body = ndjson(
+            {'title': 'Salad', 'time_in_minutes': 5, 'price': '3.50',
+             'tags': ['Vegan', 'Quick'], 'ingredients': ['Lettuce']},
+            {'title': 'Soup', 'time_in_minutes': 30, 'price': 4,
+             'tags': ['Vegan'], 'ingredients': ['Lettuce', 'Onion']},
+        )
+
+        res = self.client.generic('POST', IMPORT_URL, body,
+                                  content_type='application/x-ndjson')
+
+        soup = Recipe.objects.get(user=self.user, title='Soup')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['imported'], 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+        self.assertIn(existing, soup.tags.all())
+        self.assertEqual(soup.ingredients.count(), 2)
+
+    def test_import_csv(self):
+        """Testing if CSV rows are imported."""
+
+        body = 'title,time_in_minutes,price,link,tags,ingredients\n' \
+               'Curry,45,12.00,,Hot;Dinner,Chilli\n'
+
+        res = self.client.generic('POST', IMPORT_URL, body,
+                                  content_type='text/csv')
+
+        recipe = Recipe.objects.get(user=self.user)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(recipe.title, 'Curry')
+        self.assertEqual(recipe.tags.count(), 2)
+
+    def test_import_invalid_record(self):
+        """Testing if an invalid record reports how far the import got."""
+
+        body = ndjson(
+            {'title': 'Salad', 'time_in_minutes': 5, 'price': 3},
+            {'title': 'Soup', 'price': 4},
+        )
+
+        res = self.client.generic('POST', IMPORT_URL, body,
+                                  content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Record 2', res.data['detail'])
+
+    def test_import_values_out_of_range(self):
+        """Testing if values the columns cannot hold are rejected with the
+        record number, importing nothing."""
+
+        valid = {'title': 'Salad', 'time_in_minutes': 5, 'price': 3}
+
+        for invalid in ({'price': '5000'}, {'price': 'Infinity'},
+                        {'time_in_minutes': 10 ** 12},
+                        {'title': 'x' * 256}, {'link': 'x' * 256},
+                        {'tags': ['x' * 256]}, {'ingredients': ['x' * 256]}):
+            res = self.client.generic(
+                'POST', IMPORT_URL, ndjson(valid, {**valid, **invalid}),
+                content_type='application/x-ndjson'
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST,
+                             invalid)
+            self.assertIn('Record 2', res.data['detail'])
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_import_resume_from_start(self):
+        """Testing if records before `start` are skipped."""
+
+        body = ndjson(
+            {'title': 'Salad', 'time_in_minutes': 5, 'price': 3},
+            {'title': 'Soup', 'time_in_minutes': 5, 'price': 4},
+        )
+
+        res = self.client.generic('POST', f'{IMPORT_URL}?start=1', body,
+                                  content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['imported'], 2)
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Soup']
+        )
@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+TAGS_MERGE_URL = reverse('recipe:tag-merge')
+INGREDIENTS_MERGE_URL = reverse('recipe:ingredient-merge')
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Creates and returns a sample recipe."""
+
+    defaults = {
+        'title': 'Sample recipe',
+        'time_in_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicMergeApiTests(TestCase):
+    """Test unauthenticated merge API access."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_required_auth(self):
+        """Test the authentication is required"""
+
+        res = self.client.post(TAGS_MERGE_URL, {'target': 1, 'sources': [2]})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateMergeApiTests(TestCase):
+    """Test authenticated merge API access."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_merge_tags(self):
+        """Testing if recipes move to the target tag and sources go away."""
+
+        target = Tag.objects.create(user=self.user, name='Hot')
+        spicy = Tag.objects.create(user=self.user, name='Spicy')
+        fiery = Tag.objects.create(user=self.user, name='Fiery')
+
+        curry = sample_recipe(user=self.user, title='Curry')
+        curry.tags.add(target, spicy, fiery)
+        chilli = sample_recipe(user=self.user, title='Chilli')
+        chilli.tags.add(spicy, fiery)
+        salad = sample_recipe(user=self.user, title='Salad')
+        salad.tags.add(fiery)
+
+        res = self.client.post(
+            TAGS_MERGE_URL,
+            {'target': target.id, 'sources': [spicy.id, fiery.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': target.id, 'name': 'Hot'})
+        self.assertEqual(list(Tag.objects.all()), [target])
+        for recipe in (curry, chilli, salad):
+            self.assertEqual(list(recipe.tags.all()), [target])
+
+    def test_merge_ingredients(self):
+        """Testing if ingredients are merged the same way as tags."""
+
+        target = Ingredient.objects.create(user=self.user, name='Salt')
+        sea_salt = Ingredient.objects.create(user=self.user, name='Sea salt')
+
+        soup = sample_recipe(user=self.user, title='Soup')
+        soup.ingredients.add(sea_salt)
+
+        res = self.client.post(
+            INGREDIENTS_MERGE_URL,
+            {'target': target.id, 'sources': [sea_salt.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(soup.ingredients.all()), [target])
+        self.assertFalse(Ingredient.objects.filter(id=sea_salt.id).exists())
+
+    def test_merge_changes_recipe_version(self):
+        """Testing if a write naming the version read before a merge of its
+        recipe's tags fails."""
+
+        target = Tag.objects.create(user=self.user, name='Hot')
+        spicy = Tag.objects.create(user=self.user, name='Spicy')
+        curry = sample_recipe(user=self.user, title='Curry')
+        curry.tags.add(spicy)
+        salad = sample_recipe(user=self.user, title='Salad')
+
+        self.client.post(TAGS_MERGE_URL,
+                         {'target': target.id, 'sources': [spicy.id]},
+                         format='json')
+
+        curry.refresh_from_db()
+        salad.refresh_from_db()
+        self.assertEqual((curry.version, salad.version), (2, 1))
+
+        res = self.client.patch(
+            reverse('recipe:recipe-detail', args=[curry.id]),
+            {'title': 'Stale'}, HTTP_IF_MATCH='"1"'
+        )
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_merge_other_users_tags_fails(self):
+        """Testing if tags of other users cannot be merged."""
+
+        target = Tag.objects.create(user=self.user, name='Hot')
+        other = Tag.objects.create(user=sample_user('test2@fueanta.com'),
+                                   name='Spicy')
+
+        res = self.client.post(
+            TAGS_MERGE_URL,
+            {'target': target.id, 'sources': [other.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(id=other.id).exists())
+
+    def test_merge_into_source_fails(self):
+        """Testing if the target cannot also be a source."""
+
+        target = Tag.objects.create(user=self.user, name='Hot')
+
+        res = self.client.post(
+            TAGS_MERGE_URL,
+            {'target': target.id, 'sources': [target.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('sources', res.data)
@@ -0,0 +1,184 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.indexes import clear_caches
+from recipe.pantry import PantryIndex, get_index
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Creates and returns a sample recipe."""
+
+    defaults = {
+        'title': 'Sample recipe',
+        'time_in_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PantryIndexTests(TestCase):
+    """Test cases for ranking recipes with the pantry bitsets."""
+
+    def test_ranked_matches_brute_force(self):
+        """Testing if the bitset ranking equals counting one by one."""
+
+        rng = random.Random(7)
+        recipes = [(recipe_id, rng.sample(range(1, 30), rng.randint(0, 9)))
+                   for recipe_id in range(1, 400)]
+
+        user = sample_user()
+        for recipe_id, ingredient_ids in recipes:
+            Recipe.objects.create(
+                id=recipe_id, user=user, title='Recipe', time_in_minutes=5,
+                price=1.00, cached_ingredient_ids=sorted(ingredient_ids)
+            )
+
+        index = PantryIndex.build(user.id, version=0)
+
+        for max_missing in range(4):
+            pantry = set(rng.sample(range(1, 35), 15))
+            expected = sorted(
+                ((recipe_id, len(set(ingredient_ids) - pantry))
+                 for recipe_id, ingredient_ids in recipes),
+                key=lambda pair: (pair[1], pair[0])
+            )
+
+            self.assertEqual(
+                list(index.ranked(pantry, max_missing)),
+                [pair for pair in expected if pair[1] <= max_missing]
+            )
+
+    def test_index_rebuilt_after_changes(self):
+        """Testing if the index is reused until the user's data changes."""
+
+        clear_caches()
+
+        user = sample_user()
+        recipe = sample_recipe(user)
+
+        index = get_index(user.id)
+        self.assertIs(get_index(user.id), index)
+
+        recipe.ingredients.add(Ingredient.objects.create(user=user,
+                                                         name='Salt'))
+        recipe.save()
+
+        self.assertIsNot(get_index(user.id), index)
+
+
+class PrivatePantryApiTests(TestCase):
+    """Test the pantry mode of the recipe list."""
+
+    def setUp(self):
+        clear_caches()
+
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.salt, self.rice, self.egg, self.milk = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Rice', 'Egg', 'Milk')
+        )
+
+        self.rice_dish = sample_recipe(self.user, title='Rice')
+        self.rice_dish.ingredients.add(self.salt, self.rice)
+        self.omelette = sample_recipe(self.user, title='Omelette')
+        self.omelette.ingredients.add(self.salt, self.egg, self.milk)
+        self.custard = sample_recipe(self.user, title='Custard')
+        self.custard.ingredients.add(self.egg, self.milk)
+
+        sample_recipe(sample_user('test2@fueanta.com'), title='Not mine')
+
+    def pantry(self, *ingredients, **params):
+        res = self.client.get(RECIPES_URL, {
+            'pantry': ','.join(str(obj.id) for obj in ingredients),
+            **params,
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [(item['title'], item['missing']) for item in res.data]
+
+    def test_pantry_returns_cookable_recipes(self):
+        """Testing if only recipes covered by the pantry are returned."""
+
+        self.assertEqual(self.pantry(self.salt, self.rice, self.egg),
+                         [('Rice', 0)])
+
+    def test_pantry_ranks_by_missing(self):
+        """Testing if recipes are ranked by missing ingredients."""
+
+        self.assertEqual(
+            self.pantry(self.egg, self.salt, missing=2),
+            [('Rice', 1), ('Omelette', 1), ('Custard', 1)]
+        )
+        self.assertEqual(self.pantry(self.egg, self.salt, missing=2,
+                                     limit=1),
+                         [('Rice', 1)])
+
+    def test_pantry_sees_changes(self):
+        """Testing if recipe changes show up in the next search."""
+
+        self.assertEqual(self.pantry(self.egg, self.milk), [('Custard', 0)])
+
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[self.omelette.id]),
+            {'ingredients': [self.egg.id, self.milk.id]}
+        )
+
+        self.assertEqual(self.pantry(self.egg, self.milk),
+                         [('Omelette', 0), ('Custard', 0)])
+
+    def test_pantry_with_tag_filter(self):
+        """Testing if the other filters still apply in pantry mode."""
+
+        sweet = Tag.objects.create(user=self.user, name='Sweet')
+        self.custard.tags.add(sweet)
+
+        self.assertEqual(
+            self.pantry(self.egg, self.milk, self.salt, tags=sweet.id),
+            [('Custard', 0)]
+        )
+
+    def test_pantry_invalid_params(self):
+        """Testing if out of range options are rejected."""
+
+        res = self.client.get(RECIPES_URL, {'pantry': self.egg.id,
+                                            'missing': 50})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pantry_invalid_ids(self):
+        """Testing if IDs that are not integers or out of range are
+        rejected."""
+
+        for params, field in (
+                ({'pantry': 'abc'}, 'pantry'),
+                ({'pantry': f'{self.egg.id},x'}, 'pantry'),
+                ({'pantry': f'{self.egg.id},99999999999'}, 'pantry'),
+                ({'pantry': self.egg.id, 'tags': 'abc'}, 'tags'),
+                ({'ingredients': '1,,2'}, 'ingredients'),
+                ({'tags': '99999999999'}, 'tags'),
+                ({'ingredients': '0'}, 'ingredients'),
+        ):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, res.data)
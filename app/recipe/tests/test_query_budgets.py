@@ -0,0 +1,261 @@
+import tempfile
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.utils import QueryBudgetTestCase
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    """Returns recipe detail URL."""
+
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeApiQueryBudgetTests(QueryBudgetTestCase):
+    """Test SQL query budgets of the recipe API endpoints."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@fueanta.com', 'pass123'
+        )
+        token = Token.objects.create(user=self.user)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='Salt')
+
+    def grow_recipes(self, size):
+        """Adds tagged recipes with ingredients until there are `size`."""
+
+        for i in range(Recipe.objects.count(), size):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_in_minutes=10,
+                price=5.00
+            )
+            recipe.tags.add(
+                self.tag, Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+            recipe.ingredients.add(
+                self.ingredient,
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            )
+
+    def test_recipe_list_queries(self):
+        """Testing if listing recipes is not N+1."""
+
+        self.assertConstantQueries(
+            'recipe-list', 2, self.grow_recipes,
+            lambda: self.client.get(RECIPES_URL), max_ms=500
+        )
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60)
+    def test_cached_recipe_list_queries(self):
+        """Testing if a cached recipe list costs one version lookup on top
+        of authentication, and a miss one more query."""
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.assertConstantQueries(
+            'recipe-list-cache-miss', 3, self.grow_recipes,
+            lambda: self.client.get(RECIPES_URL)
+        )
+
+        with self.assertQueryBudget('recipe-list-cache-hit', 2):
+            self.client.get(RECIPES_URL)
+
+    def test_filtered_recipe_list_queries(self):
+        """Testing if filtering recipes by tags/ingredients is not N+1."""
+
+        self.assertConstantQueries(
+            'recipe-list-filtered', 2, self.grow_recipes,
+            lambda: self.client.get(RECIPES_URL, {
+                'tags': self.tag.id, 'ingredients': self.ingredient.id,
+            }),
+            max_ms=500
+        )
+
+    def test_recipe_detail_queries(self):
+        """Testing if retrieving a recipe does not depend on its size."""
+
+        self.grow_recipes(1)
+        recipe = Recipe.objects.first()
+
+        self.assertConstantQueries(
+            'recipe-detail', 2, self.grow_recipes,
+            lambda: self.client.get(detail_url(recipe.id))
+        )
+
+    def test_tag_and_ingredient_list_queries(self):
+        """Testing if listing tags and ingredients is not N+1."""
+
+        for url, name in ((TAGS_URL, 'tag-list'),
+                          (INGREDIENTS_URL, 'ingredient-list')):
+            self.assertConstantQueries(
+                name, 2, self.grow_recipes, lambda: self.client.get(url)
+            )
+            self.assertConstantQueries(
+                f'{name}-assigned', 2, self.grow_recipes,
+                lambda: self.client.get(url, {'assigned_only': 1})
+            )
+
+    def test_tag_and_ingredient_create_queries(self):
+        """Testing if creating tags and ingredients stays within budget."""
+
+        with self.assertQueryBudget('tag-create', 3):
+            res = self.client.post(TAGS_URL, {'name': 'Dessert'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with self.assertQueryBudget('ingredient-create', 3):
+            res = self.client.post(INGREDIENTS_URL, {'name': 'Pepper'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_recipe_write_queries(self):
+        """Testing if recipe writes do not depend on the fixture size."""
+
+        payload = {
+            'title': 'Curry',
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+            'time_in_minutes': 30,
+            'price': 10.00,
+        }
+
+        self.assertConstantQueries(
+            'recipe-create', 13, self.grow_recipes,
+            lambda: self.client.post(RECIPES_URL, payload)
+        )
+
+        recipe = Recipe.objects.first()
+        # the first update changes the relations, later ones are no-ops
+        self.client.put(detail_url(recipe.id), payload)
+
+        # every update also moves the recipe to its next version
+        self.assertConstantQueries(
+            'recipe-update', 7, self.grow_recipes,
+            lambda: self.client.put(detail_url(recipe.id), payload)
+        )
+        self.assertConstantQueries(
+            'recipe-partial-update', 5, self.grow_recipes,
+            lambda: self.client.patch(detail_url(recipe.id),
+                                      {'title': 'Hot Curry'})
+        )
+
+        with self.assertQueryBudget('recipe-delete', 8):
+            res = self.client.delete(detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_recipe_create_by_names_queries(self):
+        """Testing if resolving tag and ingredient names does not depend on
+        how many are given."""
+
+        for count in (1, 10):
+            payload = {
+                'title': 'Curry',
+                'tag_names': ['vegan', *(f'Tag {i}' for i in range(count))],
+                'ingredient_names': [f'Ing {i}' for i in range(count)],
+                'time_in_minutes': 30,
+                'price': 10.00,
+            }
+
+            with self.assertQueryBudget(f'recipe-create-by-names-{count}', 19):
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_upload_image_queries(self):
+        """Testing if uploading an image stays within budget."""
+
+        self.grow_recipes(1)
+        recipe = Recipe.objects.first()
+        url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(fp=ntf, format='JPEG')
+            ntf.seek(0)
+
+            with self.assertQueryBudget('recipe-upload-image', 5):
+                res = self.client.post(url, {'image': ntf},
+                                       format='multipart')
+
+        recipe.refresh_from_db()
+        recipe.image.delete()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_export_queries(self):
+        """Testing if exporting recipes is not N+1."""
+
+        def export():
+            res = self.client.get(reverse('recipe:recipe-export'))
+            b''.join(res.streaming_content)
+
+        self.assertConstantQueries('recipe-export', 2, self.grow_recipes,
+                                   export)
+
+    def test_stats_queries(self):
+        """Testing if usage stats do not depend on the number of recipes."""
+
+        self.assertConstantQueries(
+            'recipe-stats', 3, self.grow_recipes,
+            lambda: self.client.get(reverse('recipe:stats'))
+        )
+
+    def test_pantry_list_queries(self):
+        """Testing if pantry searches do not depend on the number of
+        recipes."""
+
+        self.assertConstantQueries(
+            'recipe-list-pantry', 4, self.grow_recipes,
+            lambda: self.client.get(RECIPES_URL, {
+                'pantry': self.ingredient.id, 'missing': 1,
+            })
+        )
+
+    def test_similar_queries(self):
+        """Testing if similar recipes do not depend on the number of
+        recipes once the index is up to date."""
+
+        self.grow_recipes(2)
+        recipe = Recipe.objects.first()
+        url = reverse('recipe:recipe-similar', args=[recipe.id])
+
+        def grow(size):
+            self.grow_recipes(size)
+            self.client.get(url)
+
+        self.assertConstantQueries(
+            'recipe-similar', 4, grow, lambda: self.client.get(url)
+        )
+
+    def test_shopping_list_queries(self):
+        """Testing if a shopping list is one grouped query, not one per
+        recipe."""
+
+        url = reverse('recipe:recipe-shopping-list')
+        params = {}
+
+        def grow(size):
+            self.grow_recipes(size)
+            params['ids'] = ','.join(
+                map(str, Recipe.objects.values_list('id', flat=True))
+            )
+
+        self.assertConstantQueries(
+            'recipe-shopping-list', 3, grow,
+            lambda: self.client.get(url, params)
+        )
@@ -8,7 +8,10 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core import readmodel
+from core.models import Recipe, Tag, Ingredient, TagUsage
+from core.tasks import run_pending
+from recipe import relations
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -199,6 +202,51 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_names(self):
+        """Testing if tags and ingredients can be given by name, reusing the
+        user's existing ones."""
+
+        tag = sample_tag(user=self.user, name='Vegan')
+        sample_tag(user=sample_user(email='test2@fueanta.com'), name='Thai')
+
+        payload = {
+            'title': 'Thai Curry',
+            'tags': [tag.id],
+            'tag_names': ['vegan', 'Thai'],
+            'ingredient_names': ['Coconut milk', 'Lime', 'lime '],
+            'time_in_minutes': 30,
+            'price': 8.00,
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        recipe = Recipe.objects.get(id=res.data['id'])
+        tags = recipe.tags.order_by('name')
+
+        self.assertEqual([t.name for t in tags], ['Thai', 'Vegan'])
+        self.assertTrue(all(t.user == self.user for t in tags))
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Coconut milk', 'Lime']
+        )
+        self.assertNotIn('tag_names', res.data)
+
+    def test_partial_update_recipe_with_names(self):
+        """Testing if PATCH with names replaces the recipe's tags."""
+
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.patch(detail_url(recipe.id),
+                                {'tag_names': ['Dessert']}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(recipe.tags.values_list('name', flat=True)), ['Dessert']
+        )
+
     def test_partial_update_recipe(self):
         """Testing if a recipe can be updated partially:PATCH."""
 
@@ -264,6 +312,82 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(ingredients.count(), 0)
 
 
+class RecipeVersionTests(TestCase):
+    """Test cases for recipe versions and conditional writes."""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.recipe = sample_recipe(user=self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_version_sent_as_etag(self):
+        """Testing if every write moves the recipe to its next version,
+        sent as the ETag."""
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res['ETag'], '"1"')
+        self.assertEqual(res.data['version'], 1)
+
+        res = self.client.patch(detail_url(self.recipe.id),
+                                {'title': 'Curry'})
+
+        self.assertEqual(res['ETag'], '"2"')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.version, 2)
+
+    def test_if_match_current_version(self):
+        """Testing if writes naming the current version are made."""
+
+        for version, header in ((1, '"1"'), (2, 'W/"2"'), (3, '"7", "3"'),
+                                (4, '*')):
+            res = self.client.patch(detail_url(self.recipe.id),
+                                    {'title': f'Curry {version}'},
+                                    HTTP_IF_MATCH=header)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK, header)
+            self.assertEqual(res['ETag'], f'"{version + 1}"')
+
+    def test_if_match_stale_version(self):
+        """Testing if a write based on an old version fails and changes
+        nothing."""
+
+        tag = sample_tag(user=self.user)
+        self.client.patch(detail_url(self.recipe.id), {'title': 'Curry'})
+
+        res = self.client.patch(detail_url(self.recipe.id),
+                                {'title': 'Stale', 'tags': [tag.id]},
+                                HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Curry')
+        self.assertEqual(self.recipe.version, 2)
+        self.assertFalse(self.recipe.tags.exists())
+
+    def test_replace_relations(self):
+        """Testing if replacing tags only writes the difference and keeps
+        usage counts and the read model in step."""
+
+        kept, dropped, added = (sample_tag(user=self.user, name=name)
+                                for name in ('Kept', 'Dropped', 'Added'))
+        self.client.patch(detail_url(self.recipe.id),
+                          {'tags': [kept.id, dropped.id]})
+
+        self.assertEqual(
+            relations.replace(self.recipe, 'tags', [added.id, kept.id]),
+            ([added.id], [dropped.id])
+        )
+
+        counts = dict(TagUsage.objects.values_list('tag_id', 'count'))
+        self.assertEqual(counts, {kept.id: 1, dropped.id: 0, added.id: 1})
+        self.assertEqual(self.recipe.cached_tag_ids, [kept.id, added.id])
+        self.assertEqual(readmodel.verify(), [])
+
+
 class RecipeImageUploadTests(TestCase):
     """Test cases for recipe image upload."""
 
@@ -298,6 +422,40 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def upload_image(self):
+        """Uploads a new image to the recipe and returns its path."""
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(fp=ntf, format='JPEG')
+            ntf.seek(0)
+
+            self.client.post(image_upload_url(self.recipe.id),
+                             data={"image": ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+
+        return self.recipe.image.path
+
+    def test_replaced_image_deleted_by_worker(self):
+        """Testing if a replaced image file is deleted in the background,
+        unless a copy of the recipe still uses it."""
+
+        first = self.upload_image()
+        second = self.upload_image()
+
+        self.assertTrue(os.path.exists(first))
+
+        run_pending()
+
+        self.assertFalse(os.path.exists(first))
+
+        copy = sample_recipe(user=self.user, image=self.recipe.image.name)
+        self.upload_image()
+        run_pending()
+
+        self.assertTrue(os.path.exists(second))
+        copy.image.delete()
+
     def test_bad_image_upload_request(self):
         """Testing if invalid image upload request fails."""
 
@@ -335,6 +493,17 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
 
+    def test_filters_ignored_on_detail(self):
+        """Testing if the list filters are ignored by detail requests."""
+
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.get(detail_url(recipe.id), {'tags': 'abc'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.delete(f'{detail_url(recipe.id)}?ingredients=abc')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
     def test_filter_recipes_by_ingredients(self):
         """Testing if recipes can be returned for specific ingredients."""
 
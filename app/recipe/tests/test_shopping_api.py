@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+SHOPPING_LIST_URL = reverse('recipe:recipe-shopping-list')
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, ingredients=(), **params):
+    """Creates and returns a sample recipe using the given ingredients."""
+
+    defaults = {
+        'title': 'Sample recipe',
+        'time_in_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(params)
+
+    recipe = Recipe.objects.create(user=user, **defaults)
+    recipe.ingredients.add(*ingredients)
+
+    return recipe
+
+
+class PublicShoppingListApiTests(TestCase):
+    """Test unauthenticated shopping list API access."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_required_auth(self):
+        """Test the authentication is required"""
+
+        res = self.client.get(SHOPPING_LIST_URL, {'ids': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateShoppingListApiTests(TestCase):
+    """Test the authorized user shopping list API."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.salt = Ingredient.objects.create(user=self.user, name='salt')
+        self.eggs = Ingredient.objects.create(user=self.user, name='Eggs')
+        self.flour = Ingredient.objects.create(user=self.user, name='Flour')
+
+    def test_ingredients_combined(self):
+        """Testing if the ingredients of recipes are listed once, by name,
+        with the recipes using them and the totals of the recipes."""
+
+        omelette = sample_recipe(self.user, [self.eggs, self.salt],
+                                 time_in_minutes=10, price=4.50)
+        bread = sample_recipe(self.user, [self.flour, self.salt],
+                              time_in_minutes=60, price=2.25)
+        water = sample_recipe(self.user, time_in_minutes=1, price=0)
+        sample_recipe(self.user, [self.flour])
+
+        res = self.client.get(SHOPPING_LIST_URL, {
+            'ids': f'{bread.id},{omelette.id},{water.id},{bread.id}',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'recipes': [omelette.id, bread.id, water.id],
+            'time_in_minutes': 71,
+            'price': '6.75',
+            'ingredients': [
+                {'id': self.eggs.id, 'name': 'Eggs',
+                 'recipes': [omelette.id]},
+                {'id': self.flour.id, 'name': 'Flour', 'recipes': [bread.id]},
+                {'id': self.salt.id, 'name': 'salt',
+                 'recipes': [omelette.id, bread.id]},
+            ],
+        })
+
+    def test_other_users_recipes_not_found(self):
+        """Testing if recipes of other users are rejected."""
+
+        other_user = sample_user('test2@fueanta.com')
+        mine = sample_recipe(self.user, [self.salt])
+        theirs = sample_recipe(other_user)
+
+        res = self.client.get(SHOPPING_LIST_URL, {
+            'ids': f'{mine.id},{theirs.id}',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['ids'],
+                         [f'Recipes not found: {theirs.id}.'])
+
+    def test_invalid_ids(self):
+        """Testing if malformed or too many IDs are rejected."""
+
+        for ids in ('', 'a,b', ','.join(map(str, range(1, 102)))):
+            res = self.client.get(SHOPPING_LIST_URL, {'ids': ids})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,192 @@
+import math
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.indexes import clear_caches
+from recipe.similar import SimilarityIndex, get_index
+
+
+def similar_url(recipe_id):
+    """Returns the URL of the recipes similar to a recipe."""
+
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Creates and returns a sample recipe."""
+
+    defaults = {
+        'title': 'Sample recipe',
+        'time_in_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class SimilarityIndexTests(TestCase):
+    """Test cases for ranking recipes with the similarity bitsets."""
+
+    def setUp(self):
+        clear_caches()
+
+        self.user = sample_user()
+        self.rng = random.Random(11)
+        self.recipes = {}
+
+        for recipe_id in range(1, 300):
+            self.save(recipe_id)
+
+    def save(self, recipe_id):
+        tag_ids = sorted(self.rng.sample(range(1, 8), self.rng.randint(0, 3)))
+        ingredient_ids = sorted(
+            self.rng.sample(range(1, 40), self.rng.randint(0, 8))
+        )
+
+        Recipe.objects.update_or_create(id=recipe_id, defaults={
+            'user': self.user, 'title': 'Recipe', 'time_in_minutes': 5,
+            'price': 1.00, 'cached_tag_ids': tag_ids,
+            'cached_ingredient_ids': ingredient_ids,
+        })
+        self.recipes[recipe_id] = {('tag', tag_id) for tag_id in tag_ids} | \
+            {('ingredient', ingredient_id)
+             for ingredient_id in ingredient_ids}
+
+    def expected(self, recipe_id, limit, metric):
+        features = self.recipes[recipe_id]
+        scores = []
+
+        for other_id, other in self.recipes.items():
+            shared = len(features & other)
+
+            if other_id == recipe_id or not shared:
+                continue
+
+            if metric == 'cosine':
+                score = shared / math.sqrt(len(features) * len(other))
+            else:
+                score = shared / len(features | other)
+
+            scores.append((other_id, score))
+
+        return sorted(scores, key=lambda pair: (-pair[1], pair[0]))[:limit]
+
+    def assertMatchesBruteForce(self, index):
+        for recipe_id in self.rng.sample(sorted(self.recipes), 10):
+            for metric in ('jaccard', 'cosine'):
+                self.assertEqual(index.similar(recipe_id, 10, metric),
+                                 self.expected(recipe_id, 10, metric))
+
+    def test_similar_matches_brute_force(self):
+        """Testing if the bitset ranking equals comparing one by one."""
+
+        self.assertMatchesBruteForce(SimilarityIndex.build(self.user.id, 0))
+
+    def test_updated_matches_rebuild(self):
+        """Testing if updating changed recipes equals a rebuild."""
+
+        index = SimilarityIndex.build(self.user.id, 0)
+
+        for recipe_id in (3, 50, 300, 301):
+            self.save(recipe_id)
+        Recipe.objects.filter(id=7).delete()
+        del self.recipes[7]
+
+        index = index.updated(
+            self.user.id, {3: False, 50: False, 300: False, 301: False,
+                           7: True}, 1
+        )
+
+        self.assertEqual(index.similar(7), [])
+        self.assertMatchesBruteForce(index)
+
+
+class PrivateSimilarApiTests(TestCase):
+    """Test the similar recipes API."""
+
+    def setUp(self):
+        clear_caches()
+
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        rice, curry, bean = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Rice', 'Curry', 'Bean')
+        )
+
+        self.curry = sample_recipe(self.user, title='Curry')
+        self.curry.tags.add(vegan)
+        self.curry.ingredients.add(rice, curry)
+
+        self.bean_curry = sample_recipe(self.user, title='Bean curry')
+        self.bean_curry.tags.add(vegan)
+        self.bean_curry.ingredients.add(rice, curry, bean)
+
+        self.rice = sample_recipe(self.user, title='Rice')
+        self.rice.ingredients.add(rice)
+
+        sample_recipe(self.user, title='Unrelated')
+
+        other_recipe = sample_recipe(sample_user('test2@fueanta.com'))
+        other_recipe.tags.add(vegan)
+
+    def similar(self, recipe, **params):
+        res = self.client.get(similar_url(recipe.id), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [(item['title'], item['score']) for item in res.data]
+
+    def test_similar_recipes(self):
+        """Testing if recipes are ranked by shared tags and ingredients."""
+
+        self.assertEqual(self.similar(self.curry),
+                         [('Bean curry', 0.75), ('Rice', 0.3333)])
+        self.assertEqual(self.similar(self.curry, metric='cosine', limit=1),
+                         [('Bean curry', 0.866)])
+
+    def test_similar_sees_changes(self):
+        """Testing if an edited recipe is picked up incrementally."""
+
+        index = get_index(self.user.id)
+
+        self.client.patch(reverse('recipe:recipe-detail',
+                                  args=[self.rice.id]),
+                          {'tags': [self.curry.tags.get().id]})
+
+        self.assertEqual(self.similar(self.curry),
+                         [('Bean curry', 0.75), ('Rice', 0.6667)])
+        self.assertEqual(get_index(self.user.id).built_at, index.built_at)
+
+    def test_similar_of_other_users_recipe_fails(self):
+        """Testing if only the user's own recipes can be compared."""
+
+        recipe = Recipe.objects.exclude(user=self.user).get()
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_similar_invalid_metric(self):
+        """Testing if an unknown metric is rejected."""
+
+        res = self.client.get(similar_url(self.curry.id),
+                              {'metric': 'euclid'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,170 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, TagUsage, IngredientUsage
+from core.purge import request_purge, run_purge
+from recipe.duplicates import duplicate_recipes
+from recipe.imports import RecipeImporter
+from recipe.merges import merge_attrs
+
+STATS_URL = reverse('recipe:stats')
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Creates and returns a sample recipe."""
+
+    defaults = {
+        'title': 'Sample recipe',
+        'time_in_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def counts(usage):
+    """Returns the non-zero usage counts as {id: count}."""
+
+    return dict(usage.objects.filter(count__gt=0)
+                .values_list(usage.attr_field, 'count'))
+
+
+class PublicStatsApiTests(TestCase):
+    """Test unauthenticated stats API access."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_required_auth(self):
+        """Test the authentication is required"""
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """Test authenticated stats API access and the usage counts."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        self.salad = sample_recipe(self.user, title='Salad')
+        self.soup = sample_recipe(self.user, title='Soup')
+
+    def assertReconciled(self):
+        """Asserts the counts equal the ones recomputed from scratch."""
+
+        expected = (counts(TagUsage), counts(IngredientUsage))
+
+        TagUsage.objects.refresh(Tag.objects.values_list('id', flat=True))
+        IngredientUsage.objects.refresh(
+            Ingredient.objects.values_list('id', flat=True)
+        )
+
+        self.assertEqual((counts(TagUsage), counts(IngredientUsage)),
+                         expected)
+
+    def test_top_tags_and_ingredients(self):
+        """Testing if the most used come first, up to the limit."""
+
+        self.salad.tags.add(self.vegan, self.quick)
+        self.soup.tags.add(self.vegan)
+        self.soup.ingredients.add(self.salt)
+
+        other_user = sample_user('test2@fueanta.com')
+        sample_recipe(other_user).tags.add(
+            Tag.objects.create(user=other_user, name='Not mine')
+        )
+
+        res = self.client.get(STATS_URL, {'limit': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'],
+                         [{'id': self.vegan.id, 'name': 'Vegan', 'count': 2}])
+        self.assertEqual(res.data['ingredients'],
+                         [{'id': self.salt.id, 'name': 'Salt', 'count': 1}])
+
+    def test_invalid_limit_fails(self):
+        """Testing if an out of range limit is rejected."""
+
+        res = self.client.get(STATS_URL, {'limit': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_counts_follow_relation_changes(self):
+        """Testing if adds, removes, clears and deletes move the counts."""
+
+        self.salad.tags.add(self.vegan, self.quick)
+        self.salad.tags.add(self.vegan)
+        self.vegan.recipe_set.add(self.soup)
+        self.assertEqual(counts(TagUsage),
+                         {self.vegan.id: 2, self.quick.id: 1})
+
+        self.salad.tags.remove(self.quick, self.quick)
+        self.soup.tags.remove(self.quick)
+        self.assertEqual(counts(TagUsage), {self.vegan.id: 2})
+
+        self.vegan.recipe_set.remove(self.salad)
+        self.assertEqual(counts(TagUsage), {self.vegan.id: 1})
+
+        self.salad.tags.set([self.quick, self.vegan])
+        self.soup.delete()
+        self.assertEqual(counts(TagUsage),
+                         {self.vegan.id: 1, self.quick.id: 1})
+
+        self.salad.tags.clear()
+        self.assertEqual(counts(TagUsage), {})
+
+        self.salad.tags.add(self.vegan)
+        self.vegan.recipe_set.clear()
+        self.assertEqual(counts(TagUsage), {})
+        self.assertReconciled()
+
+    def test_counts_follow_bulk_writes(self):
+        """Testing if imports, duplicates and merges move the counts."""
+
+        self.salad.tags.add(self.quick)
+        self.salad.ingredients.add(self.salt)
+
+        duplicate_recipes(self.user, [self.salad.id, self.salad.id])
+        RecipeImporter(self.user).run([{
+            'title': 'Stew', 'time_in_minutes': 60, 'price': '4.00',
+            'tags': ['Vegan'], 'ingredients': ['Salt', 'Water'],
+        }])
+        self.assertEqual(counts(TagUsage),
+                         {self.quick.id: 2, self.vegan.id: 1})
+        self.assertEqual(counts(IngredientUsage)[self.salt.id], 3)
+
+        merge_attrs(self.user, Tag, self.vegan.id, [self.quick.id])
+        self.assertEqual(counts(TagUsage), {self.vegan.id: 3})
+        self.assertReconciled()
+
+    def test_purge_drops_counts(self):
+        """Testing if a purge leaves no counts of the user behind."""
+
+        other_recipe = sample_recipe(sample_user('test2@fueanta.com'))
+        other_tag = Tag.objects.create(user=other_recipe.user, name='Other')
+        other_recipe.tags.add(self.vegan, other_tag)
+        self.salad.tags.add(self.vegan, other_tag)
+
+        run_purge(request_purge(self.user))
+
+        self.assertEqual(counts(TagUsage), {other_tag.id: 1})
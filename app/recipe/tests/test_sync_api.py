@@ -0,0 +1,221 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, SyncChange
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def sample_user(email='test@fueanta.com', password='pass123'):
+    """Creates and returns sample user object for test."""
+
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Creates and returns a sample recipe."""
+
+    defaults = {
+        'title': 'Sample recipe',
+        'time_in_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicSyncApiTests(TestCase):
+    """Test unauthenticated sync API access."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_required_auth(self):
+        """Test the authentication is required"""
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncApiTests(TestCase):
+    """Test authenticated sync API access."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Hot')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='Chilli')
+        self.recipe = sample_recipe(user=self.user, title='Curry')
+        self.recipe.tags.add(self.tag)
+
+        other_user = sample_user(email='test2@fueanta.com')
+        sample_recipe(user=other_user, title='Not mine')
+        Tag.objects.create(user=other_user, name='Not mine')
+
+    def sync(self, since=0, **params):
+        res = self.client.get(SYNC_URL, {'since': since, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def test_initial_sync(self):
+        """Testing if a sync from zero returns all objects of the user."""
+
+        data = self.sync()
+
+        self.assertFalse(data['has_more'])
+        self.assertEqual([r['title'] for r in data['recipes']], ['Curry'])
+        self.assertEqual(data['recipes'][0]['tags'], [self.tag.id])
+        self.assertEqual(data['tags'], [{'id': self.tag.id, 'name': 'Hot'}])
+        self.assertEqual(data['ingredients'][0]['name'], 'Chilli')
+        self.assertEqual(data['deleted'],
+                         {'recipes': [], 'tags': [], 'ingredients': []})
+
+        self.assertEqual(self.sync(data['cursor'])['cursor'], data['cursor'])
+        self.assertEqual(self.sync(data['cursor'])['recipes'], [])
+
+    def test_sync_returns_changes_since_cursor(self):
+        """Testing if only changed and deleted objects follow a cursor."""
+
+        cursor = self.sync()['cursor']
+
+        self.recipe.title = 'Hot Curry'
+        self.recipe.save()
+        salad = sample_recipe(user=self.user, title='Salad')
+        salad_id = salad.id
+        salad.delete()
+        self.client.post(reverse('recipe:tag-list'), {'name': 'Mild'})
+
+        data = self.sync(cursor)
+
+        self.assertEqual([r['title'] for r in data['recipes']],
+                         ['Hot Curry'])
+        self.assertEqual([t['name'] for t in data['tags']], ['Mild'])
+        self.assertEqual(data['ingredients'], [])
+        self.assertEqual(data['deleted']['recipes'], [salad_id])
+        self.assertGreater(data['cursor'], cursor)
+
+    def test_sync_pages(self):
+        """Testing if a sync is split into pages of at most `limit`."""
+
+        for i in range(3):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        cursor = 0
+        pages = []
+
+        while True:
+            data = self.sync(cursor, limit=2)
+            pages.append(data)
+            cursor = data['cursor']
+
+            if not data['has_more']:
+                break
+
+        titles = [r['title'] for page in pages for r in page['recipes']]
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(len(titles), 4)
+        self.assertEqual(set(titles),
+                         {'Curry', 'Recipe 0', 'Recipe 1', 'Recipe 2'})
+
+    def test_sync_sees_bulk_changes(self):
+        """Testing if merges and duplicates show up in the feed."""
+
+        cursor = self.sync()['cursor']
+
+        spicy = Tag.objects.create(user=self.user, name='Spicy')
+        cursor = self.sync(cursor)['cursor']
+
+        self.client.post(reverse('recipe:tag-merge'),
+                         {'target': self.tag.id, 'sources': [spicy.id]},
+                         format='json')
+        res = self.client.post(
+            reverse('recipe:recipe-duplicate', args=[self.recipe.id])
+        )
+
+        data = self.sync(cursor)
+
+        self.assertEqual(data['deleted']['tags'], [spicy.id])
+        self.assertEqual([r['id'] for r in data['recipes']],
+                         [res.data['id']])
+
+    def test_invalid_cursor_fails(self):
+        """Testing if a malformed cursor or page size is rejected."""
+
+        res = self.client.get(SYNC_URL, {'since': -1})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(SYNC_URL, {'limit': 100000})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConcurrentSyncApiTests(TransactionTestCase):
+    """Test the change feed under concurrent writes."""
+
+    def setUp(self):
+        self.user = sample_user()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since):
+        res = self.client.get(SYNC_URL, {'since': since})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def record(self, object_id, recorded=None, commit=None):
+        """Records a deleted tag in a transaction of its own thread,
+        committing once commit is set."""
+
+        try:
+            with transaction.atomic():
+                SyncChange.objects.record(self.user.id, 'tag', [object_id],
+                                          deleted=True)
+
+                if recorded:
+                    recorded.set()
+                if commit:
+                    commit.wait(5)
+        finally:
+            connection.close()
+
+    def test_change_committed_out_of_order_not_missed(self):
+        """Testing if a change committed after a later one is still synced
+        after a cursor taken in between."""
+
+        recorded = threading.Event()
+        commit = threading.Event()
+
+        first = threading.Thread(target=self.record,
+                                 args=(1, recorded, commit))
+        first.start()
+        self.assertTrue(recorded.wait(5))
+
+        second = threading.Thread(target=self.record, args=(2,))
+        second.start()
+        second.join(0.5)
+
+        data = self.sync(0)
+
+        commit.set()
+        first.join(5)
+        second.join(5)
+
+        synced = data['deleted']['tags'] + \
+            self.sync(data['cursor'])['deleted']['tags']
+
+        self.assertEqual(sorted(synced), [1, 2])
@@ -102,6 +102,18 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         self.assertTrue(exists)
 
+    def test_tag_creation_returns_existing_normalized_name(self):
+        """Testing if creating a tag named like an existing one returns the
+        existing tag."""
+
+        tag = sample_tag(name='Dinner', user=self.user)
+
+        res = self.client.post(TAGS_URL, {'name': ' dinner'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'id': tag.id, 'name': 'Dinner'})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_invalid_tag_creation_fails(self):
         """Testing if tag creation with invalid payload fails."""
 
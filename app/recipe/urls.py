@@ -1,15 +1,18 @@
+from django.conf import settings
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from rest_framework.routers import DefaultRouter, SimpleRouter
 
 from recipe import views
 
 app_name = 'recipe'
 
-router = DefaultRouter()
+router = DefaultRouter() if settings.API_ROOT_VIEW else SimpleRouter()
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('recipes', views.RecipeViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('stats/', views.StatsView.as_view(), name='stats'),
 ]
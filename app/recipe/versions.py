@@ -0,0 +1,46 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    """Raised when a write names a version the recipe no longer has."""
+
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The recipe was changed since this version was read.'
+    default_code = 'precondition_failed'
+
+
+def etag(version):
+    """Returns the entity tag standing for a version of a recipe."""
+
+    return f'"{version}"'
+
+
+def if_match(request):
+    """Returns the recipe versions the If-Match header of a request allows,
+    or None if any version is allowed.
+
+    Weak tags are compared like strong ones, as CompressionMiddleware
+    weakens the tags of the responses it encodes.
+    """
+
+    header = request.META.get('HTTP_IF_MATCH')
+
+    if header is None:
+        return None
+
+    expected = []
+
+    for tag in header.split(','):
+        tag = tag.strip()
+
+        if tag == '*':
+            return None
+
+        if tag.startswith('W/'):
+            tag = tag[2:]
+
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            expected.append(int(tag[1:-1]))
+
+    return expected
@@ -1,19 +1,34 @@
 # import logging
+import io
+from itertools import islice
 
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from core import responsecache
+from core.authentication import ShardedTokenAuthentication
+from core.models import Tag, Ingredient, Recipe, SyncChange, TagUsage, \
+    IngredientUsage, normalize_name
+from recipe import duplicates, exports, imports, merges, pantry, \
+    serializers, shopping, similar, versions
+from recipe.indexes import current_version
+from recipe.tasks import delete_unused_images
 
+EXPENSIVE_ACTIONS = ('upload_image', 'export', 'import_recipes',
+                     'duplicate_many', 'similar')
 
-def _params_to_ints(qs):
-    """Convert a list of string IDs to a list of integers."""
+# actions responding with a single recipe, sent with its version as ETag
+VERSIONED_ACTIONS = ('create', 'retrieve', 'update', 'partial_update',
+                     'upload_image')
 
-    return [int(str_id) for str_id in qs.split(',')]
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
 
 
 class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
@@ -21,7 +36,7 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
                             mixins.CreateModelMixin):
     """Base class for common recipe attribute classes."""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (ShardedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
@@ -36,10 +51,61 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
 
         return queryset.filter(user=self.request.user).order_by('-name')
 
+    def get_throttle_scope(self, request):
+        """Returns the rate limit budget the request is counted against."""
+
+        return 'expensive' if self.action == 'merge' else 'cheap'
+
+    def get_serializer_class(self):
+        """Returns appropriate serializer class based on action."""
+
+        if self.action == 'merge':
+            return serializers.RecipeAttrMergeSerializer
+
+        return self.serializer_class
+
     def perform_create(self, serializer):
-        """Creates recipe attr object."""
+        """Creates recipe attr object, or returns the user's existing one
+        with the same normalized name."""
 
-        serializer.save(user=self.request.user)
+        name = serializer.validated_data['name']
+        objs = self.queryset.model.objects.get_or_create_names(
+            self.request.user, [name]
+        )
+
+        serializer.instance = objs[normalize_name(name)]
+
+    @action(methods=['POST'], detail=False)
+    def merge(self, request):
+        """Merge recipe attr objects into one, moving over their recipes."""
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        target_id = serializer.validated_data['target']
+        source_ids = serializer.validated_data['sources']
+
+        model = self.queryset.model
+        owned = set(
+            model.objects.filter(user=request.user,
+                                 id__in=[target_id, *source_ids])
+            .values_list('id', flat=True)
+        )
+        missing = [obj_id for obj_id in (target_id, *source_ids)
+                   if obj_id not in owned]
+
+        if missing:
+            return Response(
+                {'detail': f'Not found: {", ".join(map(str, missing))}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        merges.merge_attrs(request.user, model, target_id, source_ids)
+
+        return Response(
+            self.serializer_class(model.objects.get(id=target_id)).data,
+            status=status.HTTP_200_OK
+        )
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -61,7 +127,7 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
 class RecipeViewSet(viewsets.ModelViewSet):
     """Manage recipes."""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (ShardedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     serializer_class = serializers.RecipeSerializer
@@ -71,27 +137,48 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
 
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        queryset = self.queryset.filter(user=self.request.user)
 
-        queryset = self.queryset
+        # the tag and ingredient filters only narrow down lists
+        if self.action != 'list':
+            return queryset
+
+        query = serializers.RecipeFilterQuerySerializer(
+            data=self.request.query_params
+        )
+        query.is_valid(raise_exception=True)
 
-        if tags:
-            tag_ids = _params_to_ints(tags)
+        tag_ids = query.validated_data.get('tags')
+        ingredient_ids = query.validated_data.get('ingredients')
 
+        if tag_ids:
             # logging.getLogger('debugger').debug(f'Tag IDs: {tag_ids}')
 
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.filter(cached_tag_ids__overlap=tag_ids)
 
-        if ingredients:
-            ingredient_ids = _params_to_ints(ingredients)
+        if ingredient_ids:
 
             # logging.getLogger('debugger') \
             #     .debug(f'Ingredient IDs: {ingredient_ids}')
 
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = queryset.filter(
+                cached_ingredient_ids__overlap=ingredient_ids
+            )
 
-        return queryset.filter(user=self.request.user).distinct()
+        return queryset
+
+    def get_throttle_scope(self, request):
+        """Returns the rate limit budget the request is counted against."""
+
+        if self.action in EXPENSIVE_ACTIONS:
+            return 'expensive'
+
+        if self.action == 'list' and (request.query_params.get('tags') or
+                                      request.query_params.get('ingredients')
+                                      or request.query_params.get('pantry')):
+            return 'expensive'
+
+        return 'cheap'
 
     def get_serializer_class(self):
         """Returns appropriate serializer class based on action."""
@@ -100,6 +187,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'duplicate':
+            return serializers.RecipeDuplicateSerializer
+        elif self.action == 'duplicate_many':
+            return serializers.RecipeBatchDuplicateSerializer
 
         return self.serializer_class
 
@@ -108,11 +199,247 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         serializer.save(user=self.request.user)
 
+    def perform_update(self, serializer):
+        """Updates a recipe, only if it still has a version named by the
+        If-Match header when given."""
+
+        serializer.save(if_match=versions.if_match(self.request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Sends the version of a single recipe as its ETag."""
+
+        if self.action in VERSIONED_ACTIONS and \
+                status.is_success(response.status_code):
+            response['ETag'] = versions.etag(response.data['version'])
+
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """List recipes, or with `pantry` the ones cookable from the given
+        ingredient IDs, ranked by the number of ingredients missing."""
+
+        if 'pantry' not in request.query_params:
+            return self._cached_list(request, *args, **kwargs)
+
+        query = serializers.PantryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        ranked = pantry.get_index(request.user.id).ranked(
+            query.validated_data['pantry'], query.validated_data['missing']
+        )
+
+        queryset = self.get_queryset()
+
+        if request.query_params.get('tags') or \
+                request.query_params.get('ingredients'):
+            allowed = set(queryset.values_list('id', flat=True))
+            ranked = ((recipe_id, missing) for recipe_id, missing in ranked
+                      if recipe_id in allowed)
+
+        missing = dict(islice(ranked, query.validated_data['limit']))
+        recipes = sorted(queryset.filter(id__in=missing),
+                         key=lambda recipe: (missing[recipe.id], recipe.id))
+
+        data = self.get_serializer(recipes, many=True).data
+        for item in data:
+            item['missing'] = missing[item['id']]
+
+        return Response(data)
+
+    def _cached_list(self, request, *args, **kwargs):
+        """Lists recipes, reusing the encoded JSON response while the
+        user's change feed stays put."""
+
+        if not responsecache.enabled() or \
+                request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+
+        key = responsecache.make_key(request, 'recipe-list', request.user.id,
+                                     current_version(request.user.id))
+        cached = responsecache.get(request, key)
+
+        if cached is not None:
+            return cached
+
+        response = super().list(request, *args, **kwargs)
+        responsecache.cache_later(response, key)
+
+        return response
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream every recipe of the user as NDJSON or a JSON array."""
+
+        output = request.query_params.get('output', 'ndjson')
+
+        if output not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'output': [f'Must be one of: '
+                            f'{", ".join(EXPORT_CONTENT_TYPES)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        recipes = exports.iter_recipes(request.user, request=request)
+
+        if output == 'json':
+            content = exports.iter_json(recipes)
+        else:
+            content = exports.iter_ndjson(recipes)
+
+        response = StreamingHttpResponse(
+            content,
+            content_type=EXPORT_CONTENT_TYPES[output]
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{output}"'
+
+        return response
+
+    @action(methods=['POST'], detail=False, url_path='import')
+    def import_recipes(self, request):
+        """Bulk import recipes from an NDJSON or CSV request body."""
+
+        input_format = 'csv' if request.content_type.startswith('text/csv') \
+            else 'ndjson'
+
+        try:
+            start = int(request.query_params.get('start', 0))
+        except ValueError:
+            start = -1
+
+        if start < 0:
+            return Response(
+                {'start': ['A non-negative integer is required.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        progress = {'imported': start}
+        importer = imports.RecipeImporter(request.user)
+        records = imports.iter_records(
+            request.stream or io.BytesIO(), input_format
+        )
+
+        try:
+            importer.run(
+                records,
+                start=start,
+                progress=lambda processed: progress.update(imported=processed)
+            )
+        except ValueError as exc:
+            return Response(
+                {'detail': str(exc), **progress},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(progress, status=status.HTTP_201_CREATED)
+
+    def _duplicated(self, recipe_ids, copy_image):
+        """Duplicates recipes, returns the copies serialized."""
+
+        copy_ids = duplicates.duplicate_recipes(self.request.user, recipe_ids,
+                                                copy_image)
+
+        copies = Recipe.objects.filter(id__in=copy_ids).order_by('id')
+
+        return serializers.RecipeSerializer(copies, many=True).data
+
+    @action(methods=['POST'], detail=True)
+    def duplicate(self, request, pk=None):
+        """Copy a recipe with its tags and ingredients."""
+
+        recipe = self.get_object()
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = self._duplicated([recipe.id],
+                                serializer.validated_data['copy_image'])
+
+        return Response(data[0], status=status.HTTP_201_CREATED)
+
+    @action(methods=['POST'], detail=False, url_path='duplicate')
+    def duplicate_many(self, request):
+        """Copy many recipes with their tags and ingredients at once."""
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        ids = serializer.validated_data['ids']
+
+        owned = set(
+            Recipe.objects.filter(user=request.user, id__in=ids)
+            .values_list('id', flat=True)
+        )
+        missing = [recipe_id for recipe_id in ids if recipe_id not in owned]
+
+        if missing:
+            return Response(
+                {'ids': [f'Recipes not found: '
+                         f'{", ".join(map(str, missing))}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = self._duplicated(ids, serializer.validated_data['copy_image'])
+
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """List the user's recipes most alike a recipe by their tags and
+        ingredients, each with its similarity score."""
+
+        recipe = self.get_object()
+
+        query = serializers.RecipeSimilarQuerySerializer(
+            data=request.query_params
+        )
+        query.is_valid(raise_exception=True)
+
+        scores = dict(similar.get_index(request.user.id).similar(
+            recipe.id, **query.validated_data
+        ))
+        recipes = sorted(Recipe.objects.filter(id__in=scores),
+                         key=lambda other: (-scores[other.id], other.id))
+
+        data = self.get_serializer(recipes, many=True).data
+        for item in data:
+            item['score'] = round(scores[item['id']], 4)
+
+        return Response(data)
+
+    @action(methods=['GET'], detail=False, url_path='shopping-list')
+    def shopping_list(self, request):
+        """Combine the ingredients of the recipes in `ids`, each with the
+        recipes using it, and total their time and price."""
+
+        query = serializers.ShoppingListQuerySerializer(
+            data=request.query_params
+        )
+        query.is_valid(raise_exception=True)
+
+        ids = query.validated_data['ids']
+        data = shopping.shopping_list(
+            request.user, self.get_queryset().filter(id__in=ids)
+        )
+
+        found = set(data['recipes'])
+        missing = [recipe_id for recipe_id in ids if recipe_id not in found]
+
+        if missing:
+            return Response(
+                {'ids': [f'Recipes not found: '
+                         f'{", ".join(map(str, missing))}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(data)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe."""
 
         recipe = self.get_object()
+        old_image = recipe.image.name
 
         serializer = self.get_serializer(
             recipe,
@@ -120,7 +447,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(if_match=versions.if_match(request))
+
+            # copies may share the replaced file, the task checks
+            if old_image and old_image != recipe.image.name:
+                delete_unused_images.defer([old_image])
 
             return Response(
                 serializer.data,
@@ -131,3 +462,80 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class SyncView(APIView):
+    """Changes to the user's recipes, tags and ingredients since a cursor."""
+
+    authentication_classes = (ShardedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    synced = (
+        ('recipe', 'recipes', Recipe, serializers.RecipeSerializer),
+        ('tag', 'tags', Tag, serializers.TagSerializer),
+        ('ingredient', 'ingredients', Ingredient,
+         serializers.IngredientSerializer),
+    )
+
+    def get(self, request):
+        """Returns one page of changes after `since`, oldest first, with the
+        cursor to pass as `since` for the next page."""
+
+        query = serializers.SyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        since = query.validated_data['since']
+        limit = query.validated_data['limit']
+
+        changes = list(
+            SyncChange.objects.filter(user=request.user, id__gt=since)
+            .order_by('id')
+            .values_list('id', 'kind', 'object_id', 'deleted')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        data = {
+            'cursor': changes[-1][0] if changes else since,
+            'has_more': has_more,
+            'deleted': {},
+        }
+
+        for kind, key, model, serializer_class in self.synced:
+            changed_ids = [object_id for _, change_kind, object_id, deleted
+                           in changes if change_kind == kind and not deleted]
+            queryset = model.objects.none()
+
+            if changed_ids:
+                queryset = model.objects.filter(user=request.user,
+                                                id__in=changed_ids)
+
+            data[key] = serializer_class(queryset.order_by('id'),
+                                         many=True).data
+            data['deleted'][key] = [
+                object_id for _, change_kind, object_id, deleted
+                in changes if change_kind == kind and deleted
+            ]
+
+        return Response(data)
+
+
+class StatsView(APIView):
+    """The user's most used tags and ingredients."""
+
+    authentication_classes = (ShardedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        """Returns the `limit` tags and ingredients used by the most
+        recipes, read from the usage counts."""
+
+        query = serializers.StatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        limit = query.validated_data['limit']
+
+        return Response({
+            'tags': TagUsage.objects.top(request.user, limit),
+            'ingredients': IngredientUsage.objects.top(request.user, limit),
+        })
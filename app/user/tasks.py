@@ -0,0 +1,14 @@
+from core.models import AccountPurge
+from core.purge import run_purge
+from core.tasks import task
+
+
+@task(priority=-10)
+def purge_account(purge_id):
+    """Deletes the data of a deactivated account, resuming where an
+    earlier attempt stopped."""
+
+    purge = AccountPurge.objects.filter(id=purge_id).first()
+
+    if purge is not None:
+        run_purge(purge)
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.tests.utils import QueryBudgetTestCase
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+class UserApiQueryBudgetTests(QueryBudgetTestCase):
+    """Test SQL query budgets of the user API endpoints."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@fueanta.com', password='pass123', name='Test User'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+        self.client = APIClient()
+
+    def grow_recipes(self, size):
+        """Adds recipes to the user until there are `size`."""
+
+        for i in range(Recipe.objects.count(), size):
+            Recipe.objects.create(user=self.user, title=f'Recipe {i}',
+                                  time_in_minutes=10, price=5.00)
+
+    def test_create_user_queries(self):
+        """Testing if signing up stays within budget."""
+
+        with self.assertQueryBudget('user-create', 2):
+            res = self.client.post(CREATE_USER_URL, {
+                'email': 'new@fueanta.com', 'password': 'pass123',
+                'name': 'New User',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_token_queries(self):
+        """Testing if obtaining a token does not depend on the user's data."""
+
+        payload = {'email': 'test@fueanta.com', 'password': 'pass123'}
+
+        self.assertConstantQueries(
+            'user-token', 2, self.grow_recipes,
+            lambda: self.client.post(TOKEN_URL, payload)
+        )
+
+    def test_me_queries(self):
+        """Testing if the profile endpoints do not depend on user data."""
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        self.assertConstantQueries(
+            'user-me', 1, self.grow_recipes,
+            lambda: self.client.get(ME_URL)
+        )
+        self.assertConstantQueries(
+            'user-me-update', 2, self.grow_recipes,
+            lambda: self.client.patch(ME_URL, {'name': 'New Name'})
+        )
@@ -4,6 +4,9 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.models import AccountPurge
+from core.tasks import run_pending
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -174,3 +177,30 @@ class PrivateUserApiTests(TestCase):
         res = self.client.post(ME_URL, {})
 
         self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_delete_self_deactivates_and_queues_purge(self):
+        """Testing if deleting the account deactivates it right away."""
+
+        res = self.client.delete(ME_URL)
+
+        self.user.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(AccountPurge.objects.filter(user=self.user).exists())
+
+    def test_delete_self_defers_purge(self):
+        """Testing if deleting the account leaves the purge to a worker."""
+
+        self.client.delete(ME_URL)
+
+        self.assertTrue(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+
+        run_pending()
+
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertIsNotNone(AccountPurge.objects.get().finished_at)
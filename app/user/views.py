@@ -1,8 +1,15 @@
-from rest_framework import generics, authentication, permissions
+from collections.abc import Mapping
+
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.authentication import ShardedTokenAuthentication
+from core.purge import request_purge
+
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.tasks import purge_account
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -16,16 +23,35 @@ class CreateTokenView(ObtainAuthToken):
 
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'expensive'
+
+    def get_throttle_account(self, request):
+        """Limits attempts per account as well as per address."""
+
+        if not isinstance(request.data, Mapping):
+            return None
 
+        return str(request.data.get('email') or '').strip().lower()
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """User profile."""
 
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (ShardedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Fetch self data on ME url for authenticated user."""
 
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate the account and queue its data for deletion."""
+
+        purge = request_purge(self.get_object())
+        purge_account.defer(purge.id)
+
+        return Response(status=status.HTTP_202_ACCEPTED)